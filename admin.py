@@ -0,0 +1,30 @@
+"""
+admin.py - Access control for operator-only commands of the Space Simulation Telegram Game Bot.
+Admins are the Telegram user IDs listed in config.ADMIN_IDS.
+"""
+
+import functools
+import logging
+from telegram import Update
+from telegram.ext import CallbackContext
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def is_admin(user_id: int) -> bool:
+    """Return True if the Telegram user is a bot operator."""
+    return user_id in config.ADMIN_IDS
+
+
+def admin_only(handler):
+    """Decorator for command handlers that only bot operators may run."""
+    @functools.wraps(handler)
+    def wrapper(update: Update, context: CallbackContext):
+        user = update.effective_user
+        if user is None or not is_admin(user.id):
+            logger.warning(f"User {user.id if user else None} tried admin command {handler.__name__}.")
+            update.message.reply_text("This command is restricted to bot operators.")
+            return None
+        return handler(update, context)
+    return wrapper
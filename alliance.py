@@ -7,6 +7,7 @@ import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
 import database
+import dedupe
 import config
 
 logger = logging.getLogger(__name__)
@@ -22,6 +23,35 @@ def alliance_menu(update: Update, context: CallbackContext):
     reply_markup = InlineKeyboardMarkup(keyboard)
     update.message.reply_text("Alliance Menu - Choose an option:", reply_markup=reply_markup)
 
+def render_alliance_page(after_id: int = 0, before_id: int = None):
+    """
+    Build the text and navigation buttons for one page of the alliance browser.
+    Pages are fetched by keyset (alliance ID), so every page costs the same.
+    """
+    alliances, has_more = database.get_alliance_page(after_id=after_id, before_id=before_id)
+    if not alliances:
+        return "No alliances available at the moment.", None
+
+    text = "Available Alliances:\n"
+    for alliance in alliances:
+        text += (
+            f"- {alliance['alliance_name']} (ID: {alliance['id']}) - "
+            f"{alliance['member_count']} members, fleet power {alliance['fleet_power']}\n"
+        )
+
+    if before_id is not None:
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = after_id > 0, has_more
+    buttons = []
+    if has_prev:
+        buttons.append(InlineKeyboardButton("« Previous", callback_data=f"alliance_page_prev_{alliances[0]['id']}"))
+    if has_next:
+        buttons.append(InlineKeyboardButton("Next »", callback_data=f"alliance_page_next_{alliances[-1]['id']}"))
+    reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
+    return text, reply_markup
+
+@dedupe.idempotent
 def alliance_callback(update: Update, context: CallbackContext):
     """
     Handle alliance menu callbacks.
@@ -31,14 +61,21 @@ def alliance_callback(update: Update, context: CallbackContext):
     data = query.data
 
     if data == "alliance_view":
-        alliances = database.get_alliances()
-        if alliances:
-            text = "Available Alliances:\n"
-            for alliance in alliances:
-                text += f"- {alliance['alliance_name']} (ID: {alliance['id']})\n"
+        text, reply_markup = render_alliance_page(after_id=0)
+        query.edit_message_text(text, reply_markup=reply_markup)
+    elif data.startswith("alliance_page_"):
+        # Callback data: alliance_page_next_<last shown id> or alliance_page_prev_<first shown id>
+        try:
+            _, _, direction, anchor = data.split("_")
+            anchor = int(anchor)
+        except ValueError:
+            query.edit_message_text("Invalid alliance page.")
+            return
+        if direction == "prev":
+            text, reply_markup = render_alliance_page(before_id=anchor)
         else:
-            text = "No alliances available at the moment."
-        query.edit_message_text(text)
+            text, reply_markup = render_alliance_page(after_id=anchor)
+        query.edit_message_text(text, reply_markup=reply_markup)
     elif data == "alliance_create":
         # For simplicity, automatically create an alliance with a generated name.
         alliance_name = f"Alliance_{query.from_user.username or query.from_user.first_name}"
@@ -0,0 +1,233 @@
+"""
+backup.py - Online snapshots of the SQLite game database.
+Snapshots are copied with SQLite's online backup API a few pages per step while the bot
+keeps running. The copy reads from one pinned WAL snapshot, so game writes made during a
+backup neither wait for it nor force it to restart, and every snapshot is consistent.
+A job takes snapshots on a schedule and keeps the newest BACKUP_KEEP of them.
+
+Admin commands:
+    /backup           take a snapshot now and report its duration and size
+    /backup list      list the stored snapshots
+    /restore <name>   verify a snapshot and switch the live database over to it
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from telegram import Update
+from telegram.ext import CallbackContext
+import config
+import database
+import player_index
+import render_cache
+from admin import admin_only
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = ".db"
+
+# Outcome of the most recent snapshot, shown by /backup list
+last_snapshot = None
+
+
+class BackupError(Exception):
+    """A snapshot could not be taken, verified or restored."""
+
+
+def live_storage() -> database.SQLiteStorage:
+    """Return the active storage engine if it is backed by an SQLite file."""
+    backend = database.get_backend()
+    if not isinstance(backend, database.SQLiteStorage):
+        raise BackupError(f"The {backend.name} storage backend has no database file to back up.")
+    return backend
+
+
+def snapshot_path(label: str = "") -> str:
+    """Return a new snapshot file name in BACKUP_DIR, ordered by time."""
+    stem = os.path.splitext(os.path.basename(config.DATABASE_FILENAME))[0]
+    name = f"{stem}-{time.strftime('%Y%m%d-%H%M%S')}{'-' + label if label else ''}{SNAPSHOT_SUFFIX}"
+    return os.path.join(config.BACKUP_DIR, name)
+
+
+def list_snapshots() -> list:
+    """Return (name, size in bytes, modified time) for every stored snapshot, oldest first."""
+    if not os.path.isdir(config.BACKUP_DIR):
+        return []
+    snapshots = []
+    for name in sorted(os.listdir(config.BACKUP_DIR)):
+        path = os.path.join(config.BACKUP_DIR, name)
+        if name.endswith(SNAPSHOT_SUFFIX) and os.path.isfile(path):
+            stat = os.stat(path)
+            snapshots.append((name, stat.st_size, stat.st_mtime))
+    return snapshots
+
+
+def take_snapshot(label: str = "") -> dict:
+    """
+    Copy the live database into a new snapshot file and return its name, path, size,
+    duration and page count. The file only appears under its final name once complete.
+    """
+    global last_snapshot
+    storage = live_storage()
+    os.makedirs(config.BACKUP_DIR, exist_ok=True)
+    path = snapshot_path(label)
+    partial = path + ".partial"
+    steps = 0
+
+    def progress(status, remaining, total):
+        nonlocal steps
+        steps += 1
+        if remaining:
+            # Spread the copy's disk reads out so it does not compete with the bot for I/O
+            time.sleep(config.BACKUP_STEP_PAUSE)
+
+    started = time.perf_counter()
+    source = sqlite3.connect(storage.filename, isolation_level=None)
+    target = sqlite3.connect(partial)
+    try:
+        # Pin one read snapshot for the whole copy; writers carry on in the WAL meanwhile
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        pages = source.execute("PRAGMA page_count").fetchone()[0]
+        source.backup(target, pages=config.BACKUP_PAGES_PER_STEP, progress=progress)
+        source.execute("COMMIT")
+        # A snapshot is a single self-contained file
+        target.execute("PRAGMA journal_mode = DELETE")
+    except sqlite3.Error as e:
+        target.close()
+        os.remove(partial)
+        raise BackupError(f"Snapshot failed: {e}") from e
+    finally:
+        source.close()
+    target.close()
+    os.replace(partial, path)
+    last_snapshot = {
+        "name": os.path.basename(path),
+        "path": path,
+        "bytes": os.path.getsize(path),
+        "pages": pages,
+        "steps": steps,
+        "seconds": time.perf_counter() - started,
+        "finished_at": time.time(),
+    }
+    logger.info(f"Snapshot {last_snapshot['name']}: {last_snapshot['bytes']} bytes, {pages} pages "
+                f"in {steps} steps, {last_snapshot['seconds']:.2f}s.")
+    return last_snapshot
+
+
+def rotate(keep: int = None) -> list:
+    """Delete all but the newest keep snapshots and return the deleted names."""
+    keep = config.BACKUP_KEEP if keep is None else keep
+    expired = [name for name, _, _ in sorted(list_snapshots(), key=lambda s: s[2])][:-keep or None]
+    for name in expired:
+        os.remove(os.path.join(config.BACKUP_DIR, name))
+        logger.info(f"Deleted old snapshot {name}.")
+    return expired
+
+
+def verify_snapshot(path: str) -> int:
+    """Check a snapshot's integrity read-only and return its schema version. Raises BackupError."""
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            result = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        raise BackupError(f"{os.path.basename(path)} is not a readable database: {e}") from e
+    if result != ["ok"]:
+        raise BackupError(f"{os.path.basename(path)} failed the integrity check: {'; '.join(result[:3])}")
+    if version > database.SCHEMA_VERSION:
+        raise BackupError(f"{os.path.basename(path)} has schema version {version}, newer than "
+                          f"{database.SCHEMA_VERSION}.")
+    return version
+
+
+def restore_snapshot(name: str) -> dict:
+    """
+    Verify a stored snapshot, save the live database as a pre-restore snapshot, then copy
+    the snapshot over the live database while game writes wait on the storage lock.
+    Returns the pre-restore snapshot.
+    """
+    storage = live_storage()
+    path = os.path.join(config.BACKUP_DIR, os.path.basename(name))
+    if not name.endswith(SNAPSHOT_SUFFIX) or not os.path.isfile(path):
+        raise BackupError(f"No snapshot named {name}.")
+    verify_snapshot(path)
+    safety = take_snapshot("pre-restore")
+    started = time.perf_counter()
+    with storage.lock:
+        source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        target = sqlite3.connect(storage.filename)
+        try:
+            source.backup(target)
+            target.execute("PRAGMA journal_mode = WAL")
+        except sqlite3.Error as e:
+            raise BackupError(f"Restore failed, the live database is unchanged or can be restored "
+                              f"from {safety['name']}: {e}") from e
+        finally:
+            source.close()
+            target.close()
+        storage._hot_partition = None
+    # Older snapshots are migrated to the current schema; caches are rebuilt from the restored data
+    database.init_db()
+    player_index.levels.load(database.get_player_levels(), keep_live=False)
+    render_cache.replies.clear()
+    logger.warning(f"Restored the database from {name} in {time.perf_counter() - started:.2f}s.")
+    return safety
+
+
+def backup_job(context: CallbackContext):
+    """Job: take a scheduled snapshot and rotate old ones."""
+    try:
+        take_snapshot()
+    except BackupError as e:
+        logger.error(str(e))
+        return
+    rotate()
+
+
+def describe(snapshot: dict) -> str:
+    return (f"{snapshot['name']}: {snapshot['bytes'] / 1048576:.1f} MiB, {snapshot['pages']} pages "
+            f"in {snapshot['steps']} steps, {snapshot['seconds']:.2f}s")
+
+
+@admin_only
+def backup(update: Update, context: CallbackContext):
+    """Handle the admin /backup [list] command."""
+    if context.args and context.args[0] == "list":
+        snapshots = list_snapshots()
+        if not snapshots:
+            update.message.reply_text("No snapshots stored.")
+            return
+        text = f"Snapshots in {config.BACKUP_DIR}:\n" + "\n".join(
+            f"- {name} ({size / 1048576:.1f} MiB, {time.strftime('%Y-%m-%d %H:%M', time.localtime(mtime))})"
+            for name, size, mtime in snapshots)
+        if last_snapshot:
+            text += f"\n\nLast snapshot: {describe(last_snapshot)}"
+        update.message.reply_text(text[:4000])
+        return
+    try:
+        snapshot = take_snapshot()
+    except BackupError as e:
+        update.message.reply_text(str(e))
+        return
+    deleted = rotate()
+    update.message.reply_text(f"Snapshot taken: {describe(snapshot)}"
+                              + (f"\nDeleted {len(deleted)} old snapshots." if deleted else ""))
+
+
+@admin_only
+def restore(update: Update, context: CallbackContext):
+    """Handle the admin /restore <snapshot name> command."""
+    if not context.args:
+        update.message.reply_text("Usage: /restore <snapshot name> (see /backup list)")
+        return
+    try:
+        safety = restore_snapshot(context.args[0])
+    except BackupError as e:
+        update.message.reply_text(str(e))
+        return
+    update.message.reply_text(f"Restored {context.args[0]}. The previous state was saved as {safety['name']}.")
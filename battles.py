@@ -6,13 +6,31 @@ This module simulates battles between the player's spaceship and enemies.
 import random
 import time
 import logging
+from array import array
+from telegram.ext import CallbackContext, JobQueue
 import config
+import crew
 import database
+from entities import ShipRecord
 
 logger = logging.getLogger(__name__)
 
+# Battle log entry kinds. The log is stored as flat (kind, value) pairs of unsigned
+# shorts and only rendered to text when a battle ends.
+LOG_TURN, LOG_PLAYER_HIT, LOG_ENEMY_HIT, LOG_ENEMY_DEFEATED, LOG_PLAYER_DEFEATED = range(5)
+LOG_FORMATS = {
+    LOG_TURN: "--- Turn {value} ---",
+    LOG_PLAYER_HIT: "Player attacked {enemy} for {value} damage.",
+    LOG_ENEMY_HIT: "Enemy {enemy} attacked for {value} damage.",
+    LOG_ENEMY_DEFEATED: "Enemy {enemy} defeated!",
+    LOG_PLAYER_DEFEATED: "Player defeated!",
+}
+
 
 class Battle:
+    __slots__ = ("telegram_id", "enemy_type", "turn", "player_health", "enemy_health", "battle_over", "log",
+                 "damage_bonus")
+
     def __init__(self, telegram_id: int, enemy_type: str):
         self.telegram_id = telegram_id
         self.enemy_type = enemy_type
@@ -20,30 +38,52 @@ class Battle:
         self.player_health = 100
         self.enemy_health = random.randint(50, 120)
         self.battle_over = False
-        self.battle_log = []
+        self.log = array("H")
+        # Gunners aboard raise the player's damage
+        self.damage_bonus = crew.skill_bonus(telegram_id, "gunner")
+
+    def log_event(self, kind: int, value: int = 0):
+        """Append a compact log entry."""
+        self.log.append(kind)
+        self.log.append(min(max(value, 0), 0xFFFF))
+
+    @property
+    def battle_log(self) -> list:
+        """The battle log rendered as lines of text."""
+        entries = self.log
+        return [LOG_FORMATS[entries[i]].format(value=entries[i + 1], enemy=self.enemy_type)
+                for i in range(0, len(entries), 2)]
+
+    def roll_player_damage(self) -> int:
+        """Roll the damage of the player's next attack."""
+        return round(random.randint(10, 30) * (1 + self.damage_bonus))
+
+    def roll_enemy_damage(self) -> int:
+        """Roll the damage of the enemy's next attack."""
+        return random.randint(5, 25)
 
     def player_attack(self):
         """Simulate player's attack turn."""
-        damage = random.randint(10, 30)
+        damage = self.roll_player_damage()
         self.enemy_health -= damage
-        self.battle_log.append(f"Player attacked {self.enemy_type} for {damage} damage.")
+        self.log_event(LOG_PLAYER_HIT, damage)
         logger.info(f"Player attacked {self.enemy_type} for {damage} damage.")
         if self.enemy_health <= 0:
             self.enemy_health = 0
             self.battle_over = True
-            self.battle_log.append(f"Enemy {self.enemy_type} defeated!")
+            self.log_event(LOG_ENEMY_DEFEATED)
         return damage
 
     def enemy_attack(self):
         """Simulate enemy's attack turn."""
-        damage = random.randint(5, 25)
+        damage = self.roll_enemy_damage()
         self.player_health -= damage
-        self.battle_log.append(f"Enemy {self.enemy_type} attacked for {damage} damage.")
+        self.log_event(LOG_ENEMY_HIT, damage)
         logger.info(f"Enemy {self.enemy_type} attacked for {damage} damage.")
         if self.player_health <= 0:
             self.player_health = 0
             self.battle_over = True
-            self.battle_log.append("Player defeated!")
+            self.log_event(LOG_PLAYER_DEFEATED)
         return damage
 
     def execute_turn(self):
@@ -51,23 +91,90 @@ class Battle:
         if self.battle_over:
             return
         self.turn += 1
-        self.battle_log.append(f"--- Turn {self.turn} ---")
+        self.log_event(LOG_TURN, self.turn)
         self.player_attack()
         if not self.battle_over:
             self.enemy_attack()
 
-    def simulate_battle(self):
-        """Simulate the complete battle."""
+    def record_result(self, result: str, log: list):
+        """Store the finished battle's rendered log."""
+        database.add_event_log(self.telegram_id, "battle", "\n".join(log), outcome=result)
+
+    def simulate_battle(self, turn_delay: float = 0.5):
+        """Simulate the complete battle, pausing turn_delay seconds between turns."""
         while not self.battle_over:
             self.execute_turn()
-            time.sleep(0.5)
+            if turn_delay:
+                time.sleep(turn_delay)
+        return self.finish()
+
+    def finish(self):
+        """Record the result of the finished battle and return (result, log)."""
         result = "win" if self.player_health > 0 else "loss"
-        database.add_event_log(self.telegram_id, "battle", "\n".join(self.battle_log))
+        log = self.battle_log
+        self.record_result(result, log)
         logger.info(f"Battle ended with a {result} for user {self.telegram_id}.")
-        return result, self.battle_log
+        return result, log
+
+
+class PvPBattle(Battle):
+    """
+    A duel between two players' ships using the standard turn logic.
+    The challenger plays the "player" side and the opponent the "enemy" side;
+    each side's damage rolls scale with its weapons against the other's shields
+    and with its gunners.
+    """
+
+    __slots__ = ("opponent_id", "player_scale", "enemy_scale")
+
+    def __init__(self, telegram_id: int, ship: ShipRecord, opponent_id: int, opponent_ship: ShipRecord,
+                 opponent_name: str = "rival captain"):
+        super().__init__(telegram_id, opponent_name)
+        self.opponent_id = opponent_id
+        self.enemy_health = 100
+        self.player_scale = self.damage_scale(ship, opponent_ship) * (1 + self.damage_bonus)
+        self.enemy_scale = self.damage_scale(opponent_ship, ship) * (1 + crew.skill_bonus(opponent_id, "gunner"))
+
+    @staticmethod
+    def damage_scale(attacker: ShipRecord, defender: ShipRecord) -> float:
+        """Scale damage by the attacker's weapons against the defender's shields."""
+        scale = (10 + attacker.weapons) / (10 + defender.shields * 0.2)
+        return min(max(scale, 0.5), 2.0)
+
+    def roll_player_damage(self) -> int:
+        return int(random.randint(10, 30) * self.player_scale)
+
+    def roll_enemy_damage(self) -> int:
+        return int(random.randint(10, 30) * self.enemy_scale)
+
+    def record_result(self, result: str, log: list):
+        """Store the duel's log for both players."""
+        details = "\n".join(log)
+        database.add_event_log(self.telegram_id, "pvp", details, outcome=result)
+        database.add_event_log(self.opponent_id, "pvp", details, outcome="loss" if result == "win" else "win")
 
 
 def initiate_battle(telegram_id: int, enemy_type: str):
     """Interface function to start a battle."""
     battle = Battle(telegram_id, enemy_type)
-    return battle.simulate_battle()
\ No newline at end of file
+    return battle.simulate_battle()
+
+
+def battle_turn(context: CallbackContext):
+    """Job: play one turn of a paced battle, then schedule the next turn or report the result."""
+    battle, chat_id, turn_delay = context.job.context
+    battle.execute_turn()
+    if not battle.battle_over:
+        context.job_queue.run_once(battle_turn, turn_delay, context=context.job.context)
+        return
+    result, log = battle.finish()
+    context.bot.send_message(chat_id=chat_id, text="\n".join(log) + f"\nBattle result: {result.upper()}")
+
+
+def start_battle(job_queue: JobQueue, chat_id: int, telegram_id: int, enemy_type: str, turn_delay: float = None):
+    """
+    Start a battle paced turn by turn on the job queue and report the result to chat_id.
+    No thread waits between turns, so battles cannot tie up the dispatcher's workers.
+    """
+    turn_delay = config.BATTLE_TURN_DELAY if turn_delay is None else turn_delay
+    job_queue.run_once(battle_turn, 0, context=(Battle(telegram_id, enemy_type), chat_id, turn_delay))
@@ -0,0 +1,4 @@
+"""
+benchmarks - Performance benchmarks for the Space Simulation Telegram Game Bot.
+Run each suite as a module from the repository root, e.g. python -m benchmarks.bench_database.
+"""
@@ -0,0 +1,229 @@
+"""
+bench_database.py - Micro-benchmarks for the public functions in database.py, all but
+init_db and drop_event_partition, which would wipe the seeded data.
+Seeds a temporary database with synthetic players, ships, crews, missions, upgrades,
+event logs and alliances at several sizes, then measures each function's latency
+percentiles and throughput single-threaded and with threads contending on database_lock.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_database --sizes 10000,100000,1000000 --output db.json
+    python -m benchmarks.bench_database --sizes 10000 --compare db.json
+"""
+
+import argparse
+import itertools
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+
+import config
+import database
+from storage import MemoryStorage, event_partition, rollup_buckets
+from benchmarks.common import run_threads, summarize, write_results, compare_results, print_table
+
+CREW_PER_PLAYER = 2
+EVENTS_PER_PLAYER = 3
+PLAYERS_PER_ALLIANCE = 50
+SEED_BATCH = 50000
+
+
+def _batches(rows, size: int = SEED_BATCH):
+    """Yield lists of at most size rows from an iterator."""
+    iterator = iter(rows)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def seed_sqlite(filename: str, players: int, rng: random.Random):
+    """Bulk-load synthetic rows straight into a fresh SQLite file."""
+    storage = database.SQLiteStorage(filename)
+    storage.init_db()
+    conn = sqlite3.connect(filename)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA journal_mode = MEMORY")
+    alliances = max(players // PLAYERS_PER_ALLIANCE, 1)
+    skills = config.CREW_SKILLS
+    inserts = [
+        ("INSERT INTO players (telegram_id, username, spaceship_level, credits) VALUES (?, ?, ?, ?)",
+         ((tid, f"player{tid}", rng.randint(1, 20), rng.randint(0, 5000)) for tid in range(1, players + 1))),
+        ("INSERT INTO spaceship (telegram_id, fuel, oxygen, energy, cargo, weapons, shields, crew) "
+         "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+         ((tid, rng.randint(0, 200), rng.randint(0, 100), rng.randint(0, 100), rng.randint(0, 50),
+           rng.randint(10, 80), rng.randint(20, 150), rng.randint(1, 10)) for tid in range(1, players + 1))),
+        ("INSERT INTO crew (telegram_id, name, skill, level) VALUES (?, ?, ?, ?)",
+         ((tid, f"crew{tid}", rng.choice(skills), rng.randint(1, 5))
+          for tid in range(1, players + 1) for _ in range(CREW_PER_PLAYER))),
+        ("INSERT INTO missions (telegram_id, description, reward, status, time_limit) VALUES (?, ?, ?, ?, ?)",
+         ((tid, "Synthetic mission", rng.randint(20, 100), rng.choice(("active", "completed")),
+           rng.randint(60, 300)) for tid in range(1, players + 1))),
+        ("INSERT INTO upgrades (telegram_id, type, level, cost) VALUES (?, ?, ?, ?)",
+         ((tid, rng.choice(("engines", "shields", "weapons")), rng.randint(1, 20), rng.randint(10, 300))
+          for tid in range(1, players + 1))),
+        (f"INSERT INTO {event_partition()[0]} (telegram_id, event_type, event_details) VALUES (?, ?, ?)",
+         ((tid, rng.choice(("info", "battle", "resource")), "Synthetic event details for benchmarking.")
+          for tid in range(1, players + 1) for _ in range(EVENTS_PER_PLAYER))),
+        ("INSERT INTO alliances (alliance_name) VALUES (?)",
+         ((f"Alliance {aid}",) for aid in range(1, alliances + 1))),
+        ("INSERT INTO alliance_members (telegram_id, alliance_id) VALUES (?, ?)",
+         ((tid, rng.randint(1, alliances)) for tid in range(1, players + 1, 2))),
+    ]
+    for statement, rows in inserts:
+        for batch in _batches(rows):
+            conn.executemany(statement, batch)
+        conn.commit()
+    conn.close()
+    # Re-running init_db backfills alliance_summary for the bulk-loaded alliances.
+    storage.init_db(force=True)
+    return storage
+
+
+def seed_memory(players: int, rng: random.Random):
+    """Load synthetic rows into a fresh in-memory engine through its public API."""
+    storage = MemoryStorage()
+    alliances = max(players // PLAYERS_PER_ALLIANCE, 1)
+    for tid in range(1, players + 1):
+        storage.add_player(tid, f"player{tid}")
+        storage.update_spaceship(tid, weapons=rng.randint(10, 80), shields=rng.randint(20, 150))
+        for _ in range(CREW_PER_PLAYER):
+            storage.add_crew_member(tid, f"crew{tid}", rng.choice(config.CREW_SKILLS))
+        storage.add_mission(tid, "Synthetic mission", rng.randint(20, 100), rng.randint(60, 300))
+        storage.upgrade_spaceship(tid, "weapons", rng.randint(1, 20), rng.randint(10, 300))
+        for _ in range(EVENTS_PER_PLAYER):
+            storage.add_event_log(tid, "info", "Synthetic event details for benchmarking.")
+    for aid in range(1, alliances + 1):
+        storage.create_alliance(f"Alliance {aid}")
+    for tid in range(1, players + 1, 2):
+        storage.join_alliance(tid, rng.randint(1, alliances))
+    return storage
+
+
+def build_cases(players: int, rng: random.Random, iterations: int):
+    """
+    Return (name, fn(i), iterations) for every database function.
+    Inputs are drawn up front so the timed calls measure only the database work.
+    Functions that scan a whole table get fewer iterations.
+    """
+    ids = [rng.randint(1, players) for _ in range(iterations)]
+    alliances = max(players // PLAYERS_PER_ALLIANCE, 1)
+    alliance_ids = [rng.randint(1, alliances) for _ in range(iterations)]
+    new_players = itertools.count(players + 1)
+    raid_id = database.create_raid(1, "Benchmark Boss", 10 ** 9)
+    for tid in range(1, min(players, 500) + 1):
+        database.join_raid(raid_id, tid)
+    round_result = {"round": 1, "participants": 500, "total_damage": 1000, "top_telegram_id": 1,
+                    "top_damage": 50, "boss_damage": 1, "boss_health": 10 ** 9}
+    scan_iterations = max(min(iterations // 20, 50), 3)
+    # Each add_pool_missions call pools more missions than claim_mission takes at the same thread count.
+    pool_batch = [("Bench pool mission", 50, 120)] * 10
+    partition = database.get_event_partitions()[-1]["name"]
+    today = rollup_buckets()["day"]
+    state = b"\x80\x05\x95" + bytes(64)
+
+    def pick(values):
+        return lambda i: values[i % len(values)]
+
+    player, alliance = pick(ids), pick(alliance_ids)
+    return [
+        ("add_player", lambda i: database.add_player(next(new_players), "bench"), iterations),
+        ("get_spaceship", lambda i: database.get_spaceship(player(i)), iterations),
+        ("update_spaceship", lambda i: database.update_spaceship(player(i), fuel=i % 200, weapons=20), iterations),
+        ("add_event_log", lambda i: database.add_event_log(player(i), "bench", "Benchmark event."), iterations),
+        ("get_recent_events", lambda i: database.get_recent_events(player(i)), iterations),
+        ("get_event_page", lambda i: database.get_event_page(player(i)), iterations),
+        ("get_event_page_search", lambda i: database.get_event_page(player(i), search="synthetic bench"),
+         iterations),
+        ("get_event_partitions", lambda i: database.get_event_partitions(), iterations),
+        ("read_event_partition", lambda i: database.read_event_partition(partition, after_id=player(i)),
+         iterations),
+        ("add_crew_member", lambda i: database.add_crew_member(player(i), "Bench", "pilot"), iterations),
+        ("get_crew", lambda i: database.get_crew(player(i)), iterations),
+        ("get_crew_bonuses", lambda i: database.get_crew_bonuses(player(i)), iterations),
+        ("train_crew", lambda i: database.train_crew(), scan_iterations),
+        ("add_mission", lambda i: database.add_mission(player(i), "Bench mission", 50, 120), iterations),
+        ("add_pool_missions", lambda i: database.add_pool_missions(pool_batch), iterations),
+        ("count_pool_missions", lambda i: database.count_pool_missions(), iterations),
+        ("claim_mission", lambda i: database.claim_mission(player(i)), iterations),
+        ("get_active_missions", lambda i: database.get_active_missions(player(i)), iterations),
+        ("complete_mission", lambda i: database.complete_mission(player(i)), iterations),
+        ("upgrade_spaceship", lambda i: database.upgrade_spaceship(player(i), "weapons", i % 20 + 1, 100),
+         iterations),
+        ("join_alliance", lambda i: database.join_alliance(player(i), alliance(i)), iterations),
+        ("create_alliance", lambda i: database.create_alliance(f"Bench {i}"), iterations),
+        ("get_alliances", lambda i: database.get_alliances(), scan_iterations),
+        ("get_alliance_page", lambda i: database.get_alliance_page(after_id=alliance(i)), iterations),
+        ("get_player_alliance", lambda i: database.get_player_alliance(player(i)), iterations),
+        ("get_player_alliances", lambda i: database.get_player_alliances(ids[i % len(ids):][:80]), iterations),
+        ("create_raid", lambda i: database.create_raid(alliance(i), "Bench Boss", 1000), iterations),
+        ("get_active_raid", lambda i: database.get_active_raid(alliance(i)), iterations),
+        ("get_active_raids", lambda i: database.get_active_raids(), scan_iterations),
+        ("join_raid", lambda i: database.join_raid(raid_id, player(i)), iterations),
+        ("get_raid_fleet", lambda i: database.get_raid_fleet(raid_id), scan_iterations),
+        ("record_raid_round", lambda i: database.record_raid_round(raid_id, round_result, "active"),
+         scan_iterations),
+        ("get_player_levels", lambda i: database.get_player_levels(), scan_iterations),
+        ("steal_credits", lambda i: database.steal_credits(player(i), player(i + 1), 0.01, 10), iterations),
+        ("get_rollups", lambda i: database.get_rollups("day", today), iterations),
+        ("save_session_state", lambda i: database.save_session_state([("user", player(i), b"bench", state)]),
+         iterations),
+        ("load_session_state", lambda i: database.load_session_state("user", player(i)), iterations),
+    ]
+
+
+def run(sizes, iterations: int, thread_counts, backend: str, only=None, seed: int = 1234):
+    """Seed each size, run every case at every thread count and return the result rows."""
+    results = []
+    for size in sizes:
+        rng = random.Random(seed)
+        workdir = tempfile.mkdtemp(prefix="space_bench_")
+        try:
+            print(f"Seeding {backend} database with {size} players...")
+            if backend == "memory":
+                storage = seed_memory(size, rng)
+            else:
+                storage = seed_sqlite(os.path.join(workdir, "bench.db"), size, rng)
+            database.set_backend(storage)
+            print_table([], ())
+            for name, fn, case_iterations in build_cases(size, rng, iterations):
+                if only and name not in only:
+                    continue
+                for threads in thread_counts:
+                    latencies, elapsed = run_threads(fn, case_iterations, threads)
+                    row = {"backend": backend, "size": size, "function": name, "threads": threads}
+                    row.update(summarize(latencies, elapsed))
+                    results.append(row)
+                    print_table([row], ("size", "function", "threads"), header=False)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        help="comma-separated player counts to seed (default: %(default)s)")
+    parser.add_argument("--iterations", type=int, default=1000, help="calls per function and thread count")
+    parser.add_argument("--threads", default="1,4,8", help="comma-separated thread counts (default: %(default)s)")
+    parser.add_argument("--backend", choices=sorted(database.BACKENDS), default="sqlite")
+    parser.add_argument("--only", help="comma-separated function names to run")
+    parser.add_argument("--seed", type=int, default=1234, help="random seed for synthetic data")
+    parser.add_argument("--output", default="bench_database.json", help="JSON results file")
+    parser.add_argument("--compare", help="earlier JSON results file to compare p50 latency against")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    thread_counts = [int(t) for t in args.threads.split(",")]
+    only = set(args.only.split(",")) if args.only else None
+    results = run(sizes, args.iterations, thread_counts, args.backend, only, args.seed)
+    write_results(args.output, "database", results, vars(args))
+    print(f"\nWrote {len(results)} results to {args.output}")
+    if args.compare:
+        compare_results(args.compare, results, ("backend", "size", "function", "threads"))
+
+
+if __name__ == "__main__":
+    main()
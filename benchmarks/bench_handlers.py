@@ -0,0 +1,132 @@
+"""
+bench_handlers.py - End-to-end latency benchmarks for the bot's command and callback handlers.
+Each handler is called with fake Update/CallbackContext objects from benchmarks.fakes, so
+replies are recorded locally and no network is involved. Jobs such as battle turns run inline.
+Results are per-handler latency distributions (percentiles plus a histogram).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_handlers --players 1000 --iterations 500 --output handlers.json
+    python -m benchmarks.bench_handlers --backend sqlite --compare handlers.json
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+
+import database
+import player_index
+import game_commands
+import shop
+import crew
+import missions
+import alliance
+import scanning
+import raids
+import pvp
+from benchmarks.common import histogram, summarize, time_calls, write_results, compare_results, print_table
+from benchmarks.fakes import FakeBot, FakeContext, command_update, callback_update
+
+
+def command(handler, text: str):
+    """Case factory for a command handler."""
+    return lambda bot, user_id: handler(command_update(bot, user_id, text), FakeContext(bot))
+
+
+def tap(handler, data):
+    """Case factory for a callback handler; data may be a string or a function of the user ID."""
+    def run(bot, user_id):
+        payload = data(user_id) if callable(data) else data
+        return handler(callback_update(bot, user_id, payload), FakeContext(bot))
+    return run
+
+
+HANDLER_CASES = [
+    ("/start", command(game_commands.start, "/start")),
+    ("/spaceship", command(game_commands.spaceship_status, "/spaceship")),
+    ("/explore", command(game_commands.explore, "/explore")),
+    ("travel_1", tap(game_commands.travel_callback, "travel_1")),
+    ("/upgrade", command(game_commands.upgrade, "/upgrade")),
+    ("upgrade_weapons", tap(game_commands.upgrade_callback, "upgrade_weapons")),
+    ("/shop", command(shop.shop, "/shop")),
+    ("shop_item", tap(shop.shop_callback, lambda uid: f"shop_item_{uid % 30 + 1}")),
+    ("shop_trade", tap(shop.shop_callback, "shop_trade")),
+    ("/battle", command(game_commands.battle, "/battle")),
+    ("/steal", command(game_commands.steal_resources, "/steal")),
+    ("/crew", command(crew.crew_status, "/crew")),
+    ("/recruit", command(crew.recruit_crew, "/recruit")),
+    ("/missions", command(missions.missions, "/missions")),
+    ("mission_accept", tap(missions.mission_callback, "mission_accept")),
+    ("/alliance", command(alliance.alliance_menu, "/alliance")),
+    ("alliance_view", tap(alliance.alliance_callback, "alliance_view")),
+    ("alliance_page", tap(alliance.alliance_callback, "alliance_page_next_10")),
+    ("/scan", command(scanning.scan, "/scan")),
+    ("/raid", command(raids.raid, "/raid")),
+    ("/pvp", command(pvp.pvp, "/pvp")),
+]
+
+
+def seed(players: int, rng: random.Random):
+    """Create players, a few alliances, some crew and the mission pool through the database API."""
+    alliances = [database.create_alliance(f"Alliance {n}") for n in range(max(players // 50, 1))]
+    for user_id in range(1, players + 1):
+        database.add_player(user_id, f"user{user_id}")
+        database.add_crew_member(user_id, "Sam", "pilot")
+        if user_id % 2:
+            database.join_alliance(user_id, rng.choice(alliances))
+    player_index.levels.load(database.get_player_levels())
+    missions.fill_mission_pool()
+
+
+def run(players: int, iterations: int, backend: str, only=None, seed_value: int = 1234):
+    """Seed a fresh backend, then time every handler case. Returns result rows."""
+    rng = random.Random(seed_value)
+    workdir = tempfile.mkdtemp(prefix="space_handlers_")
+    try:
+        if backend == "sqlite":
+            database.set_backend("sqlite", filename=os.path.join(workdir, "bench.db"))
+        else:
+            database.set_backend(backend)
+        database.init_db()
+        seed(players, rng)
+        bot = FakeBot()
+        user_ids = [rng.randint(1, players) for _ in range(iterations)]
+        results = []
+        print_table([], ())
+        for name, case in HANDLER_CASES:
+            if only and name not in only:
+                continue
+            latencies = time_calls(lambda i: case(bot, user_ids[i]), iterations)
+            row = {"backend": backend, "handler": name, "replies": len(bot.calls)}
+            row.update(summarize(latencies, sum(latencies) / 1e9))
+            row["histogram"] = histogram(latencies)
+            results.append(row)
+            print_table([row], ("backend", "handler"), header=False)
+            bot.clear()
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=1000, help="players to seed (default: %(default)s)")
+    parser.add_argument("--iterations", type=int, default=500, help="calls per handler (default: %(default)s)")
+    parser.add_argument("--backend", choices=sorted(database.BACKENDS), default="memory")
+    parser.add_argument("--only", help="comma-separated handler names to run, e.g. /shop,travel_1")
+    parser.add_argument("--seed", type=int, default=1234, help="random seed")
+    parser.add_argument("--output", default="bench_handlers.json", help="JSON results file")
+    parser.add_argument("--compare", help="earlier JSON results file to compare p50 latency against")
+    args = parser.parse_args()
+
+    only = set(args.only.split(",")) if args.only else None
+    results = run(args.players, args.iterations, args.backend, only, args.seed)
+    write_results(args.output, "handlers", results, vars(args))
+    print(f"\nWrote {len(results)} results to {args.output}")
+    if args.compare:
+        compare_results(args.compare, results, ("backend", "handler"))
+
+
+if __name__ == "__main__":
+    main()
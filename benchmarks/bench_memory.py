@@ -0,0 +1,198 @@
+"""
+bench_memory.py - Bytes per entity for ships, crew members, missions and battles.
+Uses tracemalloc to measure what N live entities cost in each representation:
+the dict rows, __dict__-backed classes and list-of-strings battle logs the bot used
+before, against the entity records, slotted classes and compact battle logs it uses now.
+Rows are read from a real SQLite file so field values are allocated as in production.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_memory --count 10000 --output memory.json
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import tracemalloc
+
+import config
+import database
+from battles import Battle
+from entities import ShipRecord, CrewMember, Mission, columns, row_factory
+from spaceship import Spaceship
+from benchmarks.common import write_results
+
+
+class DictSpaceship:
+    """The previous Spaceship layout: the same attributes in a per-instance __dict__."""
+
+    def __init__(self, record: ShipRecord):
+        self.telegram_id = record.telegram_id
+        self.fuel = record.fuel
+        self.oxygen = record.oxygen
+        self.energy = record.energy
+        self.cargo = record.cargo
+        self.weapons = record.weapons
+        self.shields = record.shields
+        self.crew = record.crew
+
+
+class DictBattle:
+    """The previous Battle layout: a per-instance __dict__ and a list of f-string log lines."""
+
+    def __init__(self, battle: Battle):
+        self.telegram_id = battle.telegram_id
+        self.enemy_type = battle.enemy_type
+        self.turn = battle.turn
+        self.player_health = battle.player_health
+        self.enemy_health = battle.enemy_health
+        self.battle_over = battle.battle_over
+        self.battle_log = battle.battle_log
+
+
+def measure(build, count: int) -> float:
+    """Return the bytes per entity still allocated after build(count) returns a list of count entities."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        entities = build(count)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    # The list holding the entities is the same size in every representation.
+    return (after - before - entities.__sizeof__()) / count
+
+
+def seed(filename: str, count: int, rng: random.Random):
+    """Create a database with count ships, crew members and missions."""
+    database.SQLiteStorage(filename).init_db()
+    conn = sqlite3.connect(filename)
+    conn.executemany("INSERT INTO spaceship (telegram_id, fuel, oxygen, energy, cargo, weapons, shields, crew) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     [(tid, rng.randint(0, 200), rng.randint(0, 100), rng.randint(0, 100), rng.randint(0, 50),
+                       rng.randint(10, 80), rng.randint(20, 150), rng.randint(1, 10)) for tid in range(1, count + 1)])
+    conn.executemany("INSERT INTO crew (telegram_id, name, skill, level) VALUES (?, ?, ?, ?)",
+                     [(tid, f"crew{tid}", rng.choice(config.CREW_SKILLS), rng.randint(1, 5))
+                      for tid in range(1, count + 1)])
+    conn.executemany("INSERT INTO missions (telegram_id, description, reward, status, time_limit) "
+                     "VALUES (?, ?, ?, 'active', ?)",
+                     [(tid, "Synthetic mission", rng.randint(20, 100), rng.randint(60, 300))
+                      for tid in range(1, count + 1)])
+    conn.commit()
+    conn.close()
+
+
+def fetch_dicts(filename: str, table: str, entity):
+    """Build entities the old way: sqlite3.Row copied into a dict per row."""
+    def build(count: int):
+        conn = sqlite3.connect(filename)
+        conn.row_factory = sqlite3.Row
+        rows = [dict(r) for r in conn.execute(f"SELECT {columns(entity)} FROM {table} LIMIT ?", (count,))]
+        conn.close()
+        return rows
+    return build
+
+
+def fetch_records(filename: str, table: str, entity):
+    """Build entities the current way: the row factory materializes records directly."""
+    def build(count: int):
+        conn = sqlite3.connect(filename)
+        conn.row_factory = row_factory(entity)
+        rows = conn.execute(f"SELECT {columns(entity)} FROM {table} LIMIT ?", (count,)).fetchall()
+        conn.close()
+        return rows
+    return build
+
+
+def slotted_ship(record: ShipRecord) -> Spaceship:
+    """Fill a Spaceship from a record without going through the database."""
+    ship = Spaceship.__new__(Spaceship)
+    ship.telegram_id = record.telegram_id
+    ship.fuel = record.fuel
+    ship.oxygen = record.oxygen
+    ship.energy = record.energy
+    ship.cargo = record.cargo
+    ship.weapons = record.weapons
+    ship.shields = record.shields
+    ship.crew = record.crew
+    return ship
+
+
+def copy_battle(battle: Battle) -> Battle:
+    """Copy a finished battle, including its compact log, into a new slotted instance."""
+    copy = Battle.__new__(Battle)
+    for name in Battle.__slots__:
+        setattr(copy, name, getattr(battle, name))
+    copy.log = battle.log[:]
+    return copy
+
+
+def finished_battles(count: int, seed_value: int):
+    """Fight count battles to the end without sleeping or writing event logs."""
+    rng_state = random.getstate()
+    random.seed(seed_value)
+    battles = []
+    for tid in range(count):
+        battle = Battle(tid, "pirates")
+        while not battle.battle_over:
+            battle.execute_turn()
+        battles.append(battle)
+    random.setstate(rng_state)
+    return battles
+
+
+def run(count: int, seed_value: int = 1234):
+    """Measure every entity in both representations and return the result rows."""
+    workdir = tempfile.mkdtemp(prefix="space_bench_")
+    try:
+        filename = os.path.join(workdir, "bench.db")
+        seed(filename, count, random.Random(seed_value))
+        ships = fetch_records(filename, "spaceship", ShipRecord)(count)
+        battles = finished_battles(count, seed_value)
+        cases = [
+            ("ship row", fetch_dicts(filename, "spaceship", ShipRecord),
+             fetch_records(filename, "spaceship", ShipRecord)),
+            ("crew member", fetch_dicts(filename, "crew", CrewMember),
+             fetch_records(filename, "crew", CrewMember)),
+            ("mission", fetch_dicts(filename, "missions", Mission),
+             fetch_records(filename, "missions", Mission)),
+            ("Spaceship", lambda n: [DictSpaceship(ship) for ship in ships[:n]],
+             lambda n: [slotted_ship(ship) for ship in ships[:n]]),
+            # Battles are copied from the same finished fights, so both layouts hold identical logs.
+            ("Battle", lambda n: [DictBattle(battle) for battle in battles[:n]],
+             lambda n: [copy_battle(battle) for battle in battles[:n]]),
+        ]
+        results = []
+        for entity, before, after in cases:
+            before_bytes, after_bytes = measure(before, count), measure(after, count)
+            results.append({
+                "entity": entity,
+                "count": count,
+                "before_bytes": round(before_bytes, 1),
+                "after_bytes": round(after_bytes, 1),
+                "saving_pct": round((1 - after_bytes / before_bytes) * 100, 1) if before_bytes else 0.0,
+            })
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=10000, help="entities per measurement (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1234, help="random seed for synthetic data")
+    parser.add_argument("--output", default="bench_memory.json", help="JSON results file")
+    args = parser.parse_args()
+
+    results = run(args.count, args.seed)
+    print(f"{'entity':16} {'before B':>10} {'after B':>10} {'saving':>8}")
+    for row in results:
+        print(f"{row['entity']:16} {row['before_bytes']:10.1f} {row['after_bytes']:10.1f} {row['saving_pct']:7.1f}%")
+    write_results(args.output, "memory", results, vars(args))
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+bench_startup.py - Cold start benchmark: time from process start to the first reply.
+Each run is a fresh interpreter that times the startup phases in order: importing the
+Telegram library and main.py, initializing the database, registering handlers and jobs,
+warming the player level index and handling a first /start update.
+
+Two modes are compared against a copy of the same seeded database:
+    lazy   - the current startup: game modules load on first use, init_db skips DDL
+             when the schema version is current, job triggers are preloaded and
+             caches warm after polling starts
+    eager  - the previous startup: every game module imported up front, DDL always run,
+             triggers resolved through entry points and caches warmed before polling
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup --runs 10 --players 100000 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("lazy", "eager")
+
+
+def child(mode: str, filename: str):
+    """Run and time every startup phase in this (fresh) process; print the timings as JSON."""
+    timings = {}
+    clock = time.perf_counter
+
+    start = clock()
+    import telegram.ext
+    timings["import_telegram"] = clock() - start
+
+    start = clock()
+    import main
+    timings["import_main"] = clock() - start
+    import logging
+    logging.disable(logging.INFO)
+
+    if mode == "eager":
+        import importlib
+        start = clock()
+        for module_name in main.HANDLER_MODULES:
+            importlib.import_module(module_name)
+        timings["import_handler_modules"] = clock() - start
+
+    main.config.DATABASE_FILENAME = filename
+    start = clock()
+    main.database.set_backend("sqlite")
+    main.database.init_db(force=(mode == "eager"))
+    timings["init_db"] = clock() - start
+
+    from queue import Queue
+    dispatcher = telegram.ext.Dispatcher(telegram.Bot("123456:startup-benchmark"), Queue())
+    job_queue = telegram.ext.JobQueue()
+    job_queue.set_dispatcher(dispatcher)
+    start = clock()
+    main.register_handlers(dispatcher)
+    if mode == "lazy":
+        main.preload_job_triggers()
+    main.schedule_jobs(job_queue)
+    timings["register_handlers"] = clock() - start
+
+    start = clock()
+    main.warm_caches()
+    timings["warm_caches"] = clock() - start
+
+    from benchmarks.fakes import FakeBot, FakeContext, command_update
+    bot = FakeBot()
+    handler = next(h for h in dispatcher.handlers[0] if getattr(h, "command", None) == ["start"])
+    start = clock()
+    handler.callback(command_update(bot, 10 ** 9, "/start"), FakeContext(bot))
+    timings["first_update"] = clock() - start
+
+    # Time until polling can start, and until the first reply is sent
+    ready = ["import_telegram", "import_main", "import_handler_modules", "init_db", "register_handlers"]
+    if mode == "eager":
+        ready.append("warm_caches")
+    timings["ready_to_poll"] = sum(timings.get(phase, 0.0) for phase in ready)
+    timings["first_reply"] = timings["ready_to_poll"] + timings["first_update"]
+    print(json.dumps(timings))
+
+
+def run(runs: int, players: int, seed: int = 1234):
+    """Seed a database, start runs fresh processes per mode and return per-phase results."""
+    from benchmarks.bench_database import seed_sqlite
+    workdir = tempfile.mkdtemp(prefix="space_bench_")
+    try:
+        seeded = os.path.join(workdir, "seeded.db")
+        print(f"Seeding database with {players} players...")
+        seed_sqlite(seeded, players, random.Random(seed))
+        samples = {mode: {} for mode in MODES}
+        for run_no in range(runs):
+            for mode in MODES:
+                filename = os.path.join(workdir, f"{mode}.db")
+                shutil.copyfile(seeded, filename)
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_startup", "--child", mode, "--database", filename],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                for phase, seconds in json.loads(output.strip().splitlines()[-1]).items():
+                    samples[mode].setdefault(phase, []).append(seconds * 1000)
+            print(f"Run {run_no + 1}/{runs} done")
+        results = []
+        for mode in MODES:
+            for phase, values in samples[mode].items():
+                results.append({
+                    "mode": mode,
+                    "phase": phase,
+                    "runs": len(values),
+                    "median_ms": round(statistics.median(values), 3),
+                    "min_ms": round(min(values), 3),
+                    "max_ms": round(max(values), 3),
+                })
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="fresh processes per mode (default: %(default)s)")
+    parser.add_argument("--players", type=int, default=100000, help="players in the seeded database")
+    parser.add_argument("--seed", type=int, default=1234, help="random seed for synthetic data")
+    parser.add_argument("--output", default="bench_startup.json", help="JSON results file")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--database", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.database)
+        return
+
+    from benchmarks.common import write_results
+    results = run(args.runs, args.players, args.seed)
+    print(f"\n{'mode':8} {'phase':24} {'median ms':>10} {'min ms':>10} {'max ms':>10}")
+    for row in results:
+        print(f"{row['mode']:8} {row['phase']:24} {row['median_ms']:10.2f} {row['min_ms']:10.2f} {row['max_ms']:10.2f}")
+    write_results(args.output, "startup", results, {k: v for k, v in vars(args).items() if k not in ("child", "database")})
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
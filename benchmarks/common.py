@@ -0,0 +1,152 @@
+"""
+common.py - Shared timing, statistics and result-file helpers for the benchmark suites.
+Every suite writes the same JSON layout so runs from different commits can be compared.
+"""
+
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Return the pct-th percentile (0-100) of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100.0 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies_ns: list, elapsed_s: float) -> dict:
+    """Summarize per-call latencies (nanoseconds) as microsecond percentiles plus throughput."""
+    values = sorted(latencies_ns)
+    count = len(values)
+    return {
+        "calls": count,
+        "mean_us": (sum(values) / count / 1000.0) if count else 0.0,
+        "p50_us": percentile(values, 50) / 1000.0,
+        "p90_us": percentile(values, 90) / 1000.0,
+        "p99_us": percentile(values, 99) / 1000.0,
+        "max_us": (values[-1] / 1000.0) if count else 0.0,
+        "throughput_ops": (count / elapsed_s) if elapsed_s > 0 else 0.0,
+    }
+
+
+def histogram(latencies_ns: list) -> dict:
+    """Count latencies in power-of-two microsecond buckets, keyed by each bucket's upper bound."""
+    buckets = {}
+    for ns in latencies_ns:
+        bound = 1
+        while bound * 1000 < ns:
+            bound *= 2
+        buckets[bound] = buckets.get(bound, 0) + 1
+    return {f"le_{bound}us": buckets[bound] for bound in sorted(buckets)}
+
+
+def time_calls(fn, iterations: int) -> list:
+    """Call fn(i) iterations times and return each call's latency in nanoseconds."""
+    clock = time.perf_counter_ns
+    latencies = []
+    append = latencies.append
+    for i in range(iterations):
+        start = clock()
+        fn(i)
+        append(clock() - start)
+    return latencies
+
+
+def run_threads(fn, iterations: int, threads: int):
+    """
+    Split iterations across threads that all start together.
+    Returns (latencies in nanoseconds, wall-clock seconds for the whole run).
+    """
+    if threads <= 1:
+        start = time.perf_counter()
+        latencies = time_calls(fn, iterations)
+        return latencies, time.perf_counter() - start
+
+    per_thread = max(iterations // threads, 1)
+    results = [None] * threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(slot: int):
+        offset = slot * per_thread
+        barrier.wait()
+        results[slot] = time_calls(lambda i: fn(offset + i), per_thread)
+
+    workers = [threading.Thread(target=worker, args=(slot,)) for slot in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return [ns for chunk in results for ns in chunk], elapsed
+
+
+def git_revision() -> str:
+    """Return the current commit hash, or "unknown" outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def environment() -> dict:
+    """Describe the machine and build the results were measured on."""
+    return {
+        "commit": git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def write_results(path: str, suite: str, results: list, parameters: dict = None):
+    """Write results with environment metadata as JSON."""
+    document = {
+        "suite": suite,
+        "environment": environment(),
+        "parameters": parameters or {},
+        "results": results,
+    }
+    with open(path, "w") as handle:
+        json.dump(document, handle, indent=2)
+
+
+def compare_results(baseline_path: str, results: list, key_fields: tuple, metric: str = "p50_us"):
+    """
+    Print each result's metric next to the matching baseline result.
+    Results are matched on key_fields, e.g. ("size", "function", "threads").
+    """
+    with open(baseline_path) as handle:
+        baseline = {tuple(r[k] for k in key_fields): r for r in json.load(handle)["results"]}
+    print(f"\n{'case':60} {'baseline':>12} {'current':>12} {'change':>8}")
+    for result in results:
+        key = tuple(result[k] for k in key_fields)
+        old = baseline.get(key)
+        if old is None or not old.get(metric):
+            continue
+        change = (result[metric] - old[metric]) / old[metric] * 100.0
+        label = " ".join(str(part) for part in key)
+        print(f"{label:60} {old[metric]:12.1f} {result[metric]:12.1f} {change:+7.1f}%")
+
+
+def print_table(results: list, key_fields: tuple, header: bool = True):
+    """Print results as a fixed-width table."""
+    if header:
+        print(f"{'case':60} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9} {'ops/s':>11}")
+    for result in results:
+        label = " ".join(str(result[k]) for k in key_fields)
+        print(f"{label:60} {result['p50_us']:9.1f} {result['p90_us']:9.1f} "
+              f"{result['p99_us']:9.1f} {result['throughput_ops']:11.0f}")
@@ -0,0 +1,171 @@
+"""
+fakes.py - Lightweight stand-ins for python-telegram-bot's Update, Message, CallbackQuery,
+CallbackContext, JobQueue and Bot objects. Handlers can be called directly with them; every reply,
+edit, answer and sent message is recorded instead of going to the network.
+"""
+
+import datetime
+import itertools
+
+_message_ids = itertools.count(1)
+_update_ids = itertools.count(1)
+_query_ids = itertools.count(1)
+
+
+class FakeUser:
+    """Stands in for telegram.User."""
+
+    def __init__(self, user_id: int, username: str = None, first_name: str = "Tester"):
+        self.id = user_id
+        self.username = username if username is not None else f"user{user_id}"
+        self.first_name = first_name
+        self.is_bot = False
+
+
+class FakeChat:
+    """Stands in for telegram.Chat."""
+
+    def __init__(self, chat_id: int):
+        self.id = chat_id
+        self.type = "private"
+
+
+class FakeBot:
+    """Records every outgoing call as (method, chat_id, text, kwargs)."""
+
+    def __init__(self):
+        self.calls = []
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.calls.append(("send_message", chat_id, text, kwargs))
+        return FakeMessage(self, FakeChat(chat_id), None, text)
+
+    def answer_callback_query(self, callback_query_id, text=None, **kwargs):
+        self.calls.append(("answer_callback_query", callback_query_id, text, kwargs))
+        return True
+
+    def clear(self):
+        self.calls.clear()
+
+
+class FakeMessage:
+    """Stands in for telegram.Message; replies and edits are recorded on the bot."""
+
+    def __init__(self, bot: FakeBot, chat: FakeChat, from_user: FakeUser, text: str = None, reply_markup=None):
+        self.bot = bot
+        self.message_id = next(_message_ids)
+        self.chat = chat
+        self.chat_id = chat.id
+        self.from_user = from_user
+        self.text = text
+        self.reply_markup = reply_markup
+        self.date = datetime.datetime.now(datetime.timezone.utc)
+        self.edit_date = None
+
+    def reply_text(self, text, reply_markup=None, **kwargs):
+        self.bot.calls.append(("reply_text", self.chat_id, text, dict(kwargs, reply_markup=reply_markup)))
+        return FakeMessage(self.bot, self.chat, None, text, reply_markup)
+
+    def edit_text(self, text, reply_markup=None, **kwargs):
+        self.bot.calls.append(("edit_text", self.chat_id, text, dict(kwargs, reply_markup=reply_markup)))
+        self.text = text
+        self.reply_markup = reply_markup
+        self.edit_date = datetime.datetime.now(datetime.timezone.utc)
+        return self
+
+
+class FakeCallbackQuery:
+    """Stands in for telegram.CallbackQuery."""
+
+    def __init__(self, bot: FakeBot, from_user: FakeUser, data: str, message: FakeMessage, query_id: str = None):
+        self.bot = bot
+        self.id = query_id or str(next(_query_ids))
+        self.from_user = from_user
+        self.data = data
+        self.message = message
+        self.inline_message_id = None
+
+    def answer(self, text=None, **kwargs):
+        return self.bot.answer_callback_query(self.id, text=text, **kwargs)
+
+    def edit_message_text(self, text, reply_markup=None, **kwargs):
+        return self.message.edit_text(text, reply_markup=reply_markup, **kwargs)
+
+    def edit_message_reply_markup(self, reply_markup=None, **kwargs):
+        self.bot.calls.append(("edit_reply_markup", self.message.chat_id, None, {"reply_markup": reply_markup}))
+        self.message.reply_markup = reply_markup
+        return self.message
+
+
+class FakeUpdate:
+    """Stands in for telegram.Update."""
+
+    def __init__(self, user: FakeUser, chat: FakeChat, message: FakeMessage = None,
+                 callback_query: FakeCallbackQuery = None):
+        self.update_id = next(_update_ids)
+        self.effective_user = user
+        self.effective_chat = chat
+        self.message = message
+        self.effective_message = message or (callback_query.message if callback_query else None)
+        self.callback_query = callback_query
+
+
+class FakeJob:
+    """Stands in for telegram.ext.Job."""
+
+    def __init__(self, callback, context=None, name=None):
+        self.callback = callback
+        self.context = context
+        self.name = name or getattr(callback, "__name__", None)
+
+
+class FakeJobQueue:
+    """
+    Stands in for telegram.ext.JobQueue. Jobs run straight away on the calling thread,
+    ignoring their delay; jobs scheduled by a running job run after it returns.
+    """
+
+    def __init__(self, bot: FakeBot):
+        self.bot = bot
+        self.pending = []
+        self.running = False
+
+    def run_once(self, callback, when, context=None, name=None):
+        job = FakeJob(callback, context, name)
+        self.pending.append(job)
+        if not self.running:
+            self.running = True
+            try:
+                while self.pending:
+                    next_job = self.pending.pop(0)
+                    next_job.callback(FakeContext(self.bot, job=next_job, job_queue=self))
+            finally:
+                self.running = False
+        return job
+
+
+class FakeContext:
+    """Stands in for telegram.ext.CallbackContext."""
+
+    def __init__(self, bot: FakeBot, args=None, job=None, job_queue=None):
+        self.bot = bot
+        self.args = args or []
+        self.job = job
+        self.job_queue = job_queue or FakeJobQueue(bot)
+        self.user_data = {}
+        self.chat_data = {}
+        self.bot_data = {}
+
+
+def command_update(bot: FakeBot, user_id: int, text: str) -> FakeUpdate:
+    """Build an update carrying a text command such as "/spaceship"."""
+    user, chat = FakeUser(user_id), FakeChat(user_id)
+    return FakeUpdate(user, chat, message=FakeMessage(bot, chat, user, text))
+
+
+def callback_update(bot: FakeBot, user_id: int, data: str, query_id: str = None,
+                    message: FakeMessage = None) -> FakeUpdate:
+    """Build an update carrying an inline button tap with the given callback data."""
+    user, chat = FakeUser(user_id), FakeChat(user_id)
+    message = message or FakeMessage(bot, chat, None, "Menu")
+    return FakeUpdate(user, chat, callback_query=FakeCallbackQuery(bot, user, data, message, query_id))
@@ -0,0 +1,362 @@
+"""
+loadgen.py - Synthetic load generator replaying realistic player sessions against the bot.
+Builds a real Dispatcher with the handlers from main.register_handlers and a Bot whose
+HTTP layer is replaced by a local stand-in for the Telegram API. Simulated players
+follow a configurable mix of sessions (explore, scan, battle, shop, upgrade, missions...)
+with exponential think times, and real telegram.Update objects are fed to the dispatcher.
+
+Reports throughput, end-to-end latency, update queue depth and time spent waiting
+on the storage lock, so the capacity of a single bot process can be measured.
+
+Usage (from the repository root):
+    python -m benchmarks.loadgen --players 20000 --think-time 5 --duration 60
+    python -m benchmarks.loadgen --mix explore=4,scan=2,battle=1 --backend memory
+"""
+
+import argparse
+import heapq
+import itertools
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from queue import Queue
+
+from telegram import Bot, Update
+from telegram.ext import Dispatcher, JobQueue, TypeHandler
+from telegram.utils.request import Request
+
+import config
+import database
+import player_index
+import missions
+import main as bot_main
+from benchmarks.common import percentile, summarize, write_results
+from benchmarks.bench_database import seed_sqlite, seed_memory
+
+logger = logging.getLogger(__name__)
+
+# Each session is the sequence of updates a player sends, with think time between steps.
+SESSIONS = {
+    "status": lambda rng: ["/spaceship"],
+    "explore": lambda rng: ["/explore", f"travel_{rng.randint(1, 3)}"],
+    "scan": lambda rng: ["/scan"],
+    "battle": lambda rng: ["/battle"],
+    "shop": lambda rng: ["/shop", rng.choice([f"shop_item_{rng.randint(1, 30)}", "shop_trade"])],
+    "upgrade": lambda rng: ["/upgrade", f"upgrade_{rng.choice(['engines', 'shields', 'weapons'])}"],
+    "missions": lambda rng: ["/missions", "mission_accept"],
+    "crew": lambda rng: ["/crew"],
+    "alliance": lambda rng: ["/alliance", "alliance_view"],
+    "steal": lambda rng: ["/steal"],
+}
+DEFAULT_MIX = "status=4,explore=3,scan=3,battle=1,shop=2,upgrade=2,missions=2,crew=1,alliance=1,steal=1"
+
+
+class LocalTelegramAPI(Request):
+    """
+    Stand-in for the Telegram Bot API HTTP layer.
+    Answers every method locally with a well-formed result and counts calls per method.
+    An optional fixed delay simulates network round trips.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls = {}
+        self._message_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def post(self, url, data, timeout=None):
+        method = url.rsplit("/", 1)[-1]
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "LoadBot", "username": "load_bot"}
+        if method in ("sendMessage", "editMessageText", "editMessageReplyMarkup"):
+            chat_id = int(data.get("chat_id") or 0)
+            return {
+                "message_id": int(data.get("message_id") or next(self._message_ids)),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": data.get("text", ""),
+            }
+        return True
+
+    def retrieve(self, url, timeout=None):
+        return b""
+
+
+class UpdateFactory:
+    """Builds real telegram.Update objects for commands and button taps."""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self.update_ids = itertools.count(1)
+        self.query_ids = itertools.count(1)
+
+    def _user(self, user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": "Player", "username": f"player{user_id}"}
+
+    def build(self, user_id: int, step: str) -> Update:
+        now = int(time.time())
+        chat = {"id": user_id, "type": "private"}
+        if step.startswith("/"):
+            payload = {
+                "update_id": next(self.update_ids),
+                "message": {
+                    "message_id": 1, "date": now, "chat": chat, "from": self._user(user_id), "text": step,
+                    "entities": [{"type": "bot_command", "offset": 0, "length": len(step)}],
+                },
+            }
+        else:
+            update_id = next(self.update_ids)
+            # Every tap is on its own menu message, so none looks like a repeat of an earlier tap
+            payload = {
+                "update_id": update_id,
+                "callback_query": {
+                    "id": str(next(self.query_ids)), "from": self._user(user_id), "chat_instance": str(user_id),
+                    "data": step, "message": {"message_id": update_id, "date": now, "chat": chat, "text": "Menu"},
+                },
+            }
+        return Update.de_json(payload, self.bot)
+
+
+class TimingLock:
+    """Wraps a lock and accumulates how long callers waited to acquire it."""
+
+    def __init__(self, lock):
+        self.lock = lock
+        self.waits = []
+
+    def acquire(self, *args, **kwargs):
+        start = time.perf_counter_ns()
+        acquired = self.lock.acquire(*args, **kwargs)
+        self.waits.append(time.perf_counter_ns() - start)
+        return acquired
+
+    def release(self):
+        self.lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def parse_mix(text: str) -> dict:
+    """Parse "explore=3,scan=2" into {"explore": 3, "scan": 2}."""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SESSIONS:
+            raise ValueError(f"Unknown session type {name!r}; choose from {', '.join(SESSIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class LoadGenerator:
+    """Schedules simulated players and feeds their updates into a dispatcher's queue."""
+
+    def __init__(self, dispatcher: Dispatcher, factory: UpdateFactory, players: int, mix: dict,
+                 think_time: float, max_queue: int, seed: int):
+        self.dispatcher = dispatcher
+        self.factory = factory
+        self.players = players
+        self.sessions = list(mix)
+        self.weights = [mix[name] for name in self.sessions]
+        self.think_time = think_time
+        self.max_queue = max_queue
+        self.rng = random.Random(seed)
+        self.pending = {}
+        self.latencies = []
+        self.queue_depths = []
+        self.sent = 0
+        self.shed = 0
+        self.errors = 0
+        self.stopped = threading.Event()
+
+    def on_processed(self, update, context):
+        """Group-late handler: runs after the game handlers finished with the update."""
+        enqueued = self.pending.pop(update.update_id, None)
+        if enqueued is not None:
+            self.latencies.append(time.perf_counter_ns() - enqueued)
+
+    def on_error(self, update, context):
+        self.errors += 1
+        logger.debug("Handler error during load test", exc_info=context.error)
+
+    def generate(self, duration: float):
+        """Run the player schedule for duration seconds."""
+        rng = self.rng
+        start = time.monotonic()
+        # Stagger first actions across one think time so players do not all start at once.
+        schedule = [(start + rng.expovariate(1.0 / self.think_time), tid, None)
+                    for tid in range(1, self.players + 1)]
+        heapq.heapify(schedule)
+        update_queue = self.dispatcher.update_queue
+        while not self.stopped.is_set():
+            now = time.monotonic()
+            if now - start >= duration:
+                break
+            if not schedule or schedule[0][0] > now:
+                time.sleep(min(schedule[0][0] - now, 0.005) if schedule else 0.005)
+                continue
+            _, user_id, steps = heapq.heappop(schedule)
+            if not steps:
+                session = rng.choices(self.sessions, weights=self.weights)[0]
+                steps = SESSIONS[session](rng)
+            if update_queue.qsize() >= self.max_queue:
+                # Shed load instead of letting the queue grow without bound
+                self.shed += 1
+            else:
+                update = self.factory.build(user_id, steps[0])
+                self.pending[update.update_id] = time.perf_counter_ns()
+                update_queue.put(update)
+                self.sent += 1
+            heapq.heappush(schedule, (now + rng.expovariate(1.0 / self.think_time), user_id, steps[1:]))
+
+    def monitor(self, interval: float = 0.1):
+        """Sample the update queue depth until stopped."""
+        while not self.stopped.wait(interval):
+            self.queue_depths.append(self.dispatcher.update_queue.qsize())
+
+    def refill_missions(self, interval: float):
+        """Run the bot's mission pool refill job every interval seconds until stopped."""
+        while not self.stopped.wait(interval):
+            missions.fill_mission_pool()
+
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="space_load_")
+    rng = random.Random(args.seed)
+    try:
+        print(f"Seeding {args.backend} storage with {args.players} players...")
+        if args.backend == "sqlite":
+            storage = seed_sqlite(os.path.join(workdir, "load.db"), args.players, rng)
+        else:
+            storage = seed_memory(args.players, rng)
+        timing_lock = TimingLock(storage.lock)
+        storage.lock = timing_lock
+        database.set_backend(storage)
+        player_index.levels.load(database.get_player_levels())
+        missions.fill_mission_pool()
+
+        api = LocalTelegramAPI(latency=args.api_latency / 1000.0)
+        bot = Bot(token="123456:LOADTEST", request=api)
+        job_queue = JobQueue()
+        dispatcher = Dispatcher(bot, Queue(), workers=args.workers, job_queue=job_queue, use_context=True)
+        job_queue.set_dispatcher(dispatcher)
+        bot_main.register_handlers(dispatcher)
+        generator = LoadGenerator(dispatcher, UpdateFactory(bot), args.players, parse_mix(args.mix),
+                                  args.think_time, args.max_queue, args.seed)
+        dispatcher.add_handler(TypeHandler(Update, generator.on_processed), group=1000)
+        dispatcher.add_error_handler(generator.on_error)
+
+        patches = []
+        if not args.battle_sleeps:
+            # Battle turns are jobs spaced out in time; play them back to back instead.
+            patches.append((config, "BATTLE_TURN_DELAY", config.BATTLE_TURN_DELAY))
+            config.BATTLE_TURN_DELAY = 0
+
+        dispatch_thread = threading.Thread(target=dispatcher.start, name="loadgen_dispatcher", daemon=True)
+        monitor_thread = threading.Thread(target=generator.monitor, name="loadgen_monitor", daemon=True)
+        refill_thread = threading.Thread(target=generator.refill_missions, args=(args.mission_refill,),
+                                         name="loadgen_missions", daemon=True)
+        job_queue.start()
+        dispatch_thread.start()
+        monitor_thread.start()
+        refill_thread.start()
+        print(f"Running {args.players} players for {args.duration}s...")
+        started = time.monotonic()
+        timing_lock.waits.clear()
+        try:
+            generator.generate(args.duration)
+            # Drain what is already queued, within a grace period
+            deadline = time.monotonic() + args.drain_timeout
+            while dispatcher.update_queue.qsize() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            elapsed = time.monotonic() - started
+        finally:
+            generator.stopped.set()
+            dispatcher.stop()
+            job_queue.stop()
+            for module, name, original in patches:
+                setattr(module, name, original)
+
+        depths = sorted(generator.queue_depths)
+        waits = sorted(timing_lock.waits)
+        report = {
+            "backend": args.backend,
+            "players": args.players,
+            "think_time_s": args.think_time,
+            "offered_rate": (generator.sent + generator.shed) / args.duration,
+            "sent": generator.sent,
+            "completed": len(generator.latencies),
+            "shed": generator.shed,
+            "errors": generator.errors,
+            "queue_depth_mean": (sum(depths) / len(depths)) if depths else 0,
+            "queue_depth_p99": percentile(depths, 99),
+            "queue_depth_max": depths[-1] if depths else 0,
+            "lock_acquisitions": len(waits),
+            "lock_wait_total_s": sum(waits) / 1e9,
+            "lock_wait_p50_us": percentile(waits, 50) / 1000.0,
+            "lock_wait_p99_us": percentile(waits, 99) / 1000.0,
+            "api_calls": dict(api.calls),
+        }
+        latency = summarize(generator.latencies, elapsed)
+        latency["p999_us"] = percentile(sorted(generator.latencies), 99.9) / 1000.0
+        report.update(latency)
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(report: dict):
+    print(f"\nOffered load:     {report['offered_rate']:.0f} updates/s from {report['players']} players")
+    print(f"Throughput:       {report['throughput_ops']:.0f} updates/s "
+          f"({report['completed']} completed, {report['shed']} shed, {report['errors']} errors)")
+    print(f"Latency:          p50 {report['p50_us'] / 1000:.1f} ms, p99 {report['p99_us'] / 1000:.1f} ms, "
+          f"p99.9 {report['p999_us'] / 1000:.1f} ms, max {report['max_us'] / 1000:.1f} ms")
+    print(f"Queue depth:      mean {report['queue_depth_mean']:.0f}, p99 {report['queue_depth_p99']}, "
+          f"max {report['queue_depth_max']}")
+    print(f"Storage lock:     {report['lock_acquisitions']} acquisitions, "
+          f"{report['lock_wait_total_s']:.2f}s waiting, p99 wait {report['lock_wait_p99_us']:.0f} us")
+    print(f"Telegram API:     {report['api_calls']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=20000, help="simulated players (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of load (default: %(default)s)")
+    parser.add_argument("--think-time", type=float, default=5.0,
+                        help="mean seconds between a player's actions (default: %(default)s)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="session weights (default: %(default)s)")
+    parser.add_argument("--backend", choices=sorted(database.BACKENDS), default="sqlite")
+    parser.add_argument("--workers", type=int, default=4, help="dispatcher worker threads for run_async handlers")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="simulated Telegram API latency in ms")
+    parser.add_argument("--max-queue", type=int, default=100000, help="shed new updates above this queue depth")
+    parser.add_argument("--drain-timeout", type=float, default=30.0, help="seconds to let the queue drain")
+    parser.add_argument("--mission-refill", type=float, default=config.MISSION_POOL_INTERVAL,
+                        help="seconds between mission pool refills (default: %(default)s)")
+    parser.add_argument("--battle-sleeps", action="store_true", help="keep the pause between battle turns")
+    parser.add_argument("--seed", type=int, default=1234, help="random seed")
+    parser.add_argument("--output", default="bench_load.json", help="JSON results file")
+    args = parser.parse_args()
+
+    # main.py configures INFO logging on import; per-action game logs would swamp the run.
+    logging.getLogger().setLevel(logging.WARNING)
+    report = run(args)
+    print_report(report)
+    write_results(args.output, "load", [report], vars(args))
+    print(f"\nWrote results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,9 @@ TELEGRAM_API_TOKEN = "YOUR_TELEGRAM_BOT_API_TOKEN"
 # SQLite database filename
 DATABASE_FILENAME = "space_game.db"
 
+# Storage engine selected at startup: "sqlite" (persistent) or "memory" (tests/benchmarks)
+STORAGE_BACKEND = "sqlite"
+
 # Starting resources and spaceship stats
 STARTING_FUEL = 100
 STARTING_OXYGEN = 100
@@ -37,12 +40,54 @@ EVENT_PROBABILITIES = {
 
 # Battle settings
 BATTLE_TURN_TIME = 10  # seconds per turn
+BATTLE_TURN_DELAY = 0.5  # seconds between the turns of a /battle, each played by its own job
+
+# PvP matchmaking settings (ratings come from SHIP_POWER_WEIGHTS)
+PVP_BUCKET_WIDTH = 25  # rating span covered by one queue bucket
+PVP_BASE_WINDOW = 25  # initial accepted rating difference
+PVP_WINDOW_GROWTH = 5  # rating points the window widens per second of waiting
+PVP_MAX_WINDOW = 300  # widest accepted rating difference
+PVP_MATCH_INTERVAL = 5  # seconds between matchmaking passes over the queue
+PVP_QUEUE_TIMEOUT = 300  # seconds before a waiting player is removed from the queue
 
 # Crew skills available for recruitment
 CREW_SKILLS = ["pilot", "engineer", "gunner", "scientist", "medic"]
+# Bonus per summed crew level of a skill: pilot cuts travel fuel cost, gunner raises battle
+# damage, scientist improves scan results, engineer boosts shield repairs
+CREW_BONUS_PER_LEVEL = {"pilot": 0.03, "gunner": 0.03, "scientist": 0.04, "engineer": 0.05}
+CREW_BONUS_CAP = 0.5  # largest bonus any one skill can give
+CREW_MAX_LEVEL = 10
+CREW_TRAINING_TIME = 3600  # seconds of training per current level before a crew member levels up
+CREW_TRAINING_INTERVAL = 600  # seconds between crew training passes
+
+# Pool of pre-generated missions that /missions accepts are claimed from
+MISSION_POOL_SIZE = 1000  # unclaimed missions the generator fills the pool up to
+MISSION_POOL_MIN = 250  # the pool is refilled once fewer than this many are left
+MISSION_POOL_BATCH = 200  # missions inserted per transaction while refilling
+MISSION_POOL_INTERVAL = 30  # seconds between pool checks
+
+# Steal settings
+STEAL_SUCCESS_CHANCE = 50  # percent
+STEAL_LEVEL_WINDOW = 5  # spaceship levels either side of the thief's that may be targeted
+STEAL_SAMPLE_ATTEMPTS = 8  # random draws per level bucket before widening
+STEAL_VICTIM_COOLDOWN = 3600  # seconds before the same victim can be robbed again
+STEAL_CREDIT_FRACTION = 0.1  # share of the victim's credits taken
+STEAL_MAX_CREDITS = 50
 
 # Alliance settings
 ALLIANCE_JOIN_COST = 50
+ALLIANCE_PAGE_SIZE = 10  # alliances shown per page of the alliance browser
+
+# Alliance raid settings
+RAID_ROUND_INTERVAL = 60  # seconds between resolved raid rounds
+RAID_MAX_ROUNDS = 30  # the boss escapes if still alive after this many rounds
+RAID_DAMAGE_PER_WEAPON = 1.5  # base damage each weapons point deals per round
+RAID_DAMAGE_PER_CREW = 2  # flat damage each crew member adds per round
+RAID_DAMAGE_VARIANCE = 0.25  # +/- spread applied to every participant's roll
+RAID_REWARD_CREDITS = 150  # paid to every participant when the boss is defeated
+
+# Weights used to rate a ship's combat power (alliance fleet power, matchmaking)
+SHIP_POWER_WEIGHTS = {"weapons": 2, "shields": 1, "crew": 5}
 
 # Total number of different conditions affecting gameplay (for extended events)
 CONDITIONS_COUNT = 30
@@ -51,5 +96,71 @@ CONDITIONS_COUNT = 30
 SHIP_REPAIR_COST = 20
 SHOP_PRICE_MODIFIER = 1.2
 
+# Telegram user IDs allowed to run operator commands such as /stats
+ADMIN_IDS = []
+
+# Metrics: handler/job/database latency histograms exported in Prometheus format
+METRICS_ENABLED = True
+METRICS_FILE = "space_game.prom"  # rewritten every METRICS_EXPORT_INTERVAL seconds
+METRICS_EXPORT_INTERVAL = 30
+METRICS_PORT = None  # set to e.g. 9464 to also serve http://127.0.0.1:<port>/metrics
+STATS_TOP_N = 8  # rows per section in /stats
+
+# Slow update capture: updates slower than this many seconds are kept for /slow (None disables)
+SLOW_REQUEST_THRESHOLD = 0.5
+SLOW_REQUEST_LOG_SIZE = 50
+SLOW_REQUEST_MAX_STATEMENTS = 100  # SQL statements kept per update
+
+# Session state (user_data/chat_data/bot_data) persisted in the game database
+PERSISTENCE_ENABLED = True
+PERSISTENCE_FLUSH_INTERVAL = 10  # seconds between batched writes of changed entries
+PERSISTENCE_MAX_PENDING = 500  # flush early once this many changed entries are queued
+
+# Event logs are stored in one partition per time window; expired partitions are archived, then dropped
+EVENT_PARTITION_DAYS = 7
+EVENT_RETENTION_DAYS = 90  # partitions whose window ended longer ago than this are archived
+EVENT_ARCHIVE_DIR = "archive"  # gzip-compressed CSV files, one per archived partition
+EVENT_ARCHIVE_INTERVAL = 3600  # seconds between retention passes
+EVENT_ARCHIVE_CHUNK = 5000  # rows read from the database at a time while archiving
+HISTORY_PAGE_SIZE = 10  # events shown per page of /history
+
+# Online database snapshots (/backup, /restore), taken without pausing the bot
+BACKUP_DIR = "backups"
+BACKUP_INTERVAL = 6 * 3600  # seconds between scheduled snapshots (None disables)
+BACKUP_KEEP = 8  # newest snapshots kept; older ones are deleted
+BACKUP_PAGES_PER_STEP = 256  # database pages copied per backup step
+BACKUP_STEP_PAUSE = 0.005  # seconds slept between steps
+
+# Analytics export (/export, python -m export): chunked, from a read-only snapshot
+EXPORT_DIR = "exports"
+EXPORT_CHUNK_ROWS = 5000  # rows fetched and written at a time
+EXPORT_PARQUET_COMPRESSION = "zstd"
+
+# Admin /economy report windows, read from the hourly and daily activity rollups
+ECONOMY_HOURS = 24
+ECONOMY_DAYS = 7
+
+# Rendered /spaceship, /crew and /missions replies kept until the player's data changes
+RENDER_CACHE_SIZE = 20000  # least recently viewed replies are evicted beyond this
+
+# Incoming update throttling: each player's updates run one at a time, in arrival order
+DISPATCHER_WORKERS = 8  # worker threads running handlers, so different players run in parallel
+THROTTLE_RATE = 1.0  # updates per second a player may sustain
+THROTTLE_BURST = 5  # updates a player may send at once after being idle
+THROTTLE_MAX_QUEUED = 3  # updates of one player waiting or running before new ones are dropped
+THROTTLE_MAX_WAIT = 60  # seconds an update waits for the player's previous one before running anyway
+
+# Repeated inline button presses (redeliveries, double taps) answered from a cache instead of re-run
+DEDUPE_TTL = 300  # seconds a press is remembered
+DEDUPE_MAX_ENTRIES = 20000
+
+# On-demand sampling profiler (/profile), written as collapsed stacks for flamegraphs
+PROFILE_DIR = "profiles"
+PROFILE_DEFAULT_SECONDS = 30
+PROFILE_MAX_SECONDS = 300
+PROFILE_SAMPLE_INTERVAL = 0.01  # seconds between stack samples
+PROFILE_THREAD_PATTERN = r":dispatcher$|:worker:|^ThreadPoolExecutor|^APScheduler"  # thread names sampled
+PROFILE_INCLUDE_IDLE = False  # also count threads blocked in threading waits
+
 # Log file setup (path or file name)
 LOG_FILE = "space_game.log"
\ No newline at end of file
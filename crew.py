@@ -1,6 +1,9 @@
 """
 crew.py - Implements crew management functionalities.
-Handles viewing, recruiting, and managing crew members.
+Handles viewing, recruiting, training and the gameplay bonuses of crew members.
+Each skill's bonus grows with the summed level of the crew members holding it:
+pilots cut travel fuel cost, gunners raise battle damage, scientists improve scan
+results and engineers boost shield repairs.
 """
 
 import random
@@ -10,29 +13,66 @@ from telegram.ext import CallbackContext
 
 import config
 import database
+import render_cache
 
 logger = logging.getLogger(__name__)
 
+# What each skill's bonus does, for /crew
+BONUS_EFFECTS = {
+    "pilot": "less fuel per sector",
+    "gunner": "more battle damage",
+    "scientist": "better scan results",
+    "engineer": "stronger shield repairs",
+}
+
+
+def skill_bonuses(telegram_id: int) -> dict:
+    """Return {skill: bonus fraction} for the player's crew, read from the maintained crew aggregate."""
+    levels = database.get_crew_bonuses(telegram_id)
+    return {skill: min(levels.get(skill, 0) * per_level, config.CREW_BONUS_CAP)
+            for skill, per_level in config.CREW_BONUS_PER_LEVEL.items()}
+
+
+def skill_bonus(telegram_id: int, skill: str) -> float:
+    """Return the bonus fraction (0 to CREW_BONUS_CAP) the player's crew gives for one skill."""
+    return skill_bonuses(telegram_id)[skill]
+
+
+def render_crew(telegram_id: int) -> str:
+    """Build the /crew reply: crew members and their bonuses."""
+    crew_list = database.get_crew(telegram_id)
+    if not crew_list:
+        return "You have no crew members. Use /recruit to add one."
+    lines = ["Crew Members:"]
+    lines.extend(f"- {member.name} (Skill: {member.skill}, Level: {member.level})" for member in crew_list)
+    bonuses = [f"- {skill}: +{bonus:.0%} {BONUS_EFFECTS[skill]}"
+               for skill, bonus in skill_bonuses(telegram_id).items() if bonus]
+    if bonuses:
+        lines.append("")
+        lines.append("Crew bonuses:")
+        lines.extend(bonuses)
+    return "\n".join(lines) + "\n"
+
 
 def crew_status(update: Update, context: CallbackContext):
-    """Handle the /crew command to display current crew members."""
+    """Handle the /crew command to display current crew members, rendered at most once per crew change."""
     user = update.effective_user
-    crew_list = database.get_crew(user.id)
-    if not crew_list:
-        update.message.reply_text("You have no crew members. Use /recruit to add one.")
-    else:
-        text = "Crew Members:\n"
-        for member in crew_list:
-            text += f"- {member['name']} (Skill: {member['skill']}, Level: {member['level']})\n"
-        update.message.reply_text(text)
+    update.message.reply_text(render_cache.replies.render(user.id, "crew", lambda: render_crew(user.id)))
 
 
 def recruit_crew(update: Update, context: CallbackContext):
-    """Handle a command to recruit a new crew member (not directly registered in /start)."""
+    """Handle the /recruit command to recruit a new crew member."""
     user = update.effective_user
     names = ["Alex", "Sam", "Jordan", "Casey", "Riley"]
     name = random.choice(names)
     skill = random.choice(config.CREW_SKILLS)
     database.add_crew_member(user.id, name, skill)
     update.message.reply_text(f"Recruited {name} with skill {skill}!")
-    logger.info(f"Recruited crew member {name} with skill {skill} for user {user.id}.")
\ No newline at end of file
+    logger.info(f"Recruited crew member {name} with skill {skill} for user {user.id}.")
+
+
+def train_crew(context: CallbackContext):
+    """Job: level up every crew member that has finished training, in one database update."""
+    trained = database.train_crew()
+    if trained:
+        logger.info(f"Crew training leveled up {trained} crew members.")
@@ -1,98 +1,494 @@
 """
 database.py - Database interface for the Space Simulation Telegram Game Bot.
 This module uses SQLite to store and retrieve persistent player and game data.
+Game modules call the module-level functions below, which delegate to the active
+storage backend (SQLite by default, or the in-memory engine from storage.py).
 """
 
 import sqlite3
 import threading
+import time
 import logging
 import config
+import player_index
+import render_cache
+from entities import ShipRecord, CrewMember, Mission, columns, row_factory
+from storage import StorageBackend, MemoryStorage, event_partition, rollup_buckets, search_terms, timestamp
 
 logger = logging.getLogger(__name__)
 database_lock = threading.Lock()
 
+# Stored in PRAGMA user_version once init_db has run. Bump it whenever init_db changes.
+SCHEMA_VERSION = 9
 
-def get_connection():
+# SELECT lists and row factories that materialize rows straight into entity records
+SHIP_COLUMNS, SHIP_ROW = columns(ShipRecord), row_factory(ShipRecord)
+CREW_COLUMNS, CREW_ROW = columns(CrewMember), row_factory(CrewMember)
+MISSION_COLUMNS, MISSION_ROW = columns(Mission), row_factory(Mission)
+# Callables run on every new connection, e.g. to install an SQL trace callback
+connection_hooks = []
+
+
+def get_connection(filename: str = None):
     """Return a connection to the SQLite database."""
-    conn = sqlite3.connect(config.DATABASE_FILENAME, check_same_thread=False)
+    conn = sqlite3.connect(filename or config.DATABASE_FILENAME, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for hook in connection_hooks:
+        hook(conn)
     return conn
 
 
-def init_db():
-    """Initialize the database with all required tables."""
-    with database_lock:
-        conn = get_connection()
-        cursor = conn.cursor()
+def ship_power_sql(prefix: str = "") -> str:
+    """Return an SQL expression computing storage.ship_power over spaceship columns."""
+    return " + ".join(f"{prefix}{field} * {int(weight)}"
+                      for field, weight in config.SHIP_POWER_WEIGHTS.items())
 
-        # Players table for user basic info
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS players (
-            telegram_id INTEGER PRIMARY KEY,
-            username TEXT,
-            spaceship_level INTEGER DEFAULT 1,
-            credits INTEGER DEFAULT ?
-        )
-        """, (config.STARTING_CREDITS,))
 
-        # Spaceship table with current stats
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS spaceship (
-            telegram_id INTEGER PRIMARY KEY,
-            fuel INTEGER,
-            oxygen INTEGER,
-            energy INTEGER,
-            cargo INTEGER,
-            weapons INTEGER,
-            shields INTEGER,
-            crew INTEGER,
-            last_update TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(telegram_id) REFERENCES players(telegram_id)
-        )
-        """)
+class SQLiteStorage(StorageBackend):
+    """Storage engine backed by an SQLite database file."""
 
-        # Crew table: each crew member record
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS crew (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            telegram_id INTEGER,
-            name TEXT,
-            skill TEXT,
-            level INTEGER DEFAULT 1,
-            FOREIGN KEY(telegram_id) REFERENCES players(telegram_id)
-        )
-        """)
+    name = "sqlite"
 
-        # Missions table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS missions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            telegram_id INTEGER,
-            description TEXT,
-            reward INTEGER,
-            status TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            time_limit INTEGER,
-            FOREIGN KEY(telegram_id) REFERENCES players(telegram_id)
-        )
-        """)
+    def __init__(self, filename: str = None):
+        self.filename = filename or config.DATABASE_FILENAME
+        self.lock = database_lock
+        # (name, ends) of the event log partition receiving new rows
+        self._hot_partition = None
 
-        # Upgrades table to log upgrade history
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS upgrades (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            telegram_id INTEGER,
-            type TEXT,
-            level INTEGER,
-            cost INTEGER,
-            upgraded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(telegram_id) REFERENCES players(telegram_id)
-        )
-        """)
+    def init_db(self, force: bool = False):
+        """
+        Initialize the database with all required tables.
+        Skipped when the stored schema version is current, unless force is set.
+        """
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SCHEMA_VERSION and not force:
+                conn.close()
+                if version > SCHEMA_VERSION:
+                    logger.warning(f"Database schema version {version} is newer than {SCHEMA_VERSION}.")
+                logger.info(f"Database schema version {version} is current.")
+                return
+
+            # Write-ahead logging: readers (backups, exports) never block game writes
+            cursor.execute("PRAGMA journal_mode = WAL")
+
+            # Players table for user basic info
+            cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS players (
+                telegram_id INTEGER PRIMARY KEY,
+                username TEXT,
+                spaceship_level INTEGER DEFAULT 1,
+                credits INTEGER DEFAULT {int(config.STARTING_CREDITS)}
+            )
+            """)
+
+            # Spaceship table with current stats
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS spaceship (
+                telegram_id INTEGER PRIMARY KEY,
+                fuel INTEGER,
+                oxygen INTEGER,
+                energy INTEGER,
+                cargo INTEGER,
+                weapons INTEGER,
+                shields INTEGER,
+                crew INTEGER,
+                last_update TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(telegram_id) REFERENCES players(telegram_id)
+            )
+            """)
+
+            # Crew table: each crew member record
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS crew (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                telegram_id INTEGER,
+                name TEXT,
+                skill TEXT,
+                level INTEGER DEFAULT 1,
+                trained_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(telegram_id) REFERENCES players(telegram_id)
+            )
+            """)
+            # Crews recruited before training existed start training now
+            cursor.execute("PRAGMA table_info(crew)")
+            if "trained_at" not in [r["name"] for r in cursor.fetchall()]:
+                cursor.execute("ALTER TABLE crew ADD COLUMN trained_at TIMESTAMP")
+                cursor.execute("UPDATE crew SET trained_at = CURRENT_TIMESTAMP")
+
+            # Summed crew levels per player and skill, maintained by triggers so skill
+            # bonuses are one primary key lookup instead of a crew scan
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS crew_bonuses (
+                telegram_id INTEGER,
+                skill TEXT,
+                levels INTEGER DEFAULT 0,
+                members INTEGER DEFAULT 0,
+                PRIMARY KEY (telegram_id, skill)
+            ) WITHOUT ROWID
+            """)
+            # Backfill crews recruited before the table existed
+            cursor.execute("""
+            INSERT OR IGNORE INTO crew_bonuses (telegram_id, skill, levels, members)
+            SELECT telegram_id, skill, SUM(level), COUNT(*) FROM crew GROUP BY telegram_id, skill
+            """)
+            add_member = """
+                INSERT INTO crew_bonuses (telegram_id, skill, levels, members)
+                VALUES (NEW.telegram_id, NEW.skill, NEW.level, 1)
+                ON CONFLICT (telegram_id, skill)
+                DO UPDATE SET levels = levels + excluded.levels, members = members + 1;
+            """
+            remove_member = """
+                UPDATE crew_bonuses SET levels = levels - OLD.level, members = members - 1
+                WHERE telegram_id = OLD.telegram_id AND skill = OLD.skill;
+            """
+            cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS crew_bonus_insert AFTER INSERT ON crew
+            BEGIN {add_member} END
+            """)
+            cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS crew_bonus_delete AFTER DELETE ON crew
+            BEGIN {remove_member} END
+            """)
+            cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS crew_bonus_update AFTER UPDATE OF telegram_id, skill, level ON crew
+            BEGIN {remove_member} {add_member} END
+            """)
+
+            # Missions table
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS missions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                telegram_id INTEGER,
+                description TEXT,
+                reward INTEGER,
+                status TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                time_limit INTEGER,
+                FOREIGN KEY(telegram_id) REFERENCES players(telegram_id)
+            )
+            """)
+
+            # Unclaimed missions wait in the pool with status 'available' and no player
+            cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_missions_pool
+            ON missions (id) WHERE status = 'available'
+            """)
+
+            # A player's claimed missions are listed by telegram_id and status
+            cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_missions_player
+            ON missions (telegram_id, status)
+            """)
+
+            # Upgrades table to log upgrade history
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS upgrades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                telegram_id INTEGER,
+                type TEXT,
+                level INTEGER,
+                cost INTEGER,
+                upgraded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(telegram_id) REFERENCES players(telegram_id)
+            )
+            """)
+
+            # Event logs for battles, encounters, etc. live in one table per time window
+            # (see _create_event_partition); this catalog lists them and the event_logs
+            # view reads them all.
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS event_partitions (
+                name TEXT PRIMARY KEY,
+                starts_at TIMESTAMP,
+                ends_at TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+            # Databases from before partitioning keep their event_logs table as one partition
+            cursor.execute("SELECT type FROM sqlite_master WHERE name = 'event_logs'")
+            row = cursor.fetchone()
+            if row and row["type"] == "table":
+                cursor.execute("SELECT MIN(event_time) FROM event_logs")
+                oldest = cursor.fetchone()[0] or timestamp()
+                cursor.execute("ALTER TABLE event_logs RENAME TO event_logs_legacy")
+                cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_event_logs_legacy_player
+                ON event_logs_legacy (telegram_id, event_time, id)
+                """)
+                cursor.execute("INSERT INTO event_partitions (name, starts_at, ends_at) VALUES (?, ?, ?)",
+                               ("event_logs_legacy", oldest, timestamp()))
+            self._hot_partition = None
+            self._event_table(cursor)
+            # Full-text search indexes for partitions created before they existed
+            cursor.execute("""
+            SELECT name FROM event_partitions
+            WHERE name || '_fts' NOT IN (SELECT name FROM sqlite_master WHERE type = 'table')
+            """)
+            for name in [r[0] for r in cursor.fetchall()]:
+                self._create_event_search(cursor, name)
+                cursor.execute(f"""
+                INSERT INTO {name}_fts (rowid, event_details, player)
+                SELECT id, event_details, 'u' || telegram_id FROM {name}
+                """)
+
+            # Alliances table: basic alliance matchmaking without ranking
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS alliances (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                alliance_name TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+
+            # Alliance membership linking players to alliances
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS alliance_members (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                telegram_id INTEGER,
+                alliance_id INTEGER,
+                joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(telegram_id) REFERENCES players(telegram_id),
+                FOREIGN KEY(alliance_id) REFERENCES alliances(id)
+            )
+            """)
+            cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_alliance_members_player
+            ON alliance_members (telegram_id)
+            """)
+
+            # Per-alliance member count and fleet power, maintained incrementally
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS alliance_summary (
+                alliance_id INTEGER PRIMARY KEY,
+                member_count INTEGER DEFAULT 0,
+                fleet_power INTEGER DEFAULT 0,
+                FOREIGN KEY(alliance_id) REFERENCES alliances(id)
+            )
+            """)
+            # Backfill summaries for alliances created before the table existed
+            cursor.execute(f"""
+            INSERT INTO alliance_summary (alliance_id, member_count, fleet_power)
+            SELECT a.id, COUNT(m.id), COALESCE(SUM({ship_power_sql("s.")}), 0)
+            FROM alliances a
+            LEFT JOIN alliance_members m ON m.alliance_id = a.id
+            LEFT JOIN spaceship s ON s.telegram_id = m.telegram_id
+            WHERE NOT EXISTS (SELECT 1 FROM alliance_summary WHERE alliance_id = a.id)
+            GROUP BY a.id
+            """)
+            # Ship stat changes move the fleet power of every alliance the owner belongs to
+            cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS spaceship_alliance_power
+            AFTER UPDATE OF weapons, shields, crew ON spaceship
+            WHEN NEW.weapons IS NOT OLD.weapons OR NEW.shields IS NOT OLD.shields
+                 OR NEW.crew IS NOT OLD.crew
+            BEGIN
+                UPDATE alliance_summary
+                SET fleet_power = fleet_power
+                    + (({ship_power_sql("NEW.")}) - ({ship_power_sql("OLD.")}))
+                    * (SELECT COUNT(*) FROM alliance_members m
+                       WHERE m.telegram_id = NEW.telegram_id
+                       AND m.alliance_id = alliance_summary.alliance_id)
+                WHERE alliance_id IN (
+                    SELECT alliance_id FROM alliance_members WHERE telegram_id = NEW.telegram_id
+                );
+            END
+            """)
+
+            # Alliance raids against a shared boss, resolved in timed rounds
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS raids (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                alliance_id INTEGER,
+                boss_name TEXT,
+                boss_health INTEGER,
+                max_health INTEGER,
+                round INTEGER DEFAULT 0,
+                participant_count INTEGER DEFAULT 0,
+                status TEXT DEFAULT 'active',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(alliance_id) REFERENCES alliances(id)
+            )
+            """)
+            cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_raids_status
+            ON raids (status, alliance_id)
+            """)
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS raid_participants (
+                raid_id INTEGER,
+                telegram_id INTEGER,
+                joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (raid_id, telegram_id),
+                FOREIGN KEY(raid_id) REFERENCES raids(id),
+                FOREIGN KEY(telegram_id) REFERENCES players(telegram_id)
+            )
+            """)
+            # One aggregated record per resolved round instead of per-player log rows
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS raid_rounds (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                raid_id INTEGER,
+                round INTEGER,
+                participants INTEGER,
+                total_damage INTEGER,
+                top_telegram_id INTEGER,
+                top_damage INTEGER,
+                boss_damage INTEGER,
+                boss_health INTEGER,
+                resolved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(raid_id) REFERENCES raids(id)
+            )
+            """)
+
+            # Pickled user_data, chat_data and bot_data entries written by persistence.py
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS session_state (
+                kind TEXT,
+                owner_id INTEGER,
+                key BLOB,
+                value BLOB,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (kind, owner_id, key)
+            ) WITHOUT ROWID
+            """)
 
-        # Event logs table for battles, encounters, etc.
+            # Hourly and daily activity totals, added to in the same transaction as each game write
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'activity_rollups'")
+            backfill = cursor.fetchone() is None
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS activity_rollups (
+                period TEXT,
+                bucket TEXT,
+                metric TEXT,
+                key TEXT,
+                count INTEGER DEFAULT 0,
+                amount INTEGER DEFAULT 0,
+                PRIMARY KEY (period, bucket, metric, key)
+            ) WITHOUT ROWID
+            """)
+            if backfill:
+                self._backfill_rollups(cursor)
+
+            cursor.execute(f"PRAGMA user_version = {max(version, SCHEMA_VERSION)}")
+            conn.commit()
+            conn.close()
+            logger.info("Database initialized successfully.")
+
+    def add_player(self, telegram_id: int, username: str):
+        """Insert a new player and initialize default spaceship details."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("INSERT OR IGNORE INTO players (telegram_id, username) VALUES (?, ?)",
+                           (telegram_id, username))
+            created = cursor.rowcount > 0
+            conn.commit()
+
+            # Initialize spaceship if not already set up
+            cursor.execute("SELECT telegram_id FROM spaceship WHERE telegram_id = ?", (telegram_id,))
+            if not cursor.fetchone():
+                cursor.execute("""
+                INSERT INTO spaceship (telegram_id, fuel, oxygen, energy, cargo, weapons, shields, crew)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (telegram_id, config.STARTING_FUEL, config.STARTING_OXYGEN,
+                      config.STARTING_ENERGY, config.STARTING_CARGO, config.STARTING_WEAPONS,
+                      config.STARTING_SHIELDS, config.STARTING_CREW))
+                conn.commit()
+                created = True
+            conn.close()
+            return created
+
+    def _roll_up(self, cursor, entries):
+        """Add (metric, key, count, amount) entries to the current hour's and day's rollup rows."""
+        cursor.executemany("""
+        INSERT INTO activity_rollups (period, bucket, metric, key, count, amount)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (period, bucket, metric, key)
+        DO UPDATE SET count = count + excluded.count, amount = amount + excluded.amount
+        """, [(period, bucket) + tuple(entry) for period, bucket in rollup_buckets().items()
+              for entry in entries])
+
+    def _backfill_rollups(self, cursor):
+        """
+        Build the rollups once from the raw tables of a database that predates them.
+        Completed missions are counted at their creation time, the only one stored, and
+        battle outcomes are read from the log. Raid rewards, thefts and duel outcomes are not
+        stored in a form that can be counted, so they start from zero.
+        """
+        sources = [
+            ("SELECT upgraded_at AS at, 'upgrade' AS metric, type AS key, 1 AS count, cost AS amount "
+             "FROM upgrades"),
+            ("SELECT created_at AS at, 'mission' AS metric, 'completed' AS key, 1 AS count, "
+             "COALESCE(reward, 0) AS amount FROM missions WHERE status = 'completed'"),
+            ("SELECT event_time AS at, 'event' AS metric, event_type AS key, 1 AS count, 0 AS amount "
+             "FROM event_logs"),
+            ("SELECT event_time AS at, 'battle' AS metric, CASE WHEN event_details LIKE '%Player defeated!%' "
+             "THEN 'loss' ELSE 'win' END AS key, 1 AS count, 0 AS amount FROM event_logs WHERE event_type = 'battle'"),
+        ]
+        for period, bucket in (("hour", "strftime('%Y-%m-%d %H:00:00', at)"), ("day", "date(at)")):
+            for source in sources:
+                cursor.execute(f"""
+                INSERT INTO activity_rollups (period, bucket, metric, key, count, amount)
+                SELECT ?, {bucket}, metric, key, SUM(count), SUM(amount) FROM ({source})
+                WHERE at IS NOT NULL
+                GROUP BY 2, metric, key
+                ON CONFLICT (period, bucket, metric, key)
+                DO UPDATE SET count = count + excluded.count, amount = amount + excluded.amount
+                """, (period,))
+
+    def get_spaceship(self, telegram_id: int) -> ShipRecord:
+        """Retrieve a player's spaceship details."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.row_factory = SHIP_ROW
+            cursor.execute(f"SELECT {SHIP_COLUMNS} FROM spaceship WHERE telegram_id = ?", (telegram_id,))
+            row = cursor.fetchone()
+            conn.close()
+            return row
+
+    def update_spaceship(self, telegram_id: int, **kwargs):
+        """Update spaceship fields (fuel, oxygen, etc.) for the given player."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            fields = []
+            params = []
+            for key, value in kwargs.items():
+                fields.append(f"{key} = ?")
+                params.append(value)
+            params.append(telegram_id)
+            query = f"UPDATE spaceship SET {', '.join(fields)}, last_update = CURRENT_TIMESTAMP WHERE telegram_id = ?"
+            cursor.execute(query, tuple(params))
+            conn.commit()
+            conn.close()
+
+    def _event_table(self, cursor) -> str:
+        """
+        Return the name of the event log partition receiving new rows, creating the
+        partition for the current time window first if needed. Called with the lock held.
+        """
+        now = time.time()
+        if self._hot_partition is None or now >= self._hot_partition[1]:
+            name, starts, ends = event_partition(now)
+            cursor.execute("SELECT 1 FROM event_partitions WHERE name = ?", (name,))
+            if not cursor.fetchone():
+                self._create_event_partition(cursor, name, timestamp(starts), timestamp(ends))
+            self._hot_partition = (name, ends)
+        return self._hot_partition[0]
+
+    def _create_event_partition(self, cursor, name: str, starts_at: str, ends_at: str):
+        """Create one event log partition, continuing the ID sequence of the newest existing one."""
         cursor.execute("""
-        CREATE TABLE IF NOT EXISTS event_logs (
+        SELECT MAX(seq) FROM sqlite_sequence
+        WHERE name IN (SELECT name FROM event_partitions)
+        """)
+        last_id = cursor.fetchone()[0] or 0
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {name} (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             telegram_id INTEGER,
             event_type TEXT,
@@ -100,205 +496,924 @@ def init_db():
             event_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
         """)
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_player ON {name} (telegram_id, event_time, id)")
+        if last_id:
+            cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (name, last_id))
+        self._create_event_search(cursor, name)
+        cursor.execute("INSERT INTO event_partitions (name, starts_at, ends_at) VALUES (?, ?, ?)",
+                       (name, starts_at, ends_at))
+        self._create_event_view(cursor)
+        logger.info(f"Created event log partition {name} ({starts_at} to {ends_at}).")
 
-        # Alliances table: basic alliance matchmaking without ranking
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS alliances (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            alliance_name TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
+    def _create_event_search(self, cursor, name: str):
+        """
+        Create the full-text index of one partition's event details and the triggers keeping it in step.
+        The index is contentless: matches are joined back to the partition by rowid. Each row is
+        also indexed under a "u<telegram_id>" player token so searches are narrowed to one player.
+        """
+        cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {name}_fts USING fts5(event_details, player, content='')
         """)
-
-        # Alliance membership linking players to alliances
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS alliance_members (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            telegram_id INTEGER,
-            alliance_id INTEGER,
-            joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(telegram_id) REFERENCES players(telegram_id),
-            FOREIGN KEY(alliance_id) REFERENCES alliances(id)
-        )
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {name}_fts_insert AFTER INSERT ON {name}
+        BEGIN
+            INSERT INTO {name}_fts (rowid, event_details, player)
+            VALUES (NEW.id, NEW.event_details, 'u' || NEW.telegram_id);
+        END
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {name}_fts_delete AFTER DELETE ON {name}
+        BEGIN
+            INSERT INTO {name}_fts ({name}_fts, rowid, event_details, player)
+            VALUES ('delete', OLD.id, OLD.event_details, 'u' || OLD.telegram_id);
+        END
         """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {name}_fts_update AFTER UPDATE OF event_details, telegram_id ON {name}
+        BEGIN
+            INSERT INTO {name}_fts ({name}_fts, rowid, event_details, player)
+            VALUES ('delete', OLD.id, OLD.event_details, 'u' || OLD.telegram_id);
+            INSERT INTO {name}_fts (rowid, event_details, player)
+            VALUES (NEW.id, NEW.event_details, 'u' || NEW.telegram_id);
+        END
+        """)
+
+    def _create_event_view(self, cursor):
+        """(Re)create the event_logs view over every partition."""
+        cursor.execute("SELECT name FROM event_partitions ORDER BY starts_at")
+        names = [row[0] for row in cursor.fetchall()]
+        cursor.execute("DROP VIEW IF EXISTS event_logs")
+        if names:
+            cursor.execute("CREATE VIEW event_logs AS " + " UNION ALL ".join(
+                f"SELECT id, telegram_id, event_type, event_details, event_time FROM {name}" for name in names))
+
+    def _partition_name(self, cursor, name: str) -> str:
+        """Return name if it is a cataloged event log partition, so it is safe to put in SQL."""
+        cursor.execute("SELECT name FROM event_partitions WHERE name = ?", (name,))
+        row = cursor.fetchone()
+        if not row:
+            raise ValueError(f"Unknown event log partition {name}.")
+        return row[0]
+
+    def add_event_log(self, telegram_id: int, event_type: str, details: str, outcome: str = None):
+        """Insert a log entry for an event (battle, discovery, etc.) and count it in the rollups."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute(f"""
+            INSERT INTO {self._event_table(cursor)} (telegram_id, event_type, event_details)
+            VALUES (?, ?, ?)
+            """, (telegram_id, event_type, details))
+            entries = [("event", event_type, 1, 0)]
+            if outcome:
+                entries.append((event_type, outcome, 1, 0))
+            self._roll_up(cursor, entries)
+            conn.commit()
+            conn.close()
 
-        conn.commit()
-        conn.close()
-        logger.info("Database initialized successfully.")
-
-
-def add_player(telegram_id: int, username: str):
-    """Insert a new player and initialize default spaceship details."""
-    with database_lock:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("INSERT OR IGNORE INTO players (telegram_id, username) VALUES (?, ?)",
-                       (telegram_id, username))
-        conn.commit()
-
-        # Initialize spaceship if not already set up
-        cursor.execute("SELECT telegram_id FROM spaceship WHERE telegram_id = ?", (telegram_id,))
-        if not cursor.fetchone():
-            cursor.execute("""
-            INSERT INTO spaceship (telegram_id, fuel, oxygen, energy, cargo, weapons, shields, crew)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (telegram_id, config.STARTING_FUEL, config.STARTING_OXYGEN,
-                  config.STARTING_ENERGY, config.STARTING_CARGO, config.STARTING_WEAPONS,
-                  config.STARTING_SHIELDS, config.STARTING_CREW))
+    def get_recent_events(self, telegram_id: int, limit: int = 10) -> list:
+        """Return the player's latest event log rows, newest first, reading older partitions only if needed."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            hot = self._event_table(cursor)
+            rows = self._player_events(cursor, hot, telegram_id, limit)
+            if len(rows) < limit:
+                cursor.execute("SELECT name FROM event_partitions WHERE name != ? ORDER BY starts_at DESC", (hot,))
+                for name in [r[0] for r in cursor.fetchall()]:
+                    rows.extend(self._player_events(cursor, name, telegram_id, limit - len(rows)))
+                    if len(rows) >= limit:
+                        break
             conn.commit()
-        conn.close()
+            conn.close()
+            return rows
 
+    def _player_events(self, cursor, partition: str, telegram_id: int, limit: int) -> list:
+        cursor.execute(f"""
+        SELECT id, telegram_id, event_type, event_details, event_time FROM {partition}
+        WHERE telegram_id = ?
+        ORDER BY event_time DESC, id DESC
+        LIMIT ?
+        """, (telegram_id, limit))
+        return [dict(r) for r in cursor.fetchall()]
 
-def get_spaceship(telegram_id: int):
-    """Retrieve a player's spaceship details."""
-    with database_lock:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM spaceship WHERE telegram_id = ?", (telegram_id,))
-        row = cursor.fetchone()
-        conn.close()
-        return dict(row) if row else None
+    def get_event_page(self, telegram_id: int, before: tuple = None, after: tuple = None,
+                       limit: int = 10, search: str = None):
+        """
+        Return one keyset page of the player's events on (event_time, id), newest first.
+        Partitions are read newest first (oldest first when paging towards newer rows) and
+        the walk stops once no remaining partition can hold a row that belongs on the page.
+        """
+        newer = after is not None and before is None
+        position = after if newer else before
+        compare, order = (">", "ASC") if newer else ("<", "DESC")
+        terms = search_terms(search)
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            self._event_table(cursor)
+            cursor.execute("SELECT name, starts_at, ends_at FROM event_partitions ORDER BY "
+                           + ("starts_at ASC" if newer else "ends_at DESC"))
+            partitions = cursor.fetchall()
+            rows = []
+            for partition in partitions:
+                if len(rows) > limit:
+                    # rows[limit] is the first row beyond this page in the direction of travel
+                    boundary = rows[limit]["event_time"]
+                    if (partition["starts_at"] > boundary) if newer else (partition["ends_at"] < boundary):
+                        break
+                if position and ((partition["ends_at"] < position[0]) if newer
+                                 else (partition["starts_at"] > position[0])):
+                    continue
+                name = partition["name"]
+                conditions, params = ["e.telegram_id = ?"], [telegram_id]
+                if position:
+                    conditions.append(f"(e.event_time, e.id) {compare} (?, ?)")
+                    params.extend(position)
+                if terms:
+                    source = f"{name}_fts f JOIN {name} e ON e.id = f.rowid"
+                    conditions.append(f"f.{name}_fts MATCH ?")
+                    # Terms only match the details; quotes inside a term are doubled as FTS5 requires.
+                    params.append(f"player : u{int(telegram_id)} AND event_details : ("
+                                  + " AND ".join('"' + term.replace('"', '""') + '"*' for term in terms) + ")")
+                else:
+                    source = f"{name} e"
+                cursor.execute(f"""
+                SELECT e.id, e.telegram_id, e.event_type, e.event_details, e.event_time
+                FROM {source}
+                WHERE {" AND ".join(conditions)}
+                ORDER BY e.event_time {order}, e.id {order}
+                LIMIT ?
+                """, params + [limit + 1])
+                rows.extend(dict(r) for r in cursor.fetchall())
+                rows.sort(key=lambda row: (row["event_time"], row["id"]), reverse=not newer)
+            conn.commit()
+            conn.close()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if newer:
+            rows.reverse()
+        return rows, has_more
+
+    def get_event_partitions(self) -> list:
+        """Return every event log partition (name, starts_at, ends_at), oldest first."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            self._event_table(cursor)
+            cursor.execute("SELECT name, starts_at, ends_at FROM event_partitions ORDER BY starts_at")
+            rows = [dict(r) for r in cursor.fetchall()]
+            conn.commit()
+            conn.close()
+            return rows
+
+    def read_event_partition(self, name: str, after_id: int = 0, limit: int = 1000) -> list:
+        """Return up to limit rows of one event log partition with IDs above after_id, in ID order."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"""
+                SELECT id, telegram_id, event_type, event_details, event_time
+                FROM {self._partition_name(cursor, name)}
+                WHERE id > ? ORDER BY id LIMIT ?
+                """, (after_id, limit))
+                return [dict(r) for r in cursor.fetchall()]
+            finally:
+                conn.close()
+
+    def drop_event_partition(self, name: str):
+        """Drop an event log partition with all its rows. The current partition cannot be dropped."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            try:
+                if name == self._event_table(cursor):
+                    raise ValueError(f"Cannot drop the current event log partition {name}.")
+                name = self._partition_name(cursor, name)
+                cursor.execute("DELETE FROM event_partitions WHERE name = ?", (name,))
+                self._create_event_view(cursor)
+                cursor.execute(f"DROP TABLE IF EXISTS {name}_fts")
+                cursor.execute(f"DROP TABLE {name}")
+                conn.commit()
+            except (sqlite3.Error, ValueError):
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+    def add_crew_member(self, telegram_id: int, name: str, skill: str):
+        """Add a new crew member to the player's crew."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT INTO crew (telegram_id, name, skill, trained_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            """, (telegram_id, name, skill))
+            conn.commit()
+            conn.close()
+
+    def get_crew(self, telegram_id: int) -> list:
+        """Retrieve all crew members for the given player."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.row_factory = CREW_ROW
+            cursor.execute(f"SELECT {CREW_COLUMNS} FROM crew WHERE telegram_id = ?", (telegram_id,))
+            rows = cursor.fetchall()
+            conn.close()
+            return rows
+
+    def get_crew_bonuses(self, telegram_id: int) -> dict:
+        """Return {skill: summed crew level} for the player's crew."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("SELECT skill, levels FROM crew_bonuses WHERE telegram_id = ? AND members > 0",
+                           (telegram_id,))
+            bonuses = {r["skill"]: r["levels"] for r in cursor.fetchall()}
+            conn.close()
+            return bonuses
+
+    def train_crew(self, max_level: int, seconds_per_level: int) -> int:
+        """
+        Level up, in one UPDATE, every crew member below max_level that has trained
+        level * seconds_per_level seconds since its last level. Returns the number leveled.
+        """
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("""
+            UPDATE crew SET level = level + 1, trained_at = CURRENT_TIMESTAMP
+            WHERE level < ? AND trained_at <= datetime('now', printf('-%d seconds', level * ?))
+            """, (max_level, seconds_per_level))
+            trained = cursor.rowcount
+            conn.commit()
+            conn.close()
+            return trained
+
+    def add_mission(self, telegram_id: int, description: str, reward: int, time_limit: int) -> int:
+        """Insert a new mission for the player and return its ID."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT INTO missions (telegram_id, description, reward, status, time_limit)
+            VALUES (?, ?, ?, 'active', ?)
+            """, (telegram_id, description, reward, time_limit))
+            mission_id = cursor.lastrowid
+            conn.commit()
+            conn.close()
+            return mission_id
+
+    def add_pool_missions(self, missions) -> int:
+        """Insert (description, reward, time_limit) missions into the pool in one transaction."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.executemany("""
+            INSERT INTO missions (description, reward, status, time_limit)
+            VALUES (?, ?, 'available', ?)
+            """, missions)
+            count = cursor.rowcount
+            conn.commit()
+            conn.close()
+            return count
+
+    def count_pool_missions(self) -> int:
+        """Count the unclaimed missions, from the pool index alone."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM missions WHERE status = 'available'")
+            count = cursor.fetchone()[0]
+            conn.close()
+            return count
+
+    def claim_mission(self, telegram_id: int) -> Mission:
+        """Assign the oldest pooled mission to the player with one UPDATE and return it, or None."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.row_factory = MISSION_ROW
+            cursor.execute(f"""
+            UPDATE missions SET telegram_id = ?, status = 'active', created_at = CURRENT_TIMESTAMP
+            WHERE id = (SELECT id FROM missions WHERE status = 'available' ORDER BY id LIMIT 1)
+            RETURNING {MISSION_COLUMNS}
+            """, (telegram_id,))
+            claimed = cursor.fetchall()
+            conn.commit()
+            conn.close()
+            return claimed[0] if claimed else None
+
+    def get_active_missions(self, telegram_id: int) -> list:
+        """Retrieve active missions for the player."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.row_factory = MISSION_ROW
+            cursor.execute(f"SELECT {MISSION_COLUMNS} FROM missions WHERE telegram_id = ? AND status = 'active'",
+                           (telegram_id,))
+            rows = cursor.fetchall()
+            conn.close()
+            return rows
+
+    def complete_mission(self, mission_id: int):
+        """Mark a mission as completed, counting it and its reward in the rollups."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("""
+            UPDATE missions SET status = 'completed'
+            WHERE id = ? AND status IS NOT 'completed'
+            RETURNING telegram_id, reward
+            """, (mission_id,))
+            completed = cursor.fetchall()
+            if completed:
+                self._roll_up(cursor, [("mission", "completed", 1, completed[0]["reward"] or 0)])
+            conn.commit()
+            conn.close()
+            return completed[0]["telegram_id"] if completed else None
+
+    def upgrade_spaceship(self, telegram_id: int, upgrade_type: str, new_level: int, cost: int):
+        """Record an upgrade in the database and update player's spaceship level."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT INTO upgrades (telegram_id, type, level, cost)
+            VALUES (?, ?, ?, ?)
+            """, (telegram_id, upgrade_type, new_level, cost))
+            cursor.execute("""
+            UPDATE players SET spaceship_level = ?
+            WHERE telegram_id = ?
+            """, (new_level, telegram_id))
+            self._roll_up(cursor, [("upgrade", upgrade_type, 1, cost)])
+            conn.commit()
+            conn.close()
+
+    def join_alliance(self, telegram_id: int, alliance_id: int):
+        """Add a player to an alliance."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT INTO alliance_members (telegram_id, alliance_id)
+            VALUES (?, ?)
+            """, (telegram_id, alliance_id))
+            cursor.execute(f"SELECT {ship_power_sql()} FROM spaceship WHERE telegram_id = ?", (telegram_id,))
+            row = cursor.fetchone()
+            power = row[0] if row else 0
+            cursor.execute("""
+            INSERT INTO alliance_summary (alliance_id, member_count, fleet_power)
+            VALUES (?, 1, ?)
+            ON CONFLICT(alliance_id) DO UPDATE SET
+                member_count = member_count + 1,
+                fleet_power = fleet_power + excluded.fleet_power
+            """, (alliance_id, power))
+            conn.commit()
+            conn.close()
+
+    def create_alliance(self, alliance_name: str) -> int:
+        """Create a new alliance and return its new ID."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT INTO alliances (alliance_name)
+            VALUES (?)
+            """, (alliance_name,))
+            alliance_id = cursor.lastrowid
+            cursor.execute("INSERT INTO alliance_summary (alliance_id) VALUES (?)", (alliance_id,))
+            conn.commit()
+            conn.close()
+            return alliance_id
+
+    def get_alliances(self):
+        """Retrieve all alliances."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM alliances")
+            rows = cursor.fetchall()
+            conn.close()
+            return [dict(r) for r in rows]
+
+    def get_alliance_page(self, after_id: int = 0, before_id: int = None, limit: int = 10):
+        """Return one keyset page of alliances with their summary counters."""
+        if before_id is not None:
+            condition, order, bound = "a.id < ?", "DESC", before_id
+        else:
+            condition, order, bound = "a.id > ?", "ASC", after_id
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            # Fetch one extra row to learn whether another page follows
+            cursor.execute(f"""
+            SELECT a.id, a.alliance_name, a.created_at,
+                   COALESCE(s.member_count, 0) AS member_count,
+                   COALESCE(s.fleet_power, 0) AS fleet_power
+            FROM alliances a
+            LEFT JOIN alliance_summary s ON s.alliance_id = a.id
+            WHERE {condition}
+            ORDER BY a.id {order}
+            LIMIT ?
+            """, (bound, limit + 1))
+            rows = [dict(r) for r in cursor.fetchall()]
+            conn.close()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if before_id is not None:
+            rows.reverse()
+        return rows, has_more
+
+    def get_player_alliance(self, telegram_id: int):
+        """Return the ID of the alliance the player joined most recently, or None."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT alliance_id FROM alliance_members
+            WHERE telegram_id = ?
+            ORDER BY id DESC LIMIT 1
+            """, (telegram_id,))
+            row = cursor.fetchone()
+            conn.close()
+            return row["alliance_id"] if row else None
+
+    def get_player_alliances(self, telegram_ids) -> dict:
+        """Return {telegram_id: ID of the alliance joined most recently} for those of the players in one."""
+        telegram_ids = list(telegram_ids)
+        if not telegram_ids:
+            return {}
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute(f"""
+            SELECT telegram_id, alliance_id FROM alliance_members
+            WHERE id IN (SELECT MAX(id) FROM alliance_members
+                         WHERE telegram_id IN ({", ".join("?" * len(telegram_ids))})
+                         GROUP BY telegram_id)
+            """, telegram_ids)
+            rows = cursor.fetchall()
+            conn.close()
+            return {row["telegram_id"]: row["alliance_id"] for row in rows}
+
+    def create_raid(self, alliance_id: int, boss_name: str, boss_health: int) -> int:
+        """Start a new raid for the alliance and return its ID."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT INTO raids (alliance_id, boss_name, boss_health, max_health)
+            VALUES (?, ?, ?, ?)
+            """, (alliance_id, boss_name, boss_health, boss_health))
+            conn.commit()
+            raid_id = cursor.lastrowid
+            conn.close()
+            return raid_id
+
+    def get_active_raid(self, alliance_id: int):
+        """Retrieve the alliance's active raid, if any."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT * FROM raids WHERE status = 'active' AND alliance_id = ?
+            ORDER BY id DESC LIMIT 1
+            """, (alliance_id,))
+            row = cursor.fetchone()
+            conn.close()
+            return dict(row) if row else None
+
+    def get_active_raids(self):
+        """Retrieve every active raid."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM raids WHERE status = 'active'")
+            rows = cursor.fetchall()
+            conn.close()
+            return [dict(r) for r in rows]
+
+    def join_raid(self, raid_id: int, telegram_id: int) -> bool:
+        """Add a player to a raid. Returns False if they had already joined."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT OR IGNORE INTO raid_participants (raid_id, telegram_id)
+            VALUES (?, ?)
+            """, (raid_id, telegram_id))
+            joined = cursor.rowcount > 0
+            if joined:
+                cursor.execute("""
+                UPDATE raids SET participant_count = participant_count + 1 WHERE id = ?
+                """, (raid_id,))
+            conn.commit()
+            conn.close()
+            return joined
+
+    def get_raid_fleet(self, raid_id: int):
+        """
+        Retrieve the combat stats of every raid participant in one query.
+        Returns parallel lists keyed by column: telegram_id, weapons, crew.
+        """
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT s.telegram_id, s.weapons, s.crew
+            FROM raid_participants p
+            JOIN spaceship s ON s.telegram_id = p.telegram_id
+            WHERE p.raid_id = ?
+            """, (raid_id,))
+            rows = cursor.fetchall()
+            conn.close()
+        return {
+            "telegram_id": [r[0] for r in rows],
+            "weapons": [r[1] for r in rows],
+            "crew": [r[2] for r in rows],
+        }
+
+    def record_raid_round(self, raid_id: int, round_result: dict, status: str, reward: int = 0):
+        """
+        Persist one resolved raid round in a single transaction: the aggregated
+        round record, the boss state, shield damage to every participant and,
+        when the boss falls, the participants' reward. Returns the IDs of the damaged ships.
+        """
+        damaged = []
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT INTO raid_rounds (raid_id, round, participants, total_damage, top_telegram_id,
+                                     top_damage, boss_damage, boss_health)
+            VALUES (:raid_id, :round, :participants, :total_damage, :top_telegram_id,
+                    :top_damage, :boss_damage, :boss_health)
+            """, dict(round_result, raid_id=raid_id))
+            cursor.execute("""
+            UPDATE raids SET boss_health = ?, round = ?, status = ? WHERE id = ?
+            """, (round_result["boss_health"], round_result["round"], status, raid_id))
+            if round_result["boss_damage"]:
+                cursor.execute("""
+                UPDATE spaceship SET shields = MAX(shields - ?, 0), last_update = CURRENT_TIMESTAMP
+                WHERE telegram_id IN (SELECT telegram_id FROM raid_participants WHERE raid_id = ?)
+                RETURNING telegram_id
+                """, (round_result["boss_damage"], raid_id))
+                damaged = [r[0] for r in cursor.fetchall()]
+            if reward:
+                cursor.execute("""
+                UPDATE players SET credits = credits + ?
+                WHERE telegram_id IN (SELECT telegram_id FROM raid_participants WHERE raid_id = ?)
+                """, (reward, raid_id))
+                if cursor.rowcount > 0:
+                    self._roll_up(cursor, [("raid", "reward", cursor.rowcount, reward * cursor.rowcount)])
+            conn.commit()
+            conn.close()
+        return damaged
+
+    def get_player_levels(self):
+        """Retrieve (telegram_id, spaceship_level) for every player."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("SELECT telegram_id, spaceship_level FROM players")
+            rows = [(r[0], r[1]) for r in cursor.fetchall()]
+            conn.close()
+            return rows
+
+    def steal_credits(self, thief_id: int, victim_id: int, fraction: float, max_amount: int) -> int:
+        """
+        Move a share of the victim's credits to the thief in one transaction,
+        logging the theft for both players. Returns the amount taken, 0 if either player is missing.
+        """
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("SELECT telegram_id, credits FROM players WHERE telegram_id IN (?, ?)",
+                               (thief_id, victim_id))
+                credits = {row["telegram_id"]: row["credits"] for row in cursor.fetchall()}
+                if len(credits) < 2:
+                    conn.rollback()
+                    return 0
+                amount = min(int(credits[victim_id] * fraction), max_amount)
+                if amount <= 0:
+                    conn.rollback()
+                    return 0
+                cursor.execute("UPDATE players SET credits = credits - ? WHERE telegram_id = ?",
+                               (amount, victim_id))
+                cursor.execute("UPDATE players SET credits = credits + ? WHERE telegram_id = ?",
+                               (amount, thief_id))
+                cursor.executemany(f"""
+                INSERT INTO {self._event_table(cursor)} (telegram_id, event_type, event_details)
+                VALUES (?, 'steal', ?)
+                """, [(thief_id, f"Stole {amount} credits from player {victim_id}."),
+                      (victim_id, f"Player {thief_id} stole {amount} credits from you.")])
+                self._roll_up(cursor, [("event", "steal", 2, 0), ("steal", "credits", 1, amount)])
+                conn.commit()
+                return amount
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+    def get_rollups(self, period: str, since: str) -> list:
+        """Return one period's activity rollup rows from bucket since on, oldest bucket first."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT bucket, metric, key, count, amount FROM activity_rollups
+            WHERE period = ? AND bucket >= ?
+            ORDER BY bucket, metric, key
+            """, (period, since))
+            rows = [dict(r) for r in cursor.fetchall()]
+            conn.close()
+            return rows
+
+    def load_session_state(self, kind: str, owner_id: int) -> dict:
+        """Return the stored {key: value} blobs of one user_data, chat_data or bot_data owner."""
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            cursor.execute("SELECT key, value FROM session_state WHERE kind = ? AND owner_id = ?",
+                           (kind, owner_id))
+            rows = {row[0]: row[1] for row in cursor.fetchall()}
+            conn.close()
+            return rows
+
+    def save_session_state(self, changes):
+        """Upsert changed session state entries and delete removed ones in one transaction."""
+        upserts = [change for change in changes if change[3] is not None]
+        deletes = [change[:3] for change in changes if change[3] is None]
+        with self.lock:
+            conn = get_connection(self.filename)
+            cursor = conn.cursor()
+            try:
+                cursor.executemany("""
+                INSERT INTO session_state (kind, owner_id, key, value)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(kind, owner_id, key) DO UPDATE SET
+                    value = excluded.value,
+                    updated_at = CURRENT_TIMESTAMP
+                """, upserts)
+                cursor.executemany("DELETE FROM session_state WHERE kind = ? AND owner_id = ? AND key = ?",
+                                   deletes)
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+
+BACKENDS = {
+    SQLiteStorage.name: SQLiteStorage,
+    MemoryStorage.name: MemoryStorage,
+}
+
+_backend = None
+
+
+def set_backend(backend="sqlite", **kwargs) -> StorageBackend:
+    """
+    Select the storage engine used by every module-level function.
+    Accepts a backend name from BACKENDS (extra keyword arguments go to its
+    constructor) or an already constructed StorageBackend instance.
+    """
+    global _backend
+    if isinstance(backend, StorageBackend):
+        _backend = backend
+    else:
+        try:
+            _backend = BACKENDS[backend](**kwargs)
+        except KeyError:
+            raise ValueError(f"Unknown storage backend: {backend}")
+    logger.info(f"Using {_backend.name} storage backend.")
+    return _backend
+
+
+def get_backend() -> StorageBackend:
+    """Return the active storage engine, creating the configured one on first use."""
+    if _backend is None:
+        set_backend(config.STORAGE_BACKEND)
+    return _backend
+
+
+def init_db(force: bool = False):
+    """Initialize the database with all required tables, unless the schema is already current."""
+    get_backend().init_db(force)
+
+
+def add_player(telegram_id: int, username: str) -> bool:
+    """
+    Insert a new player and initialize default spaceship details.
+    Returns True if anything was created; a known player's cached replies stay valid.
+    """
+    created = get_backend().add_player(telegram_id, username)
+    player_index.levels.add(telegram_id)
+    if created:
+        render_cache.replies.bump(telegram_id, "ship")
+    return created
+
+
+def get_spaceship(telegram_id: int) -> ShipRecord:
+    """Retrieve a player's spaceship details as a ShipRecord, or None."""
+    return get_backend().get_spaceship(telegram_id)
 
 
 def update_spaceship(telegram_id: int, **kwargs):
     """Update spaceship fields (fuel, oxygen, etc.) for the given player."""
-    with database_lock:
-        conn = get_connection()
-        cursor = conn.cursor()
-        fields = []
-        params = []
-        for key, value in kwargs.items():
-            fields.append(f"{key} = ?")
-            params.append(value)
-        params.append(telegram_id)
-        query = f"UPDATE spaceship SET {', '.join(fields)}, last_update = CURRENT_TIMESTAMP WHERE telegram_id = ?"
-        cursor.execute(query, tuple(params))
-        conn.commit()
-        conn.close()
-
-
-def add_event_log(telegram_id: int, event_type: str, details: str):
-    """Insert a log entry for an event (battle, discovery, etc.)."""
-    with database_lock:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-        INSERT INTO event_logs (telegram_id, event_type, event_details)
-        VALUES (?, ?, ?)
-        """, (telegram_id, event_type, details))
-        conn.commit()
-        conn.close()
+    get_backend().update_spaceship(telegram_id, **kwargs)
+    render_cache.replies.bump(telegram_id, "ship")
+
+
+def add_event_log(telegram_id: int, event_type: str, details: str, outcome: str = None):
+    """Insert a log entry for an event (battle, discovery, etc.); battles pass their outcome for the rollups."""
+    get_backend().add_event_log(telegram_id, event_type, details, outcome)
+
+
+def get_recent_events(telegram_id: int, limit: int = 10) -> list:
+    """Retrieve the player's latest event log entries, newest first."""
+    return get_backend().get_recent_events(telegram_id, limit)
+
+
+def get_event_page(telegram_id: int, before: tuple = None, after: tuple = None, limit: int = None,
+                   search: str = None):
+    """Retrieve one keyset page of the player's event log on (event_time, id), optionally full-text searched."""
+    return get_backend().get_event_page(telegram_id, before, after, limit or config.HISTORY_PAGE_SIZE, search)
+
+
+def get_event_partitions() -> list:
+    """Retrieve every event log partition (name, starts_at, ends_at), oldest first."""
+    return get_backend().get_event_partitions()
+
+
+def read_event_partition(name: str, after_id: int = 0, limit: int = 1000) -> list:
+    """Retrieve one chunk of an event log partition's rows with IDs above after_id."""
+    return get_backend().read_event_partition(name, after_id, limit)
+
+
+def drop_event_partition(name: str):
+    """Drop an expired event log partition and all its rows."""
+    get_backend().drop_event_partition(name)
 
 
 def add_crew_member(telegram_id: int, name: str, skill: str):
     """Add a new crew member to the player's crew."""
-    with database_lock:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-        INSERT INTO crew (telegram_id, name, skill)
-        VALUES (?, ?, ?)
-        """, (telegram_id, name, skill))
-        conn.commit()
-        conn.close()
-
-
-def get_crew(telegram_id: int):
-    """Retrieve all crew members for the given player."""
-    with database_lock:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM crew WHERE telegram_id = ?", (telegram_id,))
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
-
-
-def add_mission(telegram_id: int, description: str, reward: int, time_limit: int):
-    """Insert a new mission for the player."""
-    with database_lock:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-        INSERT INTO missions (telegram_id, description, reward, status, time_limit)
-        VALUES (?, ?, ?, 'active', ?)
-        """, (telegram_id, description, reward, time_limit))
-        conn.commit()
-        conn.close()
+    get_backend().add_crew_member(telegram_id, name, skill)
+    render_cache.replies.bump(telegram_id, "crew")
+
+
+def get_crew(telegram_id: int) -> list:
+    """Retrieve all crew members (CrewMember records) for the given player."""
+    return get_backend().get_crew(telegram_id)
+
+
+def get_crew_bonuses(telegram_id: int) -> dict:
+    """Retrieve {skill: summed crew level} for the player's crew from the maintained aggregate."""
+    return get_backend().get_crew_bonuses(telegram_id)
+
 
+def train_crew(max_level: int = None, seconds_per_level: int = None) -> int:
+    """Level up every crew member that has finished training for its next level; returns how many."""
+    trained = get_backend().train_crew(config.CREW_MAX_LEVEL if max_level is None else max_level,
+                                       config.CREW_TRAINING_TIME if seconds_per_level is None else seconds_per_level)
+    if trained:
+        render_cache.replies.bump_all("crew")
+    return trained
 
-def get_active_missions(telegram_id: int):
-    """Retrieve active missions for the player."""
-    with database_lock:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM missions WHERE telegram_id = ? AND status = 'active'", (telegram_id,))
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+
+def add_mission(telegram_id: int, description: str, reward: int, time_limit: int) -> int:
+    """Insert a new mission for the player and return its ID."""
+    mission_id = get_backend().add_mission(telegram_id, description, reward, time_limit)
+    render_cache.replies.bump(telegram_id, "missions")
+    return mission_id
+
+
+def add_pool_missions(missions) -> int:
+    """Add (description, reward, time_limit) missions to the pool of unclaimed missions; returns how many."""
+    return get_backend().add_pool_missions(missions)
+
+
+def count_pool_missions() -> int:
+    """Return the number of unclaimed missions waiting in the pool."""
+    return get_backend().count_pool_missions()
+
+
+def claim_mission(telegram_id: int) -> Mission:
+    """Atomically assign the oldest pooled mission to the player; returns the Mission or None if the pool is empty."""
+    mission = get_backend().claim_mission(telegram_id)
+    if mission is not None:
+        render_cache.replies.bump(telegram_id, "missions")
+    return mission
+
+
+def get_active_missions(telegram_id: int) -> list:
+    """Retrieve active missions (Mission records) for the player."""
+    return get_backend().get_active_missions(telegram_id)
 
 
 def complete_mission(mission_id: int):
-    """Mark a mission as completed."""
-    with database_lock:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE missions SET status = 'completed' WHERE id = ?", (mission_id,))
-        conn.commit()
-        conn.close()
+    """Mark a mission as completed and count its reward in the activity rollups."""
+    telegram_id = get_backend().complete_mission(mission_id)
+    if telegram_id is not None:
+        render_cache.replies.bump(telegram_id, "missions")
 
 
 def upgrade_spaceship(telegram_id: int, upgrade_type: str, new_level: int, cost: int):
     """Record an upgrade in the database and update player's spaceship level."""
-    with database_lock:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-        INSERT INTO upgrades (telegram_id, type, level, cost)
-        VALUES (?, ?, ?, ?)
-        """, (telegram_id, upgrade_type, new_level, cost))
-        cursor.execute("""
-        UPDATE players SET spaceship_level = ?
-        WHERE telegram_id = ?
-        """, (new_level, telegram_id))
-        conn.commit()
-        conn.close()
+    get_backend().upgrade_spaceship(telegram_id, upgrade_type, new_level, cost)
+    player_index.levels.set_level(telegram_id, new_level)
+    render_cache.replies.bump(telegram_id, "ship")
 
 
 def join_alliance(telegram_id: int, alliance_id: int):
     """Add a player to an alliance."""
-    with database_lock:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-        INSERT INTO alliance_members (telegram_id, alliance_id)
-        VALUES (?, ?)
-        """, (telegram_id, alliance_id))
-        conn.commit()
-        conn.close()
+    get_backend().join_alliance(telegram_id, alliance_id)
 
 
 def create_alliance(alliance_name: str) -> int:
     """Create a new alliance and return its new ID."""
-    with database_lock:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-        INSERT INTO alliances (alliance_name)
-        VALUES (?)
-        """, (alliance_name,))
-        conn.commit()
-        alliance_id = cursor.lastrowid
-        conn.close()
-        return alliance_id
+    return get_backend().create_alliance(alliance_name)
 
 
 def get_alliances():
     """Retrieve all alliances."""
-    with database_lock:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM alliances")
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
\ No newline at end of file
+    return get_backend().get_alliances()
+
+
+def get_alliance_page(after_id: int = 0, before_id: int = None, limit: int = None):
+    """Retrieve one keyset page of alliances with member counts and fleet power."""
+    return get_backend().get_alliance_page(after_id, before_id, limit or config.ALLIANCE_PAGE_SIZE)
+
+
+def get_player_alliance(telegram_id: int):
+    """Return the ID of the alliance the player joined most recently, or None."""
+    return get_backend().get_player_alliance(telegram_id)
+
+
+def get_player_alliances(telegram_ids) -> dict:
+    """Return {telegram_id: alliance ID} for those of the players who are in an alliance, in one query."""
+    return get_backend().get_player_alliances(telegram_ids)
+
+
+def create_raid(alliance_id: int, boss_name: str, boss_health: int) -> int:
+    """Start a new raid for the alliance and return its ID."""
+    return get_backend().create_raid(alliance_id, boss_name, boss_health)
+
+
+def get_active_raid(alliance_id: int):
+    """Retrieve the alliance's active raid, if any."""
+    return get_backend().get_active_raid(alliance_id)
+
+
+def get_active_raids():
+    """Retrieve every active raid."""
+    return get_backend().get_active_raids()
+
+
+def join_raid(raid_id: int, telegram_id: int) -> bool:
+    """Add a player to a raid. Returns False if they had already joined."""
+    return get_backend().join_raid(raid_id, telegram_id)
+
+
+def get_raid_fleet(raid_id: int):
+    """Retrieve the combat stats of every raid participant as parallel column lists."""
+    return get_backend().get_raid_fleet(raid_id)
+
+
+def record_raid_round(raid_id: int, round_result: dict, status: str, reward: int = 0):
+    """Persist one resolved raid round, boss state and participant effects atomically."""
+    damaged = get_backend().record_raid_round(raid_id, round_result, status, reward)
+    render_cache.replies.bump_many(damaged, "ship")
+
+
+def get_player_levels():
+    """Retrieve (telegram_id, spaceship_level) for every player."""
+    return get_backend().get_player_levels()
+
+
+def steal_credits(thief_id: int, victim_id: int, fraction: float, max_amount: int) -> int:
+    """Atomically move a share of the victim's credits to the thief. Returns the amount taken."""
+    return get_backend().steal_credits(thief_id, victim_id, fraction, max_amount)
+
+
+def get_rollups(period: str, since: str) -> list:
+    """Retrieve the hourly ("hour") or daily ("day") activity rollup rows from bucket since on."""
+    return get_backend().get_rollups(period, since)
+
+
+def load_session_state(kind: str, owner_id: int) -> dict:
+    """Return the stored {key: value} blobs of one user_data, chat_data or bot_data owner."""
+    return get_backend().load_session_state(kind, owner_id)
+
+
+def save_session_state(changes):
+    """Apply (kind, owner_id, key, value) session state changes in one transaction; None deletes."""
+    get_backend().save_session_state(changes)
@@ -0,0 +1,149 @@
+"""
+dedupe.py - Idempotent handling of inline button callbacks.
+Telegram redelivers callback queries and players double-tap buttons, so the same press
+can reach a callback more than once. Each press is remembered for DEDUPE_TTL seconds by
+its callback query id and by the button's identity (message, message version, data).
+A repeat is answered with the text the first press produced, without running the game
+logic again or touching the database.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+import config
+
+logger = logging.getLogger(__name__)
+
+# Marks a press whose callback is still running
+IN_PROGRESS = object()
+
+# Longest text Telegram shows in a callback answer
+ANSWER_LIMIT = 200
+
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire after ttl seconds, holding at most maxsize entries."""
+
+    def __init__(self, maxsize: int = None, ttl: float = None):
+        self.maxsize = maxsize or config.DEDUPE_MAX_ENTRIES
+        self.ttl = ttl or config.DEDUPE_TTL
+        self.entries = OrderedDict()  # key -> (expires, value), oldest first
+        self.lock = threading.Lock()
+        self.hits = 0
+
+    def expire(self, now: float):
+        """Drop expired entries from the front. Called with the lock held."""
+        while self.entries:
+            key, (expires, _) = next(iter(self.entries.items()))
+            if expires > now:
+                break
+            del self.entries[key]
+
+    def get(self, key):
+        """Return the live value stored for key, or None."""
+        with self.lock:
+            self.expire(time.monotonic())
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def add(self, keys, value) -> bool:
+        """Store value under every key unless one of them is already live. Returns True if stored."""
+        with self.lock:
+            now = time.monotonic()
+            self.expire(now)
+            if any(key in self.entries for key in keys):
+                return False
+            self.put_locked(keys, value, now)
+            return True
+
+    def put(self, keys, value):
+        """Store value under every key, replacing what was there."""
+        with self.lock:
+            self.put_locked(keys, value, time.monotonic())
+
+    def put_locked(self, keys, value, now: float):
+        for key in keys:
+            self.entries.pop(key, None)
+            self.entries[key] = (now + self.ttl, value)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def discard(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+
+presses = TTLCache()
+
+
+def press_keys(query) -> tuple:
+    """Keys identifying a button press: the query id, and the pressed button on this version of the message."""
+    message = query.message
+    if message is not None:
+        version = message.edit_date or message.date
+        button = ("button", message.chat_id, message.message_id, version and version.timestamp(), query.data)
+    else:
+        button = ("button", query.inline_message_id, query.data)
+    return ("query", query.id), button
+
+
+class RecordingQuery:
+    """Callback query stand-in that remembers the text of the edits made through it."""
+
+    __slots__ = ("query", "texts")
+
+    def __init__(self, query):
+        self.query = query
+        self.texts = []
+
+    def __getattr__(self, name):
+        return getattr(self.query, name)
+
+    def edit_message_text(self, text, *args, **kwargs):
+        self.texts.append(text)
+        return self.query.edit_message_text(text, *args, **kwargs)
+
+
+class RecordingUpdate:
+    """Update stand-in whose callback_query is a RecordingQuery."""
+
+    __slots__ = ("update", "callback_query")
+
+    def __init__(self, update, query: RecordingQuery):
+        self.update = update
+        self.callback_query = query
+
+    def __getattr__(self, name):
+        return getattr(self.update, name)
+
+
+def idempotent(callback):
+    """
+    Decorator for callback query handlers: run callback once per press.
+    Repeats of a finished press are answered with its last edit; repeats of a running one just stop the spinner.
+    """
+    @wraps(callback)
+    def wrapper(update, context):
+        query = update.callback_query
+        keys = press_keys(query)
+        if not presses.add(keys, IN_PROGRESS):
+            result = next((value for value in map(presses.get, keys) if value is not None), IN_PROGRESS)
+            logger.debug(f"Repeated press of {query.data!r} by user {query.from_user.id} answered from cache.")
+            query.answer(text=None if result is IN_PROGRESS else result[:ANSWER_LIMIT] or None)
+            return None
+        recorder = RecordingQuery(query)
+        try:
+            outcome = callback(RecordingUpdate(update, recorder), context)
+        except Exception:
+            # Let a redelivery try again
+            presses.discard(keys)
+            raise
+        presses.put(keys, recorder.texts[-1] if recorder.texts else "")
+        return outcome
+    return wrapper
@@ -0,0 +1,69 @@
+"""
+economy.py - Implements the admin /economy command.
+Summarizes credits earned and spent, upgrades per system, battles won and lost and
+missions completed over the last ECONOMY_HOURS hours and ECONOMY_DAYS days. The figures
+come from the hourly and daily activity rollups kept by the database, so a summary reads
+a few hundred rollup rows however many raw upgrade, mission and event rows exist.
+"""
+
+import logging
+import time
+from collections import Counter
+from telegram import Update
+from telegram.ext import CallbackContext
+import config
+import database
+from admin import admin_only
+from storage import rollup_buckets
+
+logger = logging.getLogger(__name__)
+
+
+def summarize(rows: list) -> dict:
+    """Fold rollup rows into totals: counts and amounts keyed by (metric, key), plus events per bucket."""
+    counts, amounts, events = Counter(), Counter(), Counter()
+    for row in rows:
+        counts[row["metric"], row["key"]] += row["count"]
+        amounts[row["metric"], row["key"]] += row["amount"]
+        if row["metric"] == "event":
+            events[row["bucket"]] += row["count"]
+    return {"counts": counts, "amounts": amounts, "events": events}
+
+
+def render_summary(title: str, totals: dict) -> str:
+    counts, amounts = totals["counts"], totals["amounts"]
+    mission_credits = amounts["mission", "completed"]
+    raid_credits = amounts["raid", "reward"]
+    upgrades = sorted(((key, counts[metric, key], amounts[metric, key]) for metric, key in counts
+                       if metric == "upgrade"), key=lambda upgrade: -upgrade[2])
+    text = (
+        f"{title}:\n"
+        f"Credits earned: {mission_credits + raid_credits} "
+        f"(missions {mission_credits}, raids {raid_credits})\n"
+        f"Credits spent on upgrades: {sum(cost for _, _, cost in upgrades)}\n"
+        f"Credits stolen: {amounts['steal', 'credits']} in {counts['steal', 'credits']} thefts\n"
+        f"Missions completed: {counts['mission', 'completed']}\n"
+        f"Battles: {counts['battle', 'win']} won, {counts['battle', 'loss']} lost; "
+        f"PvP duels: {counts['pvp', 'win']}\n"
+    )
+    if upgrades:
+        text += "Upgrades: " + ", ".join(f"{system} {count} ({cost} cr)" for system, count, cost in upgrades) + "\n"
+    if totals["events"]:
+        bucket, count = totals["events"].most_common(1)[0]
+        text += f"Busiest: {bucket} with {count} events\n"
+    return text
+
+
+def render_economy(now: float = None) -> str:
+    """Build the /economy report from the hourly and daily rollups."""
+    now = time.time() if now is None else now
+    hourly = database.get_rollups("hour", rollup_buckets(now - (config.ECONOMY_HOURS - 1) * 3600)["hour"])
+    daily = database.get_rollups("day", rollup_buckets(now - (config.ECONOMY_DAYS - 1) * 86400)["day"])
+    return (render_summary(f"Last {config.ECONOMY_HOURS} hours", summarize(hourly)) + "\n"
+            + render_summary(f"Last {config.ECONOMY_DAYS} days", summarize(daily)))
+
+
+@admin_only
+def economy(update: Update, context: CallbackContext):
+    """Handle the admin /economy command."""
+    update.message.reply_text(render_economy()[:4000])
@@ -0,0 +1,56 @@
+"""
+entities.py - Compact record types for game rows of the Space Simulation Telegram Game Bot.
+Ships, crew members and missions are immutable named tuples: they carry no per-instance
+__dict__, are built straight from SQLite result tuples by a cursor row factory, and can be
+handed out by the in-memory engine without copying. Fields follow the table columns.
+"""
+
+from typing import NamedTuple
+
+
+class ShipRecord(NamedTuple):
+    """A row of the spaceship table."""
+    telegram_id: int
+    fuel: int
+    oxygen: int
+    energy: int
+    cargo: int
+    weapons: int
+    shields: int
+    crew: int
+    last_update: str = None
+
+
+class CrewMember(NamedTuple):
+    """A row of the crew table."""
+    id: int
+    telegram_id: int
+    name: str
+    skill: str
+    level: int = 1
+    trained_at: str = None
+
+
+class Mission(NamedTuple):
+    """A row of the missions table."""
+    id: int
+    telegram_id: int
+    description: str
+    reward: int
+    status: str
+    created_at: str
+    time_limit: int
+
+
+def columns(entity) -> str:
+    """Return the SELECT column list matching an entity's field order."""
+    return ", ".join(entity._fields)
+
+
+def row_factory(entity):
+    """Return an sqlite3 row factory that builds entity instances from result tuples."""
+    make = tuple.__new__
+
+    def factory(cursor, row):
+        return make(entity, row)
+    return factory
@@ -0,0 +1,74 @@
+"""
+event_archive.py - Retention for the time-partitioned event logs.
+Partitions whose window ended more than EVENT_RETENTION_DAYS ago are streamed in ID
+order to a gzip-compressed CSV file in EVENT_ARCHIVE_DIR and then dropped whole,
+instead of deleting their rows one by one.
+"""
+
+import csv
+import gzip
+import logging
+import os
+import time
+from telegram.ext import CallbackContext
+import config
+import database
+from storage import timestamp
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("id", "telegram_id", "event_type", "event_details", "event_time")
+
+
+def expired_partitions(now: float = None) -> list:
+    """Return the event log partitions whose window ended before the retention cutoff."""
+    cutoff = timestamp((time.time() if now is None else now) - config.EVENT_RETENTION_DAYS * 86400)
+    return [partition for partition in database.get_event_partitions() if partition["ends_at"] <= cutoff]
+
+
+def partition_rows(name: str, chunk_size: int = None):
+    """Yield the rows of one partition, fetched in ID order chunk_size rows at a time."""
+    chunk_size = chunk_size or config.EVENT_ARCHIVE_CHUNK
+    after_id = 0
+    while True:
+        rows = database.read_event_partition(name, after_id, chunk_size)
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        after_id = rows[-1]["id"]
+
+
+def archive_partition(name: str, directory: str = None):
+    """
+    Write one partition to <directory>/<name>.csv.gz and return (path, rows written).
+    The file only appears under its final name once it is complete.
+    """
+    directory = directory or config.EVENT_ARCHIVE_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.csv.gz")
+    partial = path + ".partial"
+    count = 0
+    with gzip.open(partial, "wt", newline="", encoding="utf-8") as archive:
+        writer = csv.writer(archive)
+        writer.writerow(COLUMNS)
+        for row in partition_rows(name):
+            writer.writerow([row[column] for column in COLUMNS])
+            count += 1
+    os.replace(partial, path)
+    return path, count
+
+
+def archive_expired_events(context: CallbackContext = None):
+    """Job: archive and drop every event log partition past the retention period."""
+    for partition in expired_partitions():
+        name = partition["name"]
+        started = time.perf_counter()
+        try:
+            path, count = archive_partition(name)
+        except OSError as e:
+            # Keep the partition until it can be archived
+            logger.error(f"Could not archive event log partition {name}: {e}")
+            continue
+        database.drop_event_partition(name)
+        logger.info(f"Archived {count} events from {name} to {path} and dropped the partition "
+                    f"in {time.perf_counter() - started:.1f}s.")
@@ -0,0 +1,241 @@
+"""
+export.py - Streaming export of game tables for analytics.
+Rows are read from a read-only snapshot of the database: either a pinned read transaction
+on the live file, which game writes carry on past in the WAL, or a stored /backup snapshot.
+Each table is streamed with an SQLite cursor in EXPORT_CHUNK_ROWS chunks and written to
+gzip-compressed CSV, or to Parquet when pyarrow is installed, so memory use does not grow
+with table size.
+
+players, spaceship and missions are exported whole on every run, since their rows change
+after insert (a mission goes from available to active to completed). upgrades and
+event_logs only grow, so runs are incremental: they export rows with IDs above the
+watermarks saved by the previous run, in EXPORT_DIR/watermarks.json. --full re-exports
+the chosen tables from the start and resets only their watermarks.
+
+Usage (from the repository root):
+    python -m export                          incremental CSV export of the live database
+    python -m export --full --format parquet  everything, as Parquet
+    python -m export --source backups/space_game-20250101-000000.db
+Admins can also run /export [full] [parquet].
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import time
+from telegram import Update
+from telegram.ext import CallbackContext
+import config
+from admin import admin_only
+
+logger = logging.getLogger(__name__)
+
+# Table -> (columns with their types, incremental ID column or None for a full export)
+TABLES = {
+    "players": ((("telegram_id", "int"), ("username", "str"), ("spaceship_level", "int"),
+                 ("credits", "int")), None),
+    "spaceship": ((("telegram_id", "int"), ("fuel", "int"), ("oxygen", "int"), ("energy", "int"),
+                   ("cargo", "int"), ("weapons", "int"), ("shields", "int"), ("crew", "int"),
+                   ("last_update", "str")), None),
+    "upgrades": ((("id", "int"), ("telegram_id", "int"), ("type", "str"), ("level", "int"),
+                  ("cost", "int"), ("upgraded_at", "str")), "id"),
+    "missions": ((("id", "int"), ("telegram_id", "int"), ("description", "str"), ("reward", "int"),
+                  ("status", "str"), ("created_at", "str"), ("time_limit", "int")), None),
+    "event_logs": ((("id", "int"), ("telegram_id", "int"), ("event_type", "str"),
+                    ("event_details", "str"), ("event_time", "str")), "id"),
+}
+
+FORMATS = ("csv", "parquet")
+
+
+class ExportError(Exception):
+    """An export could not be started or written."""
+
+
+def open_snapshot(source: str = None) -> sqlite3.Connection:
+    """
+    Open a read-only connection holding one read transaction, so every table is read
+    from the same point in time. source defaults to the live database file.
+    """
+    path = source or config.DATABASE_FILENAME
+    if not os.path.isfile(path):
+        raise ExportError(f"No database file at {path}.")
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, isolation_level=None, check_same_thread=False)
+    conn.execute("BEGIN")
+    conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+    return conn
+
+
+def event_log_sources(conn: sqlite3.Connection) -> list:
+    """Return the tables holding event logs in the snapshot, oldest first."""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'event_partitions'").fetchone():
+        return [row[0] for row in conn.execute("SELECT name FROM event_partitions ORDER BY starts_at")]
+    return ["event_logs"]
+
+
+def table_chunks(conn: sqlite3.Connection, table: str, after_id: int = 0, chunk_rows: int = None):
+    """Yield the table's rows (above after_id for incremental tables) as lists of at most chunk_rows tuples."""
+    chunk_rows = chunk_rows or config.EXPORT_CHUNK_ROWS
+    columns, key = TABLES[table]
+    select = ", ".join(name for name, _ in columns)
+    sources = event_log_sources(conn) if table == "event_logs" else [table]
+    for source in sources:
+        if key:
+            cursor = conn.execute(f"SELECT {select} FROM {source} WHERE {key} > ? ORDER BY {key}", (after_id,))
+        else:
+            cursor = conn.execute(f"SELECT {select} FROM {source}")
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+
+
+class CsvWriter:
+    """Writes chunks to a gzip-compressed CSV file with a header row."""
+
+    suffix = ".csv.gz"
+
+    def __init__(self, path: str, columns):
+        self.file = gzip.open(path, "wt", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([name for name, _ in columns])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Writes chunks as row groups of a Parquet file. Needs pyarrow."""
+
+    suffix = ".parquet"
+
+    def __init__(self, path: str, columns):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ExportError("Parquet export needs the pyarrow package; use the csv format instead.")
+        self.pyarrow = pyarrow
+        types = {"int": pyarrow.int64(), "str": pyarrow.string()}
+        self.schema = pyarrow.schema([(name, types[kind]) for name, kind in columns])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression=config.EXPORT_PARQUET_COMPRESSION)
+
+    def write(self, rows):
+        arrays = [self.pyarrow.array(values, type=field.type) for values, field in zip(zip(*rows), self.schema)]
+        self.writer.write_batch(self.pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {"csv": CsvWriter, "parquet": ParquetWriter}
+
+
+def load_watermarks(directory: str) -> dict:
+    path = os.path.join(directory, "watermarks.json")
+    if not os.path.isfile(path):
+        return {}
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def save_watermarks(directory: str, watermarks: dict):
+    """Replace the watermarks file in one step, so a failed run leaves the previous one."""
+    path = os.path.join(directory, "watermarks.json")
+    with open(path + ".partial", "w") as handle:
+        json.dump(watermarks, handle, indent=2, sort_keys=True)
+    os.replace(path + ".partial", path)
+
+
+def export_tables(source: str = None, directory: str = None, fmt: str = "csv", full: bool = False,
+                  tables=None) -> dict:
+    """
+    Export tables into a new timestamped folder under directory and advance the watermarks.
+    Returns {"folder": path, "tables": {table: {"rows", "bytes", "seconds", "after_id"}}}.
+    """
+    if fmt not in WRITERS:
+        raise ExportError(f"Unknown export format {fmt}; choose one of {', '.join(FORMATS)}.")
+    unknown = set(tables or ()) - set(TABLES)
+    if unknown:
+        raise ExportError(f"Unknown tables: {', '.join(sorted(unknown))}.")
+    directory = directory or config.EXPORT_DIR
+    watermarks = load_watermarks(directory)
+    folder = os.path.join(directory, time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(folder, exist_ok=True)
+    conn = open_snapshot(source)
+    summary = {}
+    try:
+        for table in tables or TABLES:
+            columns, key = TABLES[table]
+            after_id = watermarks.get(table, 0) if key and not full else 0
+            path = os.path.join(folder, table + WRITERS[fmt].suffix)
+            started = time.perf_counter()
+            writer = WRITERS[fmt](path + ".partial", columns)
+            count, last_id = 0, after_id
+            try:
+                for rows in table_chunks(conn, table, after_id):
+                    writer.write(rows)
+                    count += len(rows)
+                    if key:
+                        last_id = rows[-1][0]
+            finally:
+                writer.close()
+            os.replace(path + ".partial", path)
+            if key:
+                watermarks[table] = last_id
+            else:
+                watermarks.pop(table, None)
+            summary[table] = {"rows": count, "bytes": os.path.getsize(path),
+                              "seconds": time.perf_counter() - started, "after_id": after_id}
+            logger.info(f"Exported {count} {table} rows to {path}.")
+    finally:
+        conn.close()
+    watermarks["exported_at"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+    save_watermarks(directory, watermarks)
+    return {"folder": folder, "tables": summary}
+
+
+def describe(result: dict) -> str:
+    lines = [f"Export written to {result['folder']}:"]
+    for table, info in result["tables"].items():
+        since = f" (IDs above {info['after_id']})" if info["after_id"] else ""
+        lines.append(f"- {table}: {info['rows']} rows{since}, {info['bytes'] / 1024:.0f} KiB, {info['seconds']:.2f}s")
+    return "\n".join(lines)
+
+
+@admin_only
+def export(update: Update, context: CallbackContext):
+    """Handle the admin /export [full] [parquet] command."""
+    args = {arg.lower() for arg in context.args}
+    try:
+        result = export_tables(fmt="parquet" if "parquet" in args else "csv", full="full" in args)
+    except (ExportError, OSError, sqlite3.Error) as e:
+        update.message.reply_text(f"Export failed: {e}")
+        return
+    update.message.reply_text(describe(result)[:4000])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help="database file to read (default: the live database)")
+    parser.add_argument("--output", default=config.EXPORT_DIR, help="export directory (default: %(default)s)")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--full", action="store_true", help="ignore the watermarks and export every row")
+    parser.add_argument("--tables", help="comma-separated tables to export (default: all)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    result = export_tables(args.source, args.output, args.format, args.full,
+                           args.tables.split(",") if args.tables else None)
+    print(describe(result))
+
+
+if __name__ == "__main__":
+    main()
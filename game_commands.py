@@ -4,14 +4,18 @@ This module interacts with the user via Telegram and calls appropriate engine fu
 """
 
 import random
+import time
 import logging
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import CallbackContext
 
 import config
 import database
+import dedupe
 import spaceship
 import battles
+import player_index
+import render_cache
 
 logger = logging.getLogger(__name__)
 
@@ -28,21 +32,26 @@ def start(update: Update, context: CallbackContext):
         "/explore - Travel to a new sector\n"
         "/shop - Enter the shop/black market\n"
         "/battle - Initiate a battle\n"
+        "/pvp - Battle another player\n"
         "/crew - Manage your crew\n"
+        "/recruit - Recruit a crew member\n"
         "/missions - View missions\n"
         "/upgrade - Upgrade ship systems\n"
         "/alliance - Join alliances\n"
+        "/raid - Join your alliance's raid\n"
         "/scan - Scan for resources and missions\n"
-        "/steal - Attempt to steal resources"
+        "/steal - Attempt to steal resources\n"
+        "/history - Browse or search your event log"
     )
     update.message.reply_text(welcome)
 
 
 def spaceship_status(update: Update, context: CallbackContext):
-    """Handle the /spaceship command to show the current ship status."""
+    """Handle the /spaceship command to show the current ship status, rendered at most once per ship change."""
     user = update.effective_user
-    ship = spaceship.Spaceship(user.id)
-    update.message.reply_text("Spaceship Status:\n" + ship.status_report())
+    text = render_cache.replies.render(
+        user.id, "spaceship", lambda: "Spaceship Status:\n" + spaceship.Spaceship(user.id).status_report())
+    update.message.reply_text(text)
 
 
 def explore(update: Update, context: CallbackContext):
@@ -61,25 +70,66 @@ def battle(update: Update, context: CallbackContext):
     user = update.effective_user
     enemy = random.choice(["pirates", "alien fighters", "bounty hunters"])
     update.message.reply_text(f"Encountered {enemy}! Battle commencing...")
-    result, log = battles.initiate_battle(user.id, enemy)
-    outcome = "\n".join(log) + f"\nBattle result: {result.upper()}"
-    update.message.reply_text(outcome)
+    battles.start_battle(context.job_queue, update.effective_chat.id, user.id, enemy)
+
+
+def pick_steal_target(thief_id: int, recent: dict = None):
+    """
+    Pick a random victim of similar spaceship level from the in-memory level index.
+    Skips the thief, players in recent ({victim_id: unix time}) robbed within the
+    cooldown and members of the thief's alliance.
+    """
+    level = player_index.levels.level_of(thief_id)
+    if level is None:
+        return None
+    now = time.time()
+    recent = recent or {}
+    exclude = {thief_id}
+    exclude.update(tid for tid, robbed_at in recent.items() if now - robbed_at < config.STEAL_VICTIM_COOLDOWN)
+    candidates = list(player_index.levels.candidates(level, window=config.STEAL_LEVEL_WINDOW, exclude=exclude,
+                                                     attempts=config.STEAL_SAMPLE_ATTEMPTS))
+    if not candidates:
+        return None
+    # One query for the thief and every candidate instead of one per candidate.
+    alliances = database.get_player_alliances([thief_id] + candidates)
+    alliance_id = alliances.get(thief_id)
+    for candidate in candidates:
+        if alliance_id is None or alliances.get(candidate) != alliance_id:
+            return candidate
+    return None
 
 
 def steal_resources(update: Update, context: CallbackContext):
     """
-    Handle the /steal command to perform a risk-reward resource theft.
-    For demo purposes, success is randomized.
+    Handle the /steal command to perform a risk-reward theft from another player
+    of similar spaceship level. Success is randomized; the transfer itself is atomic.
     """
     user = update.effective_user
+    if user.id not in player_index.levels:
+        database.add_player(user.id, user.username or "Player")
+    # Victims robbed recently, kept in the persisted user_data: {victim_id: unix time}
+    recent = context.user_data.setdefault("recent_victims", {})
+    victim_id = pick_steal_target(user.id, recent)
+    if victim_id is None:
+        update.message.reply_text("No suitable target in range. Try again later.")
+        return
+
     chance = random.randint(1, 100)
-    if chance > 50:
-        update.message.reply_text("Steal attempt succeeded! You snatched some resources.")
-        database.add_event_log(user.id, "steal", "Successfully stole resources.")
-    else:
+    if chance > config.STEAL_SUCCESS_CHANCE:
         update.message.reply_text("Steal attempt failed! You encountered resistance.")
-        database.add_event_log(user.id, "steal", "Steal attempt failed.")
-    
+        database.add_event_log(user.id, "steal", f"Steal attempt on player {victim_id} failed.")
+        return
+
+    now = time.time()
+    for tid in [tid for tid, robbed_at in recent.items() if now - robbed_at >= config.STEAL_VICTIM_COOLDOWN]:
+        del recent[tid]
+    recent[victim_id] = now
+    amount = database.steal_credits(user.id, victim_id, config.STEAL_CREDIT_FRACTION, config.STEAL_MAX_CREDITS)
+    if amount:
+        update.message.reply_text(f"Steal attempt succeeded! You snatched {amount} credits.")
+    else:
+        update.message.reply_text("You slipped aboard, but their vault was empty.")
+
 
 def upgrade(update: Update, context: CallbackContext):
     """Handle the /upgrade command to show system upgrade options."""
@@ -95,10 +145,9 @@ def upgrade(update: Update, context: CallbackContext):
 def button_handler(update: Update, context: CallbackContext):
     """
     General handler for inline button callback queries not handled by other modules.
-    Delegates travel and upgrade requests.
+    Delegates travel and upgrade requests, which answer their own queries.
     """
     query = update.callback_query
-    query.answer()
     data = query.data
 
     if data.startswith("travel_"):
@@ -106,11 +155,14 @@ def button_handler(update: Update, context: CallbackContext):
     elif data.startswith("upgrade_"):
         upgrade_callback(update, context)
     else:
+        query.answer()
         query.edit_message_text("Unknown action.")
 
 
+@dedupe.idempotent
 def travel_callback(update: Update, context: CallbackContext):
     query = update.callback_query
+    query.answer()
     sectors = int(query.data.split("_")[1])
     user_id = query.from_user.id
     ship = spaceship.Spaceship(user_id)
@@ -118,8 +170,10 @@ def travel_callback(update: Update, context: CallbackContext):
     query.edit_message_text(msg)
 
 
+@dedupe.idempotent
 def upgrade_callback(update: Update, context: CallbackContext):
     query = update.callback_query
+    query.answer()
     system = query.data.split("_")[1]
     user_id = query.from_user.id
     ship = spaceship.Spaceship(user_id)
@@ -0,0 +1,125 @@
+"""
+history.py - Implements the /history command for the Space Simulation Telegram Game Bot.
+Players page through their event log (battles, steals, sector events) newest first,
+optionally filtered by a full-text search: /history pirates
+The Newer/Older buttons carry their page position and a short key of the search, so
+every /history message keeps paging through its own results.
+"""
+
+import logging
+import zlib
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import CallbackContext
+import database
+
+logger = logging.getLogger(__name__)
+
+# Characters of an event's details shown per line
+DETAIL_CHARS = 80
+# Searches remembered per player for paging older /history messages
+SEARCHES_KEPT = 20
+
+
+def encode_position(row: dict) -> str:
+    """Pack a row's (event_time, id) keyset position into callback data: YYYYMMDDHHMMSS_id."""
+    digits = "".join(ch for ch in row["event_time"] if ch.isdigit())
+    return f"{digits}_{row['id']}"
+
+
+def decode_position(text: str) -> tuple:
+    """Unpack a position made by encode_position back into (event_time, id)."""
+    digits, event_id = text.split("_")
+    if len(digits) != 14:
+        raise ValueError(f"Bad history position: {text}")
+    event_time = f"{digits[:4]}-{digits[4:6]}-{digits[6:8]} {digits[8:10]}:{digits[10:12]}:{digits[12:]}"
+    return event_time, int(event_id)
+
+
+def search_key(search: str) -> str:
+    """Short key of a search term, small enough for callback data."""
+    return f"{zlib.crc32(search.encode()):08x}"
+
+
+def remember_search(user_data: dict, search: str) -> str:
+    """Store a search under its key in user_data, keeping the latest SEARCHES_KEPT, and return the key."""
+    key = search_key(search)
+    searches = user_data.setdefault("history_searches", {})
+    searches.pop(key, None)
+    searches[key] = search
+    while len(searches) > SEARCHES_KEPT:
+        del searches[next(iter(searches))]
+    return key
+
+
+def render_history_page(user_id: int, before: tuple = None, after: tuple = None, search: str = None):
+    """
+    Build the text and navigation buttons for one page of a player's event history.
+    Pages are fetched by keyset on (event_time, id), so deep pages cost the same as the first.
+    """
+    events, has_more = database.get_event_page(user_id, before=before, after=after, search=search)
+    title = f"Events matching '{search}'" if search else "Your event history"
+    if not events:
+        return f"{title}: nothing found.", None
+
+    text = f"{title}:\n"
+    for event in events:
+        details = event["event_details"].split("\n", 1)[0]
+        if len(details) > DETAIL_CHARS or "\n" in event["event_details"]:
+            details = details[:DETAIL_CHARS].rstrip() + "..."
+        text += f"{event['event_time']} [{event['event_type']}] {details}\n"
+
+    if after is not None:
+        has_newer, has_older = has_more, True
+    else:
+        has_newer, has_older = before is not None, has_more
+    suffix = f"_{search_key(search)}" if search else ""
+    buttons = []
+    if has_newer:
+        buttons.append(InlineKeyboardButton(
+            "« Newer", callback_data=f"history_newer_{encode_position(events[0])}{suffix}"))
+    if has_older:
+        buttons.append(InlineKeyboardButton(
+            "Older »", callback_data=f"history_older_{encode_position(events[-1])}{suffix}"))
+    reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
+    return text, reply_markup
+
+
+def history(update: Update, context: CallbackContext):
+    """
+    Handle the /history command.
+    Shows the newest page of the player's events; any arguments are used as search terms
+    and stay in effect while paging this message.
+    """
+    search = " ".join(context.args).strip() or None
+    if search:
+        remember_search(context.user_data, search)
+    text, reply_markup = render_history_page(update.effective_user.id, search=search)
+    update.message.reply_text(text, reply_markup=reply_markup)
+
+
+def history_callback(update: Update, context: CallbackContext):
+    """Handle the Newer/Older buttons of the event history."""
+    query = update.callback_query
+    query.answer()
+    # Callback data: history_newer_<first shown position>[_<search key>]
+    # or history_older_<last shown position>[_<search key>]
+    try:
+        _, direction, digits, event_id, *key = query.data.split("_")
+        position = decode_position(f"{digits}_{event_id}")
+        if len(key) > 1:
+            raise ValueError(f"Bad history callback: {query.data}")
+    except ValueError:
+        query.edit_message_text("Invalid history page.")
+        return
+    search = None
+    if key:
+        search = context.user_data.get("history_searches", {}).get(key[0])
+        if search is None:
+            query.edit_message_text("This search has expired. Run /history again.")
+            return
+        remember_search(context.user_data, search)
+    if direction == "newer":
+        text, reply_markup = render_history_page(query.from_user.id, after=position, search=search)
+    else:
+        text, reply_markup = render_history_page(query.from_user.id, before=position, search=search)
+    query.edit_message_text(text, reply_markup=reply_markup)
@@ -5,20 +5,19 @@ This file initializes the Telegram bot, configures command and callback handlers
 sets up the job queue for timed events, and starts the bot's polling loop.
 """
 
+import importlib
 import logging
 import sys
-from telegram.ext import Updater, CommandHandler, CallbackQueryHandler, CallbackContext, JobQueue
+from telegram.ext import Updater, Dispatcher, CommandHandler, CallbackQueryHandler, CallbackContext, JobQueue
 
-# Import game modules
+# Core modules. Game modules are imported lazily, on first use of their command or job.
 import config
 import database
-import game_commands
-import events
-import alliance
-import crew
-import shop
-import scanning
-import missions
+import player_index
+import metrics
+import profiler
+import throttle
+from persistence import DatabasePersistence
 
 # Configure logging
 logging.basicConfig(
@@ -28,49 +27,174 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Command name -> (module, handler function)
+COMMANDS = [
+    ("start", "game_commands", "start"),
+    ("spaceship", "game_commands", "spaceship_status"),
+    ("explore", "game_commands", "explore"),
+    ("shop", "shop", "shop"),
+    ("battle", "game_commands", "battle"),
+    ("crew", "crew", "crew_status"),
+    ("recruit", "crew", "recruit_crew"),
+    ("missions", "missions", "missions"),
+    ("upgrade", "game_commands", "upgrade"),
+    ("alliance", "alliance", "alliance_menu"),
+    ("scan", "scanning", "scan"),
+    ("steal", "game_commands", "steal_resources"),
+    ("raid", "raids", "raid"),
+    ("pvp", "pvp", "pvp"),
+    ("history", "history", "history"),
+    ("backup", "backup", "backup"),
+    ("restore", "backup", "restore"),
+    ("export", "export", "export"),
+    ("economy", "economy", "economy"),
+    ("stats", "metrics", "stats"),
+    ("profile", "profiler", "profile"),
+    ("slow", "profiler", "slow"),
+]
+
+# Callback queries from inline buttons: (data pattern, module, handler function).
+# Only the first matching handler runs, so the catch-all button handler comes last.
+CALLBACKS = [
+    ("^alliance_", "alliance", "alliance_callback"),
+    ("^shop_", "shop", "shop_callback"),
+    ("^travel_", "game_commands", "travel_callback"),
+    ("^upgrade_", "game_commands", "upgrade_callback"),
+    ("^history_", "history", "history_callback"),
+    ("^mission_", "missions", "mission_callback"),
+    (None, "game_commands", "button_handler"),
+]
+
+# Modules that are only imported once one of their handlers or jobs runs
+HANDLER_MODULES = sorted({module for _, module, _ in COMMANDS + CALLBACKS if module not in ("metrics", "profiler")}
+                         | {"events", "event_archive"})
+
+
+def lazy(module_name: str, attribute: str):
+    """
+    Return a callback that imports module_name on its first call and then delegates
+    to the named function. Module and name are copied so metrics labels stay the same.
+    """
+    target = None
+
+    def callback(*args, **kwargs):
+        nonlocal target
+        if target is None:
+            target = getattr(importlib.import_module(module_name), attribute)
+        return target(*args, **kwargs)
+    callback.__module__ = module_name
+    callback.__name__ = callback.__qualname__ = attribute
+    return callback
+
+
+def register_handlers(dispatcher: Dispatcher):
+    """Register every command and callback query handler on the dispatcher."""
+    for command, module_name, attribute in COMMANDS:
+        dispatcher.add_handler(CommandHandler(command, lazy(module_name, attribute)))
+    for pattern, module_name, attribute in CALLBACKS:
+        dispatcher.add_handler(CallbackQueryHandler(lazy(module_name, attribute), pattern=pattern))
+
+
+def preload_job_triggers():
+    """
+    Register APScheduler's built-in triggers with the scheduler class up front.
+    Otherwise the first job using each trigger resolves it through setuptools entry
+    points, which costs around 200 ms on the first run_repeating or run_once call.
+    """
+    from apscheduler.schedulers.base import BaseScheduler
+    from apscheduler.triggers.cron import CronTrigger
+    from apscheduler.triggers.date import DateTrigger
+    from apscheduler.triggers.interval import IntervalTrigger
+    classes = getattr(BaseScheduler, "_trigger_classes", None)
+    if isinstance(classes, dict):
+        for alias, trigger_class in (("interval", IntervalTrigger), ("date", DateTrigger), ("cron", CronTrigger)):
+            classes.setdefault(alias, trigger_class)
+
+
+def schedule_jobs(job_queue: JobQueue):
+    """Schedule the periodic game jobs."""
+    # Random sector events every 2 minutes
+    job_queue.run_repeating(lazy("events", "random_sector_event"), interval=120, first=10, context={})
+    # Periodic spaceship system updates every minute
+    job_queue.run_repeating(lazy("game_commands", "update_ship_status"), interval=60, first=5, context={})
+    # Keep the pool of ready missions topped up
+    job_queue.run_repeating(lazy("missions", "fill_mission_pool"), interval=config.MISSION_POOL_INTERVAL,
+                            first=1, context={})
+    # Periodic mission timer update every 90 seconds
+    job_queue.run_repeating(lazy("missions", "update_missions"), interval=90, first=15, context={})
+    # PvP matchmaking passes with widening rating windows
+    job_queue.run_repeating(lazy("pvp", "match_waiting_players"), interval=config.PVP_MATCH_INTERVAL,
+                            first=5, context={})
+    # Alliance raid rounds
+    job_queue.run_repeating(lazy("raids", "resolve_raid_rounds"), interval=config.RAID_ROUND_INTERVAL,
+                            first=20, context={})
+    # Crew training: level up every crew member whose training time has passed
+    job_queue.run_repeating(lazy("crew", "train_crew"), interval=config.CREW_TRAINING_INTERVAL,
+                            first=30, context={})
+    # Event log retention: archive and drop expired partitions
+    job_queue.run_repeating(lazy("event_archive", "archive_expired_events"), interval=config.EVENT_ARCHIVE_INTERVAL,
+                            first=60, context={})
+    if config.BACKUP_INTERVAL:
+        # Scheduled database snapshots
+        job_queue.run_repeating(lazy("backup", "backup_job"), interval=config.BACKUP_INTERVAL,
+                                first=config.BACKUP_INTERVAL, context={})
+    if config.METRICS_ENABLED and config.METRICS_FILE:
+        # Prometheus textfile export
+        job_queue.run_repeating(metrics.write_metrics_file, interval=config.METRICS_EXPORT_INTERVAL,
+                                first=config.METRICS_EXPORT_INTERVAL, context={})
+
+
+def warm_caches():
+    """
+    Fill in-memory caches from the database. Runs once polling has started so
+    the first updates are not held up; live writes made meanwhile are kept.
+    """
+    # Index players by level for steal target selection
+    player_index.levels.load(database.get_player_levels())
+    logger.info(f"Indexed {len(player_index.levels)} players by level.")
+
+
 def start_bot():
     """
     The main initialization for the Telegram bot and the game.
     It sets up handlers, job queue events, and kicks off the scheduler.
     """
-    updater = Updater(token=config.TELEGRAM_API_TOKEN, use_context=True)
+    # Select the storage engine, then create tables if not exist
+    database.set_backend(config.STORAGE_BACKEND)
+    if config.METRICS_ENABLED:
+        metrics.instrument_database(database)
+    if config.SLOW_REQUEST_THRESHOLD:
+        profiler.instrument_database(database)
+    database.init_db()
+
+    # Session state is read from the database, so the Updater comes after init_db
+    persistence = DatabasePersistence() if config.PERSISTENCE_ENABLED else None
+    updater = Updater(token=config.TELEGRAM_API_TOKEN, use_context=True, persistence=persistence,
+                      workers=config.DISPATCHER_WORKERS)
     dispatcher = updater.dispatcher
 
-    # Initialize database, create tables if not exist
-    database.init_db()
+    register_handlers(dispatcher)
 
-    # Register command handlers
-    dispatcher.add_handler(CommandHandler("start", game_commands.start))
-    dispatcher.add_handler(CommandHandler("spaceship", game_commands.spaceship_status))
-    dispatcher.add_handler(CommandHandler("explore", game_commands.explore))
-    dispatcher.add_handler(CommandHandler("shop", shop.shop))
-    dispatcher.add_handler(CommandHandler("battle", game_commands.battle))
-    dispatcher.add_handler(CommandHandler("crew", crew.crew_status))
-    dispatcher.add_handler(CommandHandler("missions", missions.missions))
-    dispatcher.add_handler(CommandHandler("upgrade", game_commands.upgrade))
-    dispatcher.add_handler(CommandHandler("alliance", alliance.alliance_menu))
-    dispatcher.add_handler(CommandHandler("scan", scanning.scan))
-    dispatcher.add_handler(CommandHandler("steal", game_commands.steal_resources))
-
-    # Callback queries from inline buttons
-    dispatcher.add_handler(CallbackQueryHandler(game_commands.button_handler))
-    dispatcher.add_handler(CallbackQueryHandler(alliance.alliance_callback, pattern="^alliance_"))
-    dispatcher.add_handler(CallbackQueryHandler(shop.shop_callback, pattern="^shop_"))
-    dispatcher.add_handler(CallbackQueryHandler(game_commands.travel_callback, pattern="^travel_"))
-    dispatcher.add_handler(CallbackQueryHandler(game_commands.upgrade_callback, pattern="^upgrade_"))
-    
     # Set up job queue events
-    job_queue: JobQueue = updater.job_queue
+    preload_job_triggers()
+    schedule_jobs(updater.job_queue)
+    if persistence:
+        updater.job_queue.run_repeating(persistence.flush_job, interval=config.PERSISTENCE_FLUSH_INTERVAL,
+                                        first=config.PERSISTENCE_FLUSH_INTERVAL, context={})
 
-    # Random sector events every 2 minutes
-    job_queue.run_repeating(events.random_sector_event, interval=120, first=10, context={})
-    # Periodic spaceship system updates every minute
-    job_queue.run_repeating(game_commands.update_ship_status, interval=60, first=5, context={})
-    # Periodic mission timer update every 90 seconds
-    job_queue.run_repeating(missions.update_missions, interval=90, first=15, context={})
+    if config.METRICS_ENABLED:
+        metrics.instrument_dispatcher(dispatcher)
+        metrics.instrument_jobs(updater.job_queue)
+        if config.METRICS_PORT:
+            metrics.start_http_server(config.METRICS_PORT)
+    if config.SLOW_REQUEST_THRESHOLD:
+        profiler.instrument_dispatcher(dispatcher)
+    # Last, so handler timings above exclude the time spent waiting behind the player's previous update
+    throttle.gate.install(dispatcher)
 
     logger.info("Bot is starting...")
     updater.start_polling()
+    warm_caches()
     updater.idle()
 
 
@@ -0,0 +1,273 @@
+"""
+metrics.py - Hot-path instrumentation for the Space Simulation Telegram Game Bot.
+Wraps every registered handler and job, every public database function and the storage
+lock, recording latency histograms, call counts and errors. Metrics are shown to admins
+by /stats and exported in Prometheus text format to a file and, optionally, over HTTP.
+
+Each observation costs two clock reads, a bisect over fixed bucket bounds and one
+uncontended lock, keeping the per-call overhead around a microsecond.
+"""
+
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from telegram import Update
+from telegram.ext import CallbackContext
+import config
+from admin import admin_only
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds, from 10 microseconds to 10 seconds
+BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+           0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Database module functions that are plumbing rather than game queries
+_DB_SKIP = {"get_connection", "ship_power_sql", "set_backend", "get_backend"}
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with a running count, sum and error count."""
+
+    __slots__ = ("counts", "count", "total", "errors", "lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+
+    def error(self):
+        with self.lock:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket that contains it."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS, self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    """All histograms, keyed by metric family and label value."""
+
+    def __init__(self):
+        self.families = {}
+        self.lock = threading.Lock()
+
+    def histogram(self, family: str, label: str = "") -> Histogram:
+        """Return the histogram for family{label}, creating it on first use."""
+        series = self.families.get(family)
+        if series is None or label not in series:
+            with self.lock:
+                series = self.families.setdefault(family, {})
+                series.setdefault(label, Histogram())
+        return series[label]
+
+    def reset(self):
+        with self.lock:
+            self.families = {}
+
+
+registry = Registry()
+
+# Metric families: (name, label name, help text)
+FAMILIES = {
+    "handler": ("space_handler_seconds", "handler", "Telegram update handler latency."),
+    "job": ("space_job_seconds", "job", "Job queue callback latency."),
+    "db": ("space_db_call_seconds", "function", "database.py function latency, lock wait included."),
+    "lock": ("space_db_lock_wait_seconds", "", "Time spent waiting to acquire the storage lock."),
+}
+
+
+def callable_name(fn) -> str:
+    """Return module.qualname for a handler or job callback."""
+    return f"{getattr(fn, '__module__', '?')}.{getattr(fn, '__qualname__', repr(fn))}"
+
+
+def timed(family: str, name: str, fn):
+    """Wrap fn so every call is recorded in the family histogram labelled name."""
+    histogram = registry.histogram(family, name)
+    clock = time.perf_counter
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            histogram.error()
+            raise
+        finally:
+            histogram.observe(clock() - start)
+    wrapper.__wrapped_metrics__ = True
+    return wrapper
+
+
+class InstrumentedLock:
+    """Lock proxy recording how long each acquisition waited."""
+
+    def __init__(self, lock):
+        self.lock = lock
+        self.histogram = registry.histogram("lock")
+
+    def acquire(self, blocking: bool = True, timeout: float = -1):
+        start = time.perf_counter()
+        acquired = self.lock.acquire(blocking, timeout)
+        self.histogram.observe(time.perf_counter() - start)
+        return acquired
+
+    def release(self):
+        self.lock.release()
+
+    def locked(self) -> bool:
+        return self.lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def instrument_dispatcher(dispatcher):
+    """Wrap the callback of every handler registered on the dispatcher."""
+    for handlers in dispatcher.handlers.values():
+        for handler in handlers:
+            if not getattr(handler.callback, "__wrapped_metrics__", False):
+                handler.callback = timed("handler", callable_name(handler.callback), handler.callback)
+
+
+def instrument_jobs(job_queue):
+    """Wrap the callback of every job scheduled so far."""
+    for job in job_queue.jobs():
+        if not getattr(job.callback, "__wrapped_metrics__", False):
+            job.callback = timed("job", callable_name(job.callback), job.callback)
+
+
+def database_functions(database_module):
+    """Yield (name, function) for each public game query defined in the database module."""
+    for name in dir(database_module):
+        fn = getattr(database_module, name)
+        if (name.startswith("_") or name in _DB_SKIP or not callable(fn) or isinstance(fn, type)
+                or getattr(fn, "__module__", None) != database_module.__name__):
+            continue
+        yield name, fn
+
+
+def instrument_database(database_module):
+    """Replace each public database function with a timed wrapper and time the storage lock."""
+    for name, fn in list(database_functions(database_module)):
+        if not getattr(fn, "__wrapped_metrics__", False):
+            setattr(database_module, name, timed("db", name, fn))
+    backend = database_module.get_backend()
+    if not isinstance(backend.lock, InstrumentedLock):
+        backend.lock = InstrumentedLock(backend.lock)
+
+
+def render_prometheus() -> str:
+    """Render every histogram in the Prometheus text exposition format."""
+    lines = []
+    for family, (metric, label_name, help_text) in FAMILIES.items():
+        series = registry.families.get(family)
+        if not series:
+            continue
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} histogram")
+        for label, histogram in sorted(series.items()):
+            labels = f'{label_name}="{label}"' if label_name else ""
+            sep = "," if labels else ""
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{labels}{sep}le="+Inf"}} {histogram.count}')
+            lines.append(f"{metric}_sum{{{labels}}} {histogram.total:.9f}")
+            lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+        if label_name:
+            errors = f"{metric.rsplit('_seconds', 1)[0]}_errors_total"
+            lines.append(f"# TYPE {errors} counter")
+            for label, histogram in sorted(series.items()):
+                lines.append(f'{errors}{{{label_name}="{label}"}} {histogram.errors}')
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(context: CallbackContext = None):
+    """Job: atomically rewrite config.METRICS_FILE (for a node-exporter textfile collector)."""
+    temp_path = config.METRICS_FILE + ".tmp"
+    with open(temp_path, "w") as handle:
+        handle.write(render_prometheus())
+    os.replace(temp_path, config.METRICS_FILE)
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        return
+
+
+def start_http_server(port: int, host: str = "127.0.0.1"):
+    """Serve /metrics over HTTP from a daemon thread. Returns the server."""
+    server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics_http", daemon=True)
+    thread.start()
+    logger.info(f"Serving Prometheus metrics on http://{host}:{port}/metrics")
+    return server
+
+
+def summary_lines(family: str, limit: int = 10):
+    """Return report lines for the busiest series of a family, by total time."""
+    series = registry.families.get(family, {})
+    ranked = sorted((item for item in series.items() if item[1].count),
+                    key=lambda item: item[1].total, reverse=True)[:limit]
+    lines = []
+    for label, h in ranked:
+        mean_ms = h.total / h.count * 1000 if h.count else 0.0
+        lines.append(
+            f"{label or 'all'}: {h.count} calls, mean {mean_ms:.2f} ms, "
+            f"p50<={h.quantile(0.5) * 1000:g} ms, p99<={h.quantile(0.99) * 1000:g} ms, errors {h.errors}"
+        )
+    return lines
+
+
+@admin_only
+def stats(update: Update, context: CallbackContext):
+    """Handle the admin /stats command with a summary of the busiest handlers, jobs and queries."""
+    sections = [("Handlers", "handler"), ("Jobs", "job"), ("Database", "db"), ("Storage lock wait", "lock")]
+    text = "Bot statistics:\n"
+    for title, family in sections:
+        lines = summary_lines(family, limit=config.STATS_TOP_N)
+        if lines:
+            text += f"\n{title}:\n" + "\n".join(f"- {line}" for line in lines) + "\n"
+    if not registry.families:
+        text += "No metrics recorded yet."
+    update.message.reply_text(text[:4000])
@@ -2,6 +2,9 @@
 missions.py - Implements mission functionalities for the Space Simulation Telegram Game Bot.
 Players can view their active missions, accept new missions, and have missions automatically updated
 or completed via periodic background tasks.
+Missions are generated ahead of time from sector and difficulty templates: a job keeps a pool
+of unclaimed missions topped up in batches, and accepting one claims the oldest with a single
+UPDATE, so accepts never wait for generation.
 """
 
 import logging
@@ -10,32 +13,53 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
 import database
 import config
+import dedupe
+import render_cache
+from entities import Mission
 
 logger = logging.getLogger(__name__)
 
+SECTORS = ["Orion Expanse", "Kepler Drift", "Vega Reach", "Outer Rim", "Andromeda Gate", "Sirius Belt"]
+
+# Difficulty label -> multiplier for reward and time limit
+DIFFICULTIES = [("Routine", 1), ("Hazardous", 2), ("Critical", 3)]
+
+MISSION_TEMPLATES = [
+    "Rescue the stranded astronauts in the {sector}.",
+    "Collect rare minerals from an asteroid belt in the {sector}.",
+    "Investigate a suspicious derelict spacecraft in the {sector}.",
+    "Deliver critical supplies to a colony in the {sector}.",
+    "Explore an uncharted nebula in the {sector} for anomalies.",
+]
+
+def render_missions(telegram_id: int) -> tuple:
+    """Build the /missions reply as (text, reply_markup)."""
+    active_missions = database.get_active_missions(telegram_id)
+    if not active_missions:
+        text = "You have no active missions. Would you like to accept a new mission?"
+        keyboard = [
+            [InlineKeyboardButton("Accept New Mission", callback_data="mission_accept")]
+        ]
+        return text, InlineKeyboardMarkup(keyboard)
+    text = "Your Active Missions:\n" + "".join(
+        f"- {mission.description} (Reward: {mission.reward} credits, "
+        f"Time Limit: {mission.time_limit} seconds)\n"
+        for mission in active_missions
+    )
+    return text, None
+
+
 def missions(update: Update, context: CallbackContext):
     """
     Handle the /missions command.
     Displays the user's active missions. If none exist, provides an option to accept a new mission.
+    The reply is rendered at most once per change to the player's missions.
     """
     user = update.effective_user
-    active_missions = database.get_active_missions(user.id)
-    if not active_missions:
-        text = "You have no active missions. Would you like to accept a new mission?"
-        keyboard = [
-            [InlineKeyboardButton("Accept New Mission", callback_data="mission_accept")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        update.message.reply_text(text, reply_markup=reply_markup)
-    else:
-        text = "Your Active Missions:\n"
-        for mission in active_missions:
-            text += (
-                f"- {mission['description']} (Reward: {mission['reward']} credits, "
-                f"Time Limit: {mission['time_limit']} seconds)\n"
-            )
-        update.message.reply_text(text)
+    text, reply_markup = render_cache.replies.render(user.id, "missions", lambda: render_missions(user.id))
+    update.message.reply_text(text, reply_markup=reply_markup)
 
+@dedupe.idempotent
 def mission_callback(update: Update, context: CallbackContext):
     """
     Handle callback queries related to missions.
@@ -50,40 +74,54 @@ def mission_callback(update: Update, context: CallbackContext):
         new_mission = assign_new_mission(query.from_user.id)
         message = (
             f"New Mission Accepted!\n"
-            f"Description: {new_mission['description']}\n"
-            f"Reward: {new_mission['reward']} credits\n"
-            f"Time Limit: {new_mission['time_limit']} seconds"
+            f"Description: {new_mission.description}\n"
+            f"Reward: {new_mission.reward} credits\n"
+            f"Time Limit: {new_mission.time_limit} seconds"
         )
         query.edit_message_text(message)
     else:
         query.edit_message_text("Invalid mission action.")
 
-def assign_new_mission(user_id: int) -> dict:
+def generate_mission() -> tuple:
+    """Return a random (description, reward, time_limit) built from a sector, difficulty and task template."""
+    label, multiplier = random.choice(DIFFICULTIES)
+    description = f"[{label}] " + random.choice(MISSION_TEMPLATES).format(sector=random.choice(SECTORS))
+    reward = random.randint(20, 40) * multiplier
+    time_limit = random.randint(60, 100) * multiplier
+    return description, reward, time_limit
+
+
+def fill_mission_pool(context: CallbackContext = None) -> int:
+    """
+    Job: top the pool of unclaimed missions back up to MISSION_POOL_SIZE once it falls
+    below MISSION_POOL_MIN, inserting MISSION_POOL_BATCH missions per transaction.
+    Returns the number of missions added.
+    """
+    available = database.count_pool_missions()
+    if available >= config.MISSION_POOL_MIN:
+        return 0
+    missing = config.MISSION_POOL_SIZE - available
+    added = 0
+    while added < missing:
+        batch = [generate_mission() for _ in range(min(config.MISSION_POOL_BATCH, missing - added))]
+        added += database.add_pool_missions(batch)
+    logger.info(f"Added {added} missions to the pool ({available} were left).")
+    return added
+
+
+def assign_new_mission(user_id: int) -> Mission:
     """
-    Assign a new mission to the specified user.
-    Generates a mission with randomized description, reward, and time limit.
-    Inserts the mission into the database and returns the newly created mission details.
+    Assign a new mission to the specified user by claiming one from the pool.
+    If the pool has run dry before the next refill, a mission is generated on the spot.
+    Returns the assigned Mission.
     """
-    mission_descriptions = [
-        "Rescue the stranded astronauts.",
-        "Collect rare minerals from the asteroid belt.",
-        "Investigate a suspicious derelict spacecraft.",
-        "Deliver critical supplies to an outer rim colony.",
-        "Explore an uncharted nebula for anomalies."
-    ]
-    description = random.choice(mission_descriptions)
-    reward = random.randint(20, 100)
-    time_limit = random.randint(60, 300)
-    # Insert the mission into the database.
-    mission_id = database.add_mission(user_id, description, reward, time_limit)
-    mission = {
-        "id": mission_id,
-        "user_id": user_id,
-        "description": description,
-        "reward": reward,
-        "time_limit": time_limit
-    }
-    logger.info(f"Assigned new mission {mission_id} to user {user_id}.")
+    mission = database.claim_mission(user_id)
+    if mission is None:
+        logger.warning("Mission pool is empty; generating a mission on demand.")
+        description, reward, time_limit = generate_mission()
+        mission_id = database.add_mission(user_id, description, reward, time_limit)
+        mission = Mission(mission_id, user_id, description, reward, "active", None, time_limit)
+    logger.info(f"Assigned new mission {mission.id} to user {user_id}.")
     return mission
 
 def update_missions(context: CallbackContext):
@@ -101,8 +139,8 @@ def update_missions(context: CallbackContext):
             for mission in active:
                 # Random chance to mark a mission complete, simulating mission progress.
                 if random.choice([True, False]):
-                    database.complete_mission(mission['id'])
-                    logger.info(f"Mission {mission['id']} completed for user {user_id}.")
+                    database.complete_mission(mission.id)
+                    logger.info(f"Mission {mission.id} completed for user {user_id}.")
         else:
             # If the user has no active missions, assign a new mission.
             assign_new_mission(user_id)
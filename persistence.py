@@ -0,0 +1,142 @@
+"""
+persistence.py - python-telegram-bot persistence stored in the game database.
+user_data, chat_data and bot_data are kept in the session_state table, one row per
+(kind, owner, key) holding the pickled value. Users and chats are loaded lazily the
+first time an update touches them. Changes are detected per key by comparing pickles
+with what was last loaded or saved, and only changed keys are written, in batches.
+"""
+
+import logging
+import pickle
+import threading
+from collections import defaultdict
+from telegram.ext import BasePersistence, CallbackContext
+import config
+import database
+
+logger = logging.getLogger(__name__)
+
+USER, CHAT, BOT, CONVERSATION = "user", "chat", "bot", "conversation"
+
+
+class LazyDataDict(defaultdict):
+    """defaultdict of per-owner dicts whose missing owners are loaded on first access."""
+
+    def __init__(self, loader):
+        super().__init__(dict)
+        self.loader = loader
+
+    def __missing__(self, owner_id):
+        # Two threads may load the same owner at once; the first stored dict wins.
+        return self.setdefault(owner_id, self.loader(owner_id))
+
+
+class DatabasePersistence(BasePersistence):
+    """
+    Persistence for user_data, chat_data, bot_data and conversations in the active storage backend.
+    update_* calls only queue changed keys; flush() writes the queue in one transaction.
+    It runs from a repeating job, when the queue grows past max_pending and on shutdown.
+    """
+
+    def __init__(self, store_user_data: bool = True, store_chat_data: bool = True,
+                 store_bot_data: bool = True, max_pending: int = None):
+        super().__init__(store_user_data=store_user_data, store_chat_data=store_chat_data,
+                         store_bot_data=store_bot_data)
+        self.max_pending = max_pending or config.PERSISTENCE_MAX_PENDING
+        # (kind, owner_id) -> {key pickle: value pickle} as last loaded or queued
+        self.snapshots = {}
+        # (kind, owner_id, key pickle) -> value pickle, or None to delete
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+
+    # Game state never holds Bot objects, so the deep copies BasePersistence makes
+    # to swap them in and out of stored data are skipped.
+    def insert_bot(self, obj):
+        return obj
+
+    @classmethod
+    def replace_bot(cls, obj):
+        return obj
+
+    def load(self, kind: str, owner_id: int) -> dict:
+        """Read one owner's stored entries and remember them as the clean snapshot."""
+        rows = database.load_session_state(kind, owner_id)
+        with self.lock:
+            self.snapshots[(kind, owner_id)] = dict(rows)
+        return {pickle.loads(key): pickle.loads(value) for key, value in rows.items()}
+
+    def track(self, kind: str, owner_id: int, data: dict):
+        """Queue the keys of data that differ from the snapshot, and deletions of missing keys."""
+        snapshot = self.snapshots.get((kind, owner_id))
+        if not data and not snapshot:
+            return
+        current = {pickle.dumps(key, pickle.HIGHEST_PROTOCOL): pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+                   for key, value in list(data.items())}
+        snapshot = snapshot or {}
+        with self.lock:
+            for key, value in current.items():
+                if snapshot.get(key) != value:
+                    self.pending[(kind, owner_id, key)] = value
+            for key in snapshot.keys() - current.keys():
+                self.pending[(kind, owner_id, key)] = None
+            self.snapshots[(kind, owner_id)] = current
+            backlog = len(self.pending)
+        if backlog >= self.max_pending:
+            self.flush()
+
+    def get_user_data(self):
+        return LazyDataDict(lambda user_id: self.load(USER, user_id))
+
+    def get_chat_data(self):
+        return LazyDataDict(lambda chat_id: self.load(CHAT, chat_id))
+
+    def get_bot_data(self) -> dict:
+        return self.load(BOT, 0)
+
+    def get_conversations(self, name: str) -> dict:
+        return self.load(f"{CONVERSATION}:{name}", 0)
+
+    def update_user_data(self, user_id: int, data: dict):
+        self.track(USER, user_id, data)
+
+    def update_chat_data(self, chat_id: int, data: dict):
+        self.track(CHAT, chat_id, data)
+
+    def update_bot_data(self, data: dict):
+        self.track(BOT, 0, data)
+
+    def update_conversation(self, name: str, key, new_state):
+        kind = f"{CONVERSATION}:{name}"
+        encoded = pickle.dumps(key, pickle.HIGHEST_PROTOCOL)
+        value = None if new_state is None else pickle.dumps(new_state, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            snapshot = self.snapshots.setdefault((kind, 0), {})
+            if snapshot.get(encoded) != value:
+                self.pending[(kind, 0, encoded)] = value
+                if value is None:
+                    snapshot.pop(encoded, None)
+                else:
+                    snapshot[encoded] = value
+
+    def flush(self):
+        """Write every queued change in one transaction. Failed batches are requeued."""
+        with self.flush_lock:
+            with self.lock:
+                pending, self.pending = self.pending, {}
+            if not pending:
+                return
+            try:
+                database.save_session_state([(kind, owner_id, key, value)
+                                             for (kind, owner_id, key), value in pending.items()])
+            except Exception:
+                with self.lock:
+                    # Changes queued since the swap are newer and win.
+                    for entry, value in pending.items():
+                        self.pending.setdefault(entry, value)
+                raise
+            logger.debug(f"Flushed {len(pending)} session state changes.")
+
+    def flush_job(self, context: CallbackContext):
+        """Job: write queued session state changes."""
+        self.flush()
@@ -0,0 +1,129 @@
+"""
+player_index.py - In-memory index of players bucketed by spaceship level.
+Used to pick steal targets of a similar level without scanning or randomly
+ordering the players table. Every operation, including random sampling, is O(1).
+"""
+
+import random
+import threading
+
+
+class LevelIndex:
+    """
+    Players grouped by spaceship_level.
+    Each bucket is a list of player IDs plus a position map, so a player can be
+    moved or removed by swapping with the bucket's last element.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.positions = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, telegram_id: int):
+        return telegram_id in self.positions
+
+    def load(self, rows, keep_live: bool = True):
+        """
+        Replace the index contents with (telegram_id, spaceship_level) rows.
+        The rows are indexed off to the side; players added or moved while they were
+        being read keep their live level, so loading can run after the bot is serving.
+        keep_live=False discards the live entries instead (after restoring the database).
+        """
+        loaded = LevelIndex()
+        for telegram_id, level in rows:
+            loaded._insert(telegram_id, level)
+        with self.lock:
+            live = self.positions if keep_live else {}
+            self.buckets, self.positions = loaded.buckets, loaded.positions
+            for telegram_id, (level, _) in live.items():
+                if self.level_of(telegram_id) != level:
+                    if telegram_id in self.positions:
+                        self._delete(telegram_id)
+                    self._insert(telegram_id, level)
+
+    def add(self, telegram_id: int, level: int = 1):
+        """Index a player if they are not indexed yet."""
+        with self.lock:
+            if telegram_id not in self.positions:
+                self._insert(telegram_id, level)
+
+    def set_level(self, telegram_id: int, level: int):
+        """Move a player into the bucket for their new level."""
+        with self.lock:
+            current = self.positions.get(telegram_id)
+            if current is not None:
+                if current[0] == level:
+                    return
+                self._delete(telegram_id)
+            self._insert(telegram_id, level)
+
+    def remove(self, telegram_id: int):
+        """Drop a player from the index."""
+        with self.lock:
+            if telegram_id in self.positions:
+                self._delete(telegram_id)
+
+    def level_of(self, telegram_id: int):
+        """Return the indexed level of a player, or None."""
+        position = self.positions.get(telegram_id)
+        return position[0] if position else None
+
+    def candidates(self, level: int, window: int = 0, exclude=(), attempts: int = 8):
+        """
+        Yield random players whose level is within window of level, nearest levels first.
+        Each bucket gets a bounded number of random draws; IDs in exclude and players
+        already yielded are skipped.
+        """
+        seen = set(exclude)
+        for offset in range(window + 1):
+            levels = [level] if offset == 0 else random.sample([level - offset, level + offset], 2)
+            for candidate_level in levels:
+                bucket = self.buckets.get(candidate_level)
+                if not bucket:
+                    continue
+                try:
+                    if len(bucket) <= attempts:
+                        # Small buckets are checked exhaustively in random order.
+                        drawn = random.sample(bucket, len(bucket))
+                    else:
+                        drawn = [bucket[random.randrange(len(bucket))] for _ in range(attempts)]
+                except (IndexError, ValueError):
+                    # The bucket shrank under a concurrent update; try the next level.
+                    continue
+                for candidate in drawn:
+                    if candidate not in seen:
+                        seen.add(candidate)
+                        yield candidate
+
+    def sample(self, level: int, window: int = 0, exclude=(), attempts: int = 8, accept=None):
+        """
+        Pick a random player whose level is within window of level, drawn as in
+        candidates() and skipping those rejected by the optional accept(telegram_id)
+        predicate. Returns None when nothing suitable is found.
+        """
+        for candidate in self.candidates(level, window, exclude, attempts):
+            if accept is None or accept(candidate):
+                return candidate
+        return None
+
+    def _insert(self, telegram_id: int, level: int):
+        bucket = self.buckets.setdefault(level, [])
+        self.positions[telegram_id] = (level, len(bucket))
+        bucket.append(telegram_id)
+
+    def _delete(self, telegram_id: int):
+        level, index = self.positions.pop(telegram_id)
+        bucket = self.buckets[level]
+        last = bucket.pop()
+        if last != telegram_id:
+            bucket[index] = last
+            self.positions[last] = (level, index)
+        if not bucket:
+            del self.buckets[level]
+
+
+levels = LevelIndex()
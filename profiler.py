@@ -0,0 +1,330 @@
+"""
+profiler.py - Production diagnostics for the Space Simulation Telegram Game Bot.
+Provides an admin-triggered sampling profiler that records the stacks of the dispatcher,
+worker and job threads for a fixed window and writes them in the collapsed-stack format
+read by flamegraph.pl and speedscope, plus an always-armed recorder that keeps the
+handler name, callback data, SQL statements and database call timings of slow updates.
+
+The recorder only keeps a few references per update on a thread-local, so its cost for
+fast updates is a couple of clock reads. An update's duration is the time it kept its
+thread busy, CPU time plus database time, so sleeps and Telegram round trips do not count.
+SQL text is collected by an sqlite3 trace callback that is only installed on connections
+opened after an update has already crossed the threshold.
+"""
+
+import collections
+import functools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from telegram import Update
+from telegram.ext import CallbackContext
+import config
+import metrics
+from admin import admin_only
+
+logger = logging.getLogger(__name__)
+
+
+def frame_label(frame) -> str:
+    """Return module:function for a stack frame."""
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+
+def is_idle(frame) -> bool:
+    """True if the innermost frame is a thread blocked waiting on a lock or condition."""
+    return frame.f_code.co_name == "wait" and frame.f_code.co_filename.endswith("threading.py")
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of matching threads at a fixed interval from a daemon thread.
+    Samples are aggregated as collapsed stacks: "thread;outer:fn;...;inner:fn" -> count.
+    """
+
+    def __init__(self, interval: float = None, thread_pattern: str = None, include_idle: bool = None):
+        self.interval = interval or config.PROFILE_SAMPLE_INTERVAL
+        self.pattern = re.compile(thread_pattern or config.PROFILE_THREAD_PATTERN)
+        self.include_idle = config.PROFILE_INCLUDE_IDLE if include_idle is None else include_idle
+        self.counts = collections.Counter()
+        self.samples = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._deadline = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        # Stays True after the deadline until stop() collects the samples.
+        return self._thread is not None
+
+    def start(self, duration: float = None):
+        """Start sampling in the background, stopping by itself after duration seconds."""
+        if self.running:
+            raise RuntimeError("Profiler is already running")
+        self.counts = collections.Counter()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self._deadline = self.started + duration if duration else None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> collections.Counter:
+        """Stop sampling and return the collapsed stack counts."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.counts
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if self._deadline is not None and time.perf_counter() >= self._deadline:
+                break
+            self.sample()
+        self.elapsed = time.perf_counter() - self.started
+
+    def sample(self):
+        """Record one stack sample for every matching thread."""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            name = names.get(ident)
+            if name is None or not self.pattern.search(name):
+                continue
+            if not self.include_idle and is_idle(frame):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            # Bot and pool IDs would split one role over many roots.
+            stack.append(re.sub(r"\d+", "N", name))
+            self.counts[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def write_collapsed(self, path: str):
+        """Write the samples in collapsed-stack format, one "stack count" per line."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as handle:
+            for stack, count in sorted(self.counts.items()):
+                handle.write(f"{stack} {count}\n")
+
+    def top_functions(self, limit: int = 10):
+        """Return (function, samples) for the innermost frames seen most often."""
+        leaves = collections.Counter()
+        for stack, count in self.counts.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(limit)
+
+
+class RequestTrace:
+    """What a single update did: where it went, which queries it ran and how long they took."""
+
+    __slots__ = ("handler", "data", "user_id", "started", "cpu_started", "finished", "elapsed", "duration",
+                 "statements", "db_calls", "db_time", "db_cpu", "db_depth", "dropped")
+
+    def __init__(self, handler: str, data: str, user_id):
+        self.handler = handler
+        self.data = data
+        self.user_id = user_id
+        self.started = time.perf_counter()
+        self.cpu_started = time.thread_time()
+        self.finished = None
+        self.elapsed = 0.0
+        self.duration = 0.0
+        self.statements = []
+        self.db_calls = []
+        self.db_time = 0.0
+        self.db_cpu = 0.0
+        self.db_depth = 0
+        self.dropped = 0
+
+    def busy(self) -> float:
+        """Seconds the update has kept its thread busy: CPU time outside the database plus database time."""
+        return time.thread_time() - self.cpu_started - self.db_cpu + self.db_time
+
+    def add_statement(self, sql: str):
+        """sqlite3 trace callback: keep the statement with its offset into the update."""
+        if len(self.statements) < config.SLOW_REQUEST_MAX_STATEMENTS:
+            self.statements.append((time.perf_counter() - self.started, sql))
+        else:
+            self.dropped += 1
+
+    def render(self) -> str:
+        lines = [f"{self.finished} {self.handler} took {self.duration * 1000:.1f} ms busy, "
+                 f"{self.elapsed * 1000:.1f} ms wall (user {self.user_id}, data {self.data!r})"]
+        for name, seconds in self.db_calls:
+            lines.append(f"  db {name}: {seconds * 1000:.2f} ms")
+        for offset, sql in self.statements:
+            lines.append(f"  +{offset * 1000:.1f} ms SQL {' '.join(sql.split())}")
+        if self.dropped:
+            lines.append(f"  ... {self.dropped} more statements")
+        return "\n".join(lines)
+
+
+def describe_update(update) -> tuple:
+    """Return (payload, user_id): the callback data or message text of an update."""
+    user = getattr(update, "effective_user", None)
+    user_id = user.id if user else None
+    query = getattr(update, "callback_query", None)
+    if query is not None:
+        return query.data, user_id
+    message = getattr(update, "effective_message", None)
+    if message is not None:
+        return message.text, user_id
+    return None, user_id
+
+
+class SlowRequestRecorder:
+    """
+    Traces every update on its handling thread and keeps the ones busy for longer than
+    threshold seconds in a bounded buffer, newest last.
+    """
+
+    def __init__(self, threshold: float = None, size: int = None):
+        self.threshold = config.SLOW_REQUEST_THRESHOLD if threshold is None else threshold
+        self.records = collections.deque(maxlen=size or config.SLOW_REQUEST_LOG_SIZE)
+        self.local = threading.local()
+
+    def current(self):
+        """Return the trace of the update being handled on this thread, or None."""
+        return getattr(self.local, "trace", None)
+
+    def attach(self, conn):
+        """Connection hook: trace SQL on connections opened by an update that is already slow."""
+        trace = getattr(self.local, "trace", None)
+        if trace is not None and trace.busy() >= self.threshold:
+            conn.set_trace_callback(trace.add_statement)
+
+    def wrap_handler(self, name: str, fn):
+        """Wrap a handler callback(update, context) so slow calls are recorded."""
+        @functools.wraps(fn)
+        def wrapper(update, context, *args, **kwargs):
+            if getattr(self.local, "trace", None) is not None:
+                return fn(update, context, *args, **kwargs)
+            data, user_id = describe_update(update)
+            trace = self.local.trace = RequestTrace(name, data, user_id)
+            try:
+                return fn(update, context, *args, **kwargs)
+            finally:
+                self.local.trace = None
+                trace.elapsed = time.perf_counter() - trace.started
+                trace.duration = trace.busy()
+                if trace.duration >= self.threshold:
+                    self.record(trace)
+        wrapper.__wrapped_slowlog__ = True
+        return wrapper
+
+    def wrap_db(self, name: str, fn):
+        """Wrap a database function so its timing is added to the current trace, if any."""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            trace = getattr(self.local, "trace", None)
+            if trace is None:
+                return fn(*args, **kwargs)
+            start, cpu_start = time.perf_counter(), time.thread_time()
+            trace.db_depth += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                trace.db_depth -= 1
+                seconds = time.perf_counter() - start
+                if not trace.db_depth:
+                    # Nested calls are already inside the outer call's time.
+                    trace.db_time += seconds
+                    trace.db_cpu += time.thread_time() - cpu_start
+                if len(trace.db_calls) < config.SLOW_REQUEST_MAX_STATEMENTS:
+                    trace.db_calls.append((name, seconds))
+        wrapper.__wrapped_slowlog__ = True
+        return wrapper
+
+    def record(self, trace: RequestTrace):
+        trace.finished = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.records.append(trace)
+        logger.warning(f"Slow update: {trace.handler} took {trace.duration * 1000:.1f} ms "
+                       f"({len(trace.db_calls)} db calls, {len(trace.statements) + trace.dropped} statements)")
+
+
+profiler = SamplingProfiler()
+slow_requests = SlowRequestRecorder()
+
+
+def instrument_dispatcher(dispatcher):
+    """Trace every handler registered on the dispatcher."""
+    for handlers in dispatcher.handlers.values():
+        for handler in handlers:
+            if not getattr(handler.callback, "__wrapped_slowlog__", False):
+                handler.callback = slow_requests.wrap_handler(metrics.callable_name(handler.callback),
+                                                              handler.callback)
+
+
+def instrument_database(database_module):
+    """Attribute database calls and SQL statements to the update being traced."""
+    for name, fn in list(metrics.database_functions(database_module)):
+        if not getattr(fn, "__wrapped_slowlog__", False):
+            setattr(database_module, name, slow_requests.wrap_db(name, fn))
+    if slow_requests.attach not in database_module.connection_hooks:
+        database_module.connection_hooks.append(slow_requests.attach)
+
+
+def finish_profile(context: CallbackContext):
+    """Job: stop the profiler, write the flamegraph input and report to the admin who asked."""
+    chat_id = context.job.context
+    profiler.stop()
+    path = os.path.join(config.PROFILE_DIR, time.strftime("profile-%Y%m%d-%H%M%S.folded"))
+    profiler.write_collapsed(path)
+    text = (f"Profile finished: {profiler.samples} samples over {profiler.elapsed:.1f}s, "
+            f"{sum(profiler.counts.values())} thread stacks.\nWritten to {path}\n")
+    top = profiler.top_functions(config.STATS_TOP_N)
+    if top:
+        text += "\nHottest functions:\n" + "\n".join(f"- {name}: {count}" for name, count in top)
+    context.bot.send_message(chat_id=chat_id, text=text[:4000])
+    if profiler.counts:
+        with open(path, "rb") as handle:
+            context.bot.send_document(chat_id=chat_id, document=handle, filename=os.path.basename(path))
+
+
+@admin_only
+def profile(update: Update, context: CallbackContext):
+    """Handle the admin /profile [seconds] command by sampling bot threads for a while."""
+    if profiler.running:
+        update.message.reply_text("A profile is already running.")
+        return
+    try:
+        seconds = float(context.args[0]) if context.args else config.PROFILE_DEFAULT_SECONDS
+    except ValueError:
+        update.message.reply_text("Usage: /profile [seconds]")
+        return
+    seconds = max(1.0, min(seconds, config.PROFILE_MAX_SECONDS))
+    profiler.start(seconds)
+    context.job_queue.run_once(finish_profile, seconds, context=update.effective_chat.id)
+    update.message.reply_text(f"Profiling bot threads for {seconds:g} seconds...")
+
+
+@admin_only
+def slow(update: Update, context: CallbackContext):
+    """Handle the admin /slow [count] command listing the most recent slow updates."""
+    try:
+        count = int(context.args[0]) if context.args else 3
+    except ValueError:
+        update.message.reply_text("Usage: /slow [count]")
+        return
+    records = list(slow_requests.records)[-max(count, 1):]
+    if not slow_requests.threshold:
+        update.message.reply_text("Slow update capture is disabled (config.SLOW_REQUEST_THRESHOLD).")
+        return
+    if not records:
+        update.message.reply_text(
+            f"No updates slower than {slow_requests.threshold * 1000:g} ms recorded.")
+        return
+    text = "\n\n".join(trace.render() for trace in reversed(records))
+    update.message.reply_text(text[:4000])
@@ -0,0 +1,203 @@
+"""
+pvp.py - Implements player-versus-player battles for the Space Simulation Telegram Game Bot.
+Players join a matchmaking queue keyed on their ship's power rating. The queue is an
+in-memory index of rating buckets, so finding an opponent only inspects the few buckets
+inside the accepted rating window, and that window widens the longer a player waits.
+"""
+
+import logging
+import threading
+import time
+from telegram import Update
+from telegram.ext import CallbackContext
+import config
+import database
+import battles
+from storage import ship_power
+
+logger = logging.getLogger(__name__)
+
+
+class QueueEntry:
+    """A player waiting in the matchmaking queue."""
+
+    __slots__ = ("telegram_id", "rating", "joined_at", "chat_id", "name")
+
+    def __init__(self, telegram_id: int, rating: int, joined_at: float, chat_id: int, name: str):
+        self.telegram_id = telegram_id
+        self.rating = rating
+        self.joined_at = joined_at
+        self.chat_id = chat_id
+        self.name = name
+
+
+class MatchmakingQueue:
+    """
+    Players waiting for an opponent, indexed by rating bucket.
+    Each bucket keeps its players in arrival order, so the longest-waiting
+    player within range is matched first.
+    """
+
+    def __init__(self, bucket_width: int = None, base_window: int = None,
+                 window_growth: float = None, max_window: int = None):
+        self.bucket_width = bucket_width or config.PVP_BUCKET_WIDTH
+        self.base_window = base_window if base_window is not None else config.PVP_BASE_WINDOW
+        self.window_growth = window_growth if window_growth is not None else config.PVP_WINDOW_GROWTH
+        self.max_window = max_window or config.PVP_MAX_WINDOW
+        self.buckets = {}
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, telegram_id: int):
+        return telegram_id in self.entries
+
+    def window(self, entry: QueueEntry, now: float) -> float:
+        """Return the rating difference the entry currently accepts."""
+        return min(self.base_window + self.window_growth * (now - entry.joined_at), self.max_window)
+
+    def join(self, entry: QueueEntry):
+        """
+        Try to match a new entry immediately.
+        Returns the opponent's entry (removed from the queue), or None after queueing the player.
+        """
+        with self.lock:
+            if entry.telegram_id in self.entries:
+                return None
+            opponent = self._find(entry, self.base_window)
+            if opponent is not None:
+                self._remove(opponent)
+                return opponent
+            self.entries[entry.telegram_id] = entry
+            self.buckets.setdefault(entry.rating // self.bucket_width, {})[entry.telegram_id] = entry
+            return None
+
+    def leave(self, telegram_id: int):
+        """Remove a player from the queue. Returns their entry, or None if they were not queued."""
+        with self.lock:
+            entry = self.entries.get(telegram_id)
+            if entry is not None:
+                self._remove(entry)
+            return entry
+
+    def match_waiting(self, now: float = None):
+        """
+        Pair waiting players whose widened windows now overlap.
+        Returns a list of (entry, opponent) pairs, both removed from the queue.
+        """
+        now = now or time.time()
+        pairs = []
+        with self.lock:
+            for entry in sorted(self.entries.values(), key=lambda e: e.joined_at):
+                if entry.telegram_id not in self.entries:
+                    continue
+                opponent = self._find(entry, self.window(entry, now))
+                if opponent is not None:
+                    self._remove(entry)
+                    self._remove(opponent)
+                    pairs.append((entry, opponent))
+        return pairs
+
+    def expire(self, max_wait: float, now: float = None):
+        """Remove and return every entry that has waited longer than max_wait seconds."""
+        now = now or time.time()
+        with self.lock:
+            expired = [e for e in self.entries.values() if now - e.joined_at > max_wait]
+            for entry in expired:
+                self._remove(entry)
+        return expired
+
+    def _find(self, entry: QueueEntry, window: float):
+        """Return the best queued opponent within window of the entry's rating, or None."""
+        width = self.bucket_width
+        low = int(entry.rating - window) // width
+        high = int(entry.rating + window) // width
+        home = entry.rating // width
+        # Visit the home bucket first, then neighbours outward, so closer ratings win.
+        for offset in range(max(home - low, high - home) + 1):
+            for bucket_no in {home - offset, home + offset}:
+                if bucket_no < low or bucket_no > high:
+                    continue
+                for candidate in self.buckets.get(bucket_no, {}).values():
+                    if candidate.telegram_id != entry.telegram_id and abs(candidate.rating - entry.rating) <= window:
+                        return candidate
+        return None
+
+    def _remove(self, entry: QueueEntry):
+        del self.entries[entry.telegram_id]
+        bucket_no = entry.rating // self.bucket_width
+        bucket = self.buckets[bucket_no]
+        del bucket[entry.telegram_id]
+        if not bucket:
+            del self.buckets[bucket_no]
+
+
+matchmaking_queue = MatchmakingQueue()
+
+
+def player_rating(telegram_id: int) -> int:
+    """Return the player's PvP rating derived from ship weapons, shields and crew."""
+    return ship_power(database.get_spaceship(telegram_id))
+
+
+def resolve_match(entry: QueueEntry, opponent: QueueEntry):
+    """Fight a matched pair with the standard battle turn logic. Returns (result, battle log)."""
+    battle = battles.PvPBattle(
+        entry.telegram_id, database.get_spaceship(entry.telegram_id),
+        opponent.telegram_id, database.get_spaceship(opponent.telegram_id),
+        opponent_name=opponent.name,
+    )
+    result, log = battle.simulate_battle(turn_delay=0)
+    logger.info(f"PvP duel {entry.telegram_id} vs {opponent.telegram_id} ended with a {result}.")
+    return result, log
+
+
+def announce_match(bot, entry: QueueEntry, opponent: QueueEntry, result: str, log: list):
+    """Send the duel log and each side's outcome to both players."""
+    text = "\n".join(log)
+    loser_result = "loss" if result == "win" else "win"
+    for player, other, outcome in ((entry, opponent, result), (opponent, entry, loser_result)):
+        bot.send_message(
+            chat_id=player.chat_id,
+            text=f"PvP duel against {other.name}!\n{text}\nBattle result: {outcome.upper()}",
+        )
+
+
+def pvp(update: Update, context: CallbackContext):
+    """
+    Handle the /pvp command: join the matchmaking queue, or leave it if already queued.
+    """
+    user = update.effective_user
+    if user.id in matchmaking_queue:
+        matchmaking_queue.leave(user.id)
+        update.message.reply_text("You left the PvP queue.")
+        return
+
+    ship = database.get_spaceship(user.id)
+    if ship is None:
+        update.message.reply_text("You need a ship to duel. Use /start first.")
+        return
+    entry = QueueEntry(user.id, ship_power(ship), time.time(),
+                       update.effective_chat.id, user.username or user.first_name)
+    opponent = matchmaking_queue.join(entry)
+    if opponent is None:
+        update.message.reply_text(
+            f"Searching for an opponent near rating {entry.rating}... Send /pvp again to leave the queue."
+        )
+        return
+    result, log = resolve_match(entry, opponent)
+    announce_match(context.bot, entry, opponent, result, log)
+
+
+def match_waiting_players(context: CallbackContext):
+    """
+    Periodic job pairing queued players as their rating windows widen,
+    and dropping players who waited too long.
+    """
+    for entry, opponent in matchmaking_queue.match_waiting():
+        result, log = resolve_match(entry, opponent)
+        announce_match(context.bot, entry, opponent, result, log)
+    for entry in matchmaking_queue.expire(config.PVP_QUEUE_TIMEOUT):
+        context.bot.send_message(chat_id=entry.chat_id, text="No opponent found. You left the PvP queue.")
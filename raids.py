@@ -0,0 +1,116 @@
+"""
+raids.py - Implements cooperative alliance raids for the Space Simulation Telegram Game Bot.
+Members of an alliance join a raid against a shared boss. A periodic job resolves one
+round for every active raid, computing all participants' damage in a single batched
+step and storing one aggregated round record.
+"""
+
+import logging
+import random
+from telegram import Update
+from telegram.ext import CallbackContext
+import config
+import database
+
+logger = logging.getLogger(__name__)
+
+# Raid bosses as (name, health, damage dealt to every participant's shields per round)
+RAID_BOSSES = [
+    ("Void Leviathan", 20000, 4),
+    ("Pirate Dreadnought", 15000, 6),
+    ("Hive Mothership", 30000, 3),
+    ("Rogue Star Fortress", 40000, 5),
+]
+
+
+def raid(update: Update, context: CallbackContext):
+    """
+    Handle the /raid command.
+    Joins the player's alliance raid, starting one against a random boss if none is active.
+    """
+    user = update.effective_user
+    alliance_id = database.get_player_alliance(user.id)
+    if alliance_id is None:
+        update.message.reply_text("You must be in an alliance to raid. Use /alliance to join one.")
+        return
+
+    active = database.get_active_raid(alliance_id)
+    if active is None:
+        boss_name, boss_health, _ = random.choice(RAID_BOSSES)
+        raid_id = database.create_raid(alliance_id, boss_name, boss_health)
+        active = database.get_active_raid(alliance_id)
+        logger.info(f"User {user.id} started raid {raid_id} against {boss_name} for alliance {alliance_id}.")
+
+    joined = database.join_raid(active["id"], user.id)
+    status = (
+        f"Raid target: {active['boss_name']}\n"
+        f"Boss health: {active['boss_health']}/{active['max_health']}\n"
+        f"Round: {active['round']}/{config.RAID_MAX_ROUNDS}\n"
+        f"Raiders: {active['participant_count'] + (1 if joined else 0)}"
+    )
+    if joined:
+        update.message.reply_text("You joined the alliance raid!\n" + status)
+    else:
+        update.message.reply_text("You are already in this raid.\n" + status)
+
+
+def resolve_round(fleet: dict, boss_health: int, boss_damage: int, round_no: int) -> dict:
+    """
+    Resolve one raid round for every participant at once.
+    Works column-wise over the fleet's parallel lists, so the cost is a few list
+    passes regardless of how many raiders take part.
+    """
+    weapons = fleet["weapons"]
+    crew = fleet["crew"]
+    count = len(weapons)
+    if not count:
+        return {
+            "round": round_no, "participants": 0, "total_damage": 0, "top_telegram_id": None,
+            "top_damage": 0, "boss_damage": 0, "boss_health": boss_health,
+        }
+
+    low = 1.0 - config.RAID_DAMAGE_VARIANCE
+    spread = 2 * config.RAID_DAMAGE_VARIANCE
+    rand = random.random
+    damage = [
+        int(w * config.RAID_DAMAGE_PER_WEAPON * (low + spread * rand()) + c * config.RAID_DAMAGE_PER_CREW)
+        for w, c in zip(weapons, crew)
+    ]
+    total = sum(damage)
+    top_index = max(range(count), key=damage.__getitem__)
+    remaining = max(boss_health - total, 0)
+    return {
+        "round": round_no,
+        "participants": count,
+        "total_damage": total,
+        "top_telegram_id": fleet["telegram_id"][top_index],
+        "top_damage": damage[top_index],
+        # A defeated boss does not strike back
+        "boss_damage": boss_damage if remaining > 0 else 0,
+        "boss_health": remaining,
+    }
+
+
+def resolve_raid_rounds(context: CallbackContext):
+    """
+    Periodic job resolving the next round of every active raid.
+    Each raid costs one fleet query and one write transaction per round.
+    """
+    boss_strikes = {name: strike for name, _, strike in RAID_BOSSES}
+    for active in database.get_active_raids():
+        fleet = database.get_raid_fleet(active["id"])
+        if not fleet["telegram_id"]:
+            continue
+        result = resolve_round(fleet, active["boss_health"],
+                               boss_strikes.get(active["boss_name"], 0), active["round"] + 1)
+        if result["boss_health"] == 0:
+            status, reward = "defeated", config.RAID_REWARD_CREDITS
+        elif result["round"] >= config.RAID_MAX_ROUNDS:
+            status, reward = "escaped", 0
+        else:
+            status, reward = "active", 0
+        database.record_raid_round(active["id"], result, status, reward)
+        logger.info(
+            f"Raid {active['id']} round {result['round']}: {result['participants']} raiders dealt "
+            f"{result['total_damage']} damage, boss at {result['boss_health']} ({status})."
+        )
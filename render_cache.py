@@ -0,0 +1,103 @@
+"""
+render_cache.py - Cache of rendered replies for read-only views (/spaceship, /crew, /missions).
+Every player has a version counter per data domain (ship, crew, missions) that the
+database wrappers bump after each write touching it; writes that change many players
+at once (crew training) bump a per-domain epoch instead; a raid round bumps the
+versions of the ships it damaged. A rendered reply
+is reused while its player's domain version and the epoch are unchanged, so a repeat
+view costs neither SQL nor formatting. The cache holds RENDER_CACHE_SIZE replies and
+evicts the least recently used.
+
+Versions are values of one increasing counter. Once there are twice as many versions
+as cached replies, the versions of players without a cached reply are dropped and
+every unknown player starts from a new base version, so no reply rendered before the
+drop can match again.
+"""
+
+import itertools
+import threading
+from collections import OrderedDict
+import config
+
+# View -> data domain its reply is rendered from
+VIEWS = {"spaceship": "ship", "crew": "crew", "missions": "missions"}
+DOMAINS = ("ship", "crew", "missions")
+
+
+class RenderCache:
+    """Thread-safe LRU of (player, view) -> (version stamp, rendered reply), plus the version counters."""
+
+    def __init__(self, maxsize: int = None):
+        self.maxsize = maxsize or config.RENDER_CACHE_SIZE
+        self.entries = OrderedDict()
+        self.versions = {}  # (telegram_id, domain) -> version
+        self.counter = itertools.count(1)
+        self.base = 0  # version of every (telegram_id, domain) missing from versions
+        self.epochs = dict.fromkeys(DOMAINS, 0)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stamp(self, telegram_id: int, domain: str) -> tuple:
+        """Return the current (version, epoch) of one player's domain."""
+        with self.lock:
+            return self.versions.get((telegram_id, domain), self.base), self.epochs[domain]
+
+    def bump(self, telegram_id: int, domain: str):
+        """Mark one player's domain as changed. Call after the write has committed."""
+        self.bump_many((telegram_id,), domain)
+
+    def bump_many(self, telegram_ids, domain: str):
+        """Mark one domain as changed for each of the given players."""
+        with self.lock:
+            for telegram_id in telegram_ids:
+                self.versions[(telegram_id, domain)] = next(self.counter)
+            if len(self.versions) > 2 * self.maxsize:
+                self._prune_versions()
+
+    def _prune_versions(self):
+        """Keep only the versions cached replies depend on. Called with the lock held."""
+        live = {(telegram_id, VIEWS[view]) for telegram_id, view in self.entries}
+        self.versions = {key: self.versions.get(key, self.base) for key in live}
+        self.base = next(self.counter)
+
+    def bump_all(self, domain: str):
+        """Mark a domain as changed for every player."""
+        with self.lock:
+            self.epochs[domain] += 1
+
+    def clear(self):
+        """Drop every cached reply, e.g. after the database was replaced."""
+        with self.lock:
+            self.entries.clear()
+            for domain in DOMAINS:
+                self.epochs[domain] += 1
+
+    def render(self, telegram_id: int, view: str, build):
+        """
+        Return the cached reply of a player's view, or call build() to render it and cache it.
+        The stamp is read before build() queries the database, so a write landing meanwhile
+        leaves the reply under an outdated stamp and the next view renders afresh.
+        """
+        key = (telegram_id, view)
+        stamp = self.stamp(telegram_id, VIEWS[view])
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        reply = build()
+        with self.lock:
+            self.entries[key] = (stamp, reply)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return reply
+
+
+replies = RenderCache()
@@ -10,6 +10,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
 import config
 import database  # Assuming database operations for purchasing/updating credits will be implemented accordingly
+import dedupe
 
 logger = logging.getLogger(__name__)
 
@@ -74,6 +75,7 @@ def shop(update: Update, context: CallbackContext):
         reply_markup=reply_markup
     )
 
+@dedupe.idempotent
 def shop_callback(update: Update, context: CallbackContext):
     """
     Handle callback queries for shop items and trading commodities.
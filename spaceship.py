@@ -6,23 +6,26 @@ This module handles fuel, oxygen, energy, cargo, weapons, shields, crew, and upg
 import random
 import logging
 import config
+import crew
 import database
 
 logger = logging.getLogger(__name__)
 
 
 class Spaceship:
+    __slots__ = ("telegram_id", "fuel", "oxygen", "energy", "cargo", "weapons", "shields", "crew")
+
     def __init__(self, telegram_id: int):
         self.telegram_id = telegram_id
         data = database.get_spaceship(telegram_id)
         if data:
-            self.fuel = data["fuel"]
-            self.oxygen = data["oxygen"]
-            self.energy = data["energy"]
-            self.cargo = data["cargo"]
-            self.weapons = data["weapons"]
-            self.shields = data["shields"]
-            self.crew = data["crew"]
+            self.fuel = data.fuel
+            self.oxygen = data.oxygen
+            self.energy = data.energy
+            self.cargo = data.cargo
+            self.weapons = data.weapons
+            self.shields = data.shields
+            self.crew = data.crew
         else:
             # Initialize with default values if no record exists
             self.fuel = config.STARTING_FUEL
@@ -52,9 +55,10 @@ class Spaceship:
     def travel(self, sectors: int):
         """
         Simulate travel to another sector.
-        Costs fuel and returns a status message.
+        Costs fuel, less with skilled pilots aboard, and returns a status message.
         """
-        fuel_needed = sectors * config.FUEL_COST_PER_SECTOR
+        pilot_bonus = crew.skill_bonus(self.telegram_id, "pilot")
+        fuel_needed = max(round(sectors * config.FUEL_COST_PER_SECTOR * (1 - pilot_bonus)), 1)
         if self.fuel < fuel_needed:
             logger.info("Not enough fuel to travel.")
             return False, "Not enough fuel to travel."
@@ -92,8 +96,8 @@ class Spaceship:
         return self.fuel
 
     def repair_shields(self, amount: int):
-        """Repair or recharge shields."""
-        self.shields += amount
+        """Repair or recharge shields; engineers make each repair go further."""
+        self.shields += round(amount * (1 + crew.skill_bonus(self.telegram_id, "engineer")))
         if self.shields > 100:
             self.shields = 100
         self.save()
@@ -117,6 +121,7 @@ class Spaceship:
 def scan_environment(telegram_id: int):
     """
     Simulate scanning of the space environment.
+    Scientists aboard shift the odds from empty or dangerous readings towards finds.
     Returns a tuple of (result_type, description).
     """
     outcomes = [
@@ -125,7 +130,8 @@ def scan_environment(telegram_id: int):
         ("mission", "A distress signal indicates a potential mission."),
         ("nothing", "No significant anomalies in the vicinity.")
     ]
-    weights = [30, 20, 20, 30]
+    bonus = crew.skill_bonus(telegram_id, "scientist")
+    weights = [30 * (1 + bonus), 20 * (1 - bonus), 20 * (1 + bonus), 30 * (1 - bonus)]
     result = random.choices(outcomes, weights=weights)[0]
     return result
 
@@ -0,0 +1,710 @@
+"""
+storage.py - Storage backend interface for the Space Simulation Telegram Game Bot.
+Defines the operations every storage engine must provide and a pure in-memory
+engine used by unit tests, benchmarks and load tests that should not touch disk.
+The SQLite engine lives in database.py.
+"""
+
+import bisect
+import re
+import threading
+import time
+from collections import deque
+import config
+from entities import ShipRecord, CrewMember, Mission
+
+
+def timestamp(seconds: float = None) -> str:
+    """Return the UTC time (now by default) formatted like SQLite's CURRENT_TIMESTAMP."""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(seconds))
+
+
+def event_partition(seconds: float = None):
+    """
+    Return (name, starts, ends) of the event log partition whose time window holds
+    the given epoch time (now by default). Windows are EVENT_PARTITION_DAYS long,
+    aligned to the epoch; starts and ends are epoch seconds.
+    """
+    window = config.EVENT_PARTITION_DAYS * 86400
+    starts = int((time.time() if seconds is None else seconds) // window * window)
+    return f"event_logs_{time.strftime('%Y%m%d', time.gmtime(starts))}", starts, starts + window
+
+
+def rollup_buckets(seconds: float = None) -> dict:
+    """Return the hourly and daily activity rollup buckets holding the given epoch time (now by default)."""
+    now = timestamp(seconds)
+    return {"hour": now[:13] + ":00:00", "day": now[:10]}
+
+
+def ship_power(ship: ShipRecord) -> int:
+    """Rate a ship's combat power from its weapons, shields and crew."""
+    if not ship:
+        return 0
+    return sum(getattr(ship, field) * weight for field, weight in config.SHIP_POWER_WEIGHTS.items())
+
+
+def search_terms(text: str) -> list:
+    """Split free-text event log search input into lowercase word terms."""
+    return re.findall(r"\w+", (text or "").lower())
+
+
+class StorageBackend:
+    """
+    Interface implemented by every storage engine.
+    Ships, crew members and missions are returned as the record types in entities.py;
+    other rows are plain dicts keyed by column name, matching the SQLite schema.
+    """
+
+    name = "base"
+
+    def init_db(self, force: bool = False):
+        """
+        Create whatever structures the engine needs before first use.
+        Engines may skip the work when their stored schema is current, unless force is set.
+        """
+        raise NotImplementedError
+
+    def add_player(self, telegram_id: int, username: str) -> bool:
+        """
+        Insert a new player and initialize default spaceship details.
+        Returns True if a player or spaceship row was created, False if both already existed.
+        """
+        raise NotImplementedError
+
+    def get_spaceship(self, telegram_id: int) -> ShipRecord:
+        """Retrieve a player's spaceship details."""
+        raise NotImplementedError
+
+    def update_spaceship(self, telegram_id: int, **kwargs):
+        """Update spaceship fields (fuel, oxygen, etc.) for the given player."""
+        raise NotImplementedError
+
+    def add_event_log(self, telegram_id: int, event_type: str, details: str, outcome: str = None):
+        """
+        Insert a log entry for an event (battle, discovery, etc.) and count it in the activity
+        rollups; a battle's outcome ("win" or "loss") is also counted under its event type.
+        """
+        raise NotImplementedError
+
+    def get_recent_events(self, telegram_id: int, limit: int = 10) -> list:
+        """
+        Return the player's latest event log rows, newest first.
+        Older partitions are only read when the current one holds fewer than limit rows.
+        """
+        raise NotImplementedError
+
+    def get_event_page(self, telegram_id: int, before: tuple = None, after: tuple = None,
+                       limit: int = 10, search: str = None):
+        """
+        Return one keyset page of the player's event log rows, newest first.
+        before and after are (event_time, id) positions: the page holds the rows just older
+        than before, or just newer than after, or the newest rows when neither is given.
+        With search, only rows whose details contain every search term (as a word prefix) count.
+        Returns (rows, has_more) where has_more tells whether another page exists
+        further in the direction of travel.
+        """
+        raise NotImplementedError
+
+    def get_event_partitions(self) -> list:
+        """Return every event log partition as a dict (name, starts_at, ends_at), oldest first."""
+        raise NotImplementedError
+
+    def read_event_partition(self, name: str, after_id: int = 0, limit: int = 1000) -> list:
+        """Return up to limit rows of one event log partition with IDs above after_id, in ID order."""
+        raise NotImplementedError
+
+    def drop_event_partition(self, name: str):
+        """Remove an event log partition and all its rows. The current partition cannot be dropped."""
+        raise NotImplementedError
+
+    def add_crew_member(self, telegram_id: int, name: str, skill: str):
+        """Add a new crew member to the player's crew."""
+        raise NotImplementedError
+
+    def get_crew(self, telegram_id: int) -> list:
+        """Retrieve all crew members (CrewMember records) for the given player."""
+        raise NotImplementedError
+
+    def get_crew_bonuses(self, telegram_id: int) -> dict:
+        """Return {skill: summed crew level} for the player's crew, kept up to date on recruit and level-up."""
+        raise NotImplementedError
+
+    def train_crew(self, max_level: int, seconds_per_level: int) -> int:
+        """
+        Level up every crew member below max_level whose training time since its last
+        level, level * seconds_per_level seconds, has passed. Returns the number leveled.
+        """
+        raise NotImplementedError
+
+    def add_mission(self, telegram_id: int, description: str, reward: int, time_limit: int) -> int:
+        """Insert a new mission for the player and return its ID."""
+        raise NotImplementedError
+
+    def add_pool_missions(self, missions) -> int:
+        """Add (description, reward, time_limit) missions to the pool of unclaimed missions; returns how many."""
+        raise NotImplementedError
+
+    def count_pool_missions(self) -> int:
+        """Return the number of unclaimed missions in the pool."""
+        raise NotImplementedError
+
+    def claim_mission(self, telegram_id: int) -> Mission:
+        """
+        Atomically assign the oldest pooled mission to the player, starting its time limit now.
+        Returns the claimed Mission, or None if the pool is empty.
+        """
+        raise NotImplementedError
+
+    def get_active_missions(self, telegram_id: int) -> list:
+        """Retrieve active missions (Mission records) for the player."""
+        raise NotImplementedError
+
+    def complete_mission(self, mission_id: int):
+        """
+        Mark a mission as completed, counting it and its reward in the activity rollups.
+        Returns the mission's player ID, or None if it was missing or already completed.
+        """
+        raise NotImplementedError
+
+    def upgrade_spaceship(self, telegram_id: int, upgrade_type: str, new_level: int, cost: int):
+        """Record an upgrade, count it and its cost in the activity rollups, and update the player's spaceship level."""
+        raise NotImplementedError
+
+    def join_alliance(self, telegram_id: int, alliance_id: int):
+        """Add a player to an alliance."""
+        raise NotImplementedError
+
+    def create_alliance(self, alliance_name: str) -> int:
+        """Create a new alliance and return its new ID."""
+        raise NotImplementedError
+
+    def get_alliances(self):
+        """Retrieve all alliances."""
+        raise NotImplementedError
+
+    def get_alliance_page(self, after_id: int = 0, before_id: int = None, limit: int = 10):
+        """
+        Return one keyset page of alliances ordered by ID, with member counts and fleet power.
+        Pages forward from after_id, or backward from before_id when it is given.
+        Returns (rows, has_more) where has_more tells whether another page exists
+        further in the direction of travel.
+        """
+        raise NotImplementedError
+
+    def get_player_alliance(self, telegram_id: int):
+        """Return the ID of the alliance the player joined most recently, or None."""
+        raise NotImplementedError
+
+    def get_player_alliances(self, telegram_ids) -> dict:
+        """Return {telegram_id: ID of the alliance joined most recently} for those of the players in one."""
+        raise NotImplementedError
+
+    def create_raid(self, alliance_id: int, boss_name: str, boss_health: int) -> int:
+        """Start a new raid for the alliance and return its ID."""
+        raise NotImplementedError
+
+    def get_active_raid(self, alliance_id: int):
+        """Retrieve the alliance's active raid, if any."""
+        raise NotImplementedError
+
+    def get_active_raids(self):
+        """Retrieve every active raid."""
+        raise NotImplementedError
+
+    def join_raid(self, raid_id: int, telegram_id: int) -> bool:
+        """Add a player to a raid. Returns False if they had already joined."""
+        raise NotImplementedError
+
+    def get_raid_fleet(self, raid_id: int):
+        """
+        Retrieve the combat stats of every raid participant.
+        Returns parallel lists keyed by column: telegram_id, weapons, crew.
+        """
+        raise NotImplementedError
+
+    def record_raid_round(self, raid_id: int, round_result: dict, status: str, reward: int = 0):
+        """
+        Persist one resolved raid round atomically: the aggregated round record,
+        the boss state, shield damage to every participant and any reward.
+        Returns the telegram_ids whose ships took damage.
+        """
+        raise NotImplementedError
+
+    def get_player_levels(self):
+        """Retrieve (telegram_id, spaceship_level) for every player."""
+        raise NotImplementedError
+
+    def steal_credits(self, thief_id: int, victim_id: int, fraction: float, max_amount: int) -> int:
+        """
+        Atomically move a share of the victim's credits to the thief, capped at
+        max_amount, and log the theft for both players. Returns the amount taken.
+        """
+        raise NotImplementedError
+
+    def get_rollups(self, period: str, since: str) -> list:
+        """
+        Return the activity rollup rows of one period ("hour" or "day") from bucket since on,
+        as dicts with bucket, metric, key, count and amount, oldest bucket first.
+        """
+        raise NotImplementedError
+
+    def load_session_state(self, kind: str, owner_id: int) -> dict:
+        """Return the stored {key: value} blobs of one user_data, chat_data or bot_data owner."""
+        raise NotImplementedError
+
+    def save_session_state(self, changes):
+        """
+        Apply (kind, owner_id, key, value) session state changes in one transaction.
+        A value of None deletes the key.
+        """
+        raise NotImplementedError
+
+
+class MemoryStorage(StorageBackend):
+    """
+    Storage engine that keeps every table in process memory.
+    Tables are dicts keyed by primary key, with per-player and per-alliance
+    indexes so lookups cost the same as an indexed SQLite query.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.players = {}
+        self.spaceships = {}
+        self.crew = {}
+        self.missions = {}
+        self.upgrades = []
+        # Event log partition name -> {"starts_at", "ends_at", "rows", "by_player"}, oldest first
+        self.event_partitions = {}
+        self._hot_partition = None
+        self.alliances = {}
+        self.alliance_ids = []
+        self.alliance_summary = {}
+        self.alliance_members = []
+        # Secondary indexes
+        self.crew_by_player = {}
+        # telegram_id -> {skill: summed crew level}
+        self.crew_bonuses = {}
+        self.active_missions_by_player = {}
+        # IDs of unclaimed missions, oldest first
+        self.mission_pool = deque()
+        self.members_by_alliance = {}
+        self.alliances_by_player = {}
+        self.raids = {}
+        self.raid_participants = {}
+        self.raid_rounds = []
+        self.session_state = {}
+        # (period, bucket, metric, key) -> [count, amount]
+        self.rollups = {}
+        self._next_ids = {"crew": 1, "missions": 1, "upgrades": 1, "event_logs": 1,
+                          "alliances": 1, "alliance_members": 1, "raids": 1, "raid_rounds": 1}
+
+    def _next_id(self, table: str) -> int:
+        row_id = self._next_ids[table]
+        self._next_ids[table] = row_id + 1
+        return row_id
+
+    def init_db(self, force: bool = False):
+        """Nothing to create: tables exist as soon as the engine does."""
+        return
+
+    def add_player(self, telegram_id: int, username: str):
+        with self.lock:
+            created = telegram_id not in self.players or telegram_id not in self.spaceships
+            if telegram_id not in self.players:
+                self.players[telegram_id] = {
+                    "telegram_id": telegram_id,
+                    "username": username,
+                    "spaceship_level": 1,
+                    "credits": config.STARTING_CREDITS,
+                }
+            if telegram_id not in self.spaceships:
+                self.spaceships[telegram_id] = ShipRecord(
+                    telegram_id, config.STARTING_FUEL, config.STARTING_OXYGEN, config.STARTING_ENERGY,
+                    config.STARTING_CARGO, config.STARTING_WEAPONS, config.STARTING_SHIELDS,
+                    config.STARTING_CREW, timestamp(),
+                )
+            return created
+
+    def get_spaceship(self, telegram_id: int):
+        with self.lock:
+            # Records are immutable, so the stored one is returned without a copy.
+            return self.spaceships.get(telegram_id)
+
+    def update_spaceship(self, telegram_id: int, **kwargs):
+        with self.lock:
+            row = self.spaceships.get(telegram_id)
+            if row is None:
+                return
+            self._change_ship(row, kwargs)
+
+    def _change_ship(self, row: ShipRecord, changes: dict):
+        """Store a ship with field changes applied, keeping alliance fleet power in step."""
+        new_row = row._replace(**changes, last_update=timestamp())
+        self.spaceships[row.telegram_id] = new_row
+        delta = ship_power(new_row) - ship_power(row)
+        if delta:
+            for alliance_id in self.alliances_by_player.get(row.telegram_id, ()):
+                self.alliance_summary[alliance_id]["fleet_power"] += delta
+
+    def add_event_log(self, telegram_id: int, event_type: str, details: str, outcome: str = None):
+        with self.lock:
+            self._insert_event(telegram_id, event_type, details)
+            entries = [("event", event_type, 1, 0)]
+            if outcome:
+                entries.append((event_type, outcome, 1, 0))
+            self._roll_up(entries)
+
+    def _roll_up(self, entries):
+        """Add (metric, key, count, amount) entries to the current hour's and day's rollup rows."""
+        for period, bucket in rollup_buckets().items():
+            for metric, key, count, amount in entries:
+                totals = self.rollups.setdefault((period, bucket, metric, key), [0, 0])
+                totals[0] += count
+                totals[1] += amount
+
+    def _event_partition(self) -> dict:
+        """Return the partition receiving new events, starting a new one when its window has passed."""
+        now = time.time()
+        if self._hot_partition is None or now >= self._hot_partition[1]:
+            name, starts, ends = event_partition(now)
+            self.event_partitions.setdefault(name, {
+                "starts_at": timestamp(starts),
+                "ends_at": timestamp(ends),
+                "rows": [],
+                "by_player": {},
+            })
+            self._hot_partition = (name, ends)
+        return self.event_partitions[self._hot_partition[0]]
+
+    def _insert_event(self, telegram_id: int, event_type: str, details: str):
+        row = {
+            "id": self._next_id("event_logs"),
+            "telegram_id": telegram_id,
+            "event_type": event_type,
+            "event_details": details,
+            "event_time": timestamp(),
+        }
+        partition = self._event_partition()
+        partition["rows"].append(row)
+        partition["by_player"].setdefault(telegram_id, []).append(row)
+
+    def get_recent_events(self, telegram_id: int, limit: int = 10):
+        with self.lock:
+            self._event_partition()
+            rows = []
+            for partition in reversed(list(self.event_partitions.values())):
+                rows.extend(dict(row) for row in reversed(partition["by_player"].get(telegram_id, ())[-limit:]))
+                if len(rows) >= limit:
+                    break
+            return rows[:limit]
+
+    def get_event_page(self, telegram_id: int, before: tuple = None, after: tuple = None,
+                       limit: int = 10, search: str = None):
+        newer = after is not None and before is None
+        terms = search_terms(search)
+        with self.lock:
+            rows = []
+            for partition in self.event_partitions.values():
+                for row in partition["by_player"].get(telegram_id, ()):
+                    position = (row["event_time"], row["id"])
+                    if newer and position <= after or before is not None and position >= before:
+                        continue
+                    if terms:
+                        words = search_terms(row["event_details"])
+                        if not all(any(word.startswith(term) for word in words) for term in terms):
+                            continue
+                    rows.append(row)
+        rows.sort(key=lambda row: (row["event_time"], row["id"]), reverse=not newer)
+        has_more = len(rows) > limit
+        rows = [dict(row) for row in rows[:limit]]
+        if newer:
+            rows.reverse()
+        return rows, has_more
+
+    def get_event_partitions(self):
+        with self.lock:
+            self._event_partition()
+            return [{"name": name, "starts_at": partition["starts_at"], "ends_at": partition["ends_at"]}
+                    for name, partition in self.event_partitions.items()]
+
+    def read_event_partition(self, name: str, after_id: int = 0, limit: int = 1000):
+        with self.lock:
+            if name not in self.event_partitions:
+                raise ValueError(f"Unknown event log partition {name}.")
+            rows = self.event_partitions[name]["rows"]
+            # IDs within a partition are consecutive, so the first wanted row is found by offset
+            start = max(after_id - rows[0]["id"] + 1, 0) if rows else 0
+            return [dict(row) for row in rows[start:start + limit]]
+
+    def drop_event_partition(self, name: str):
+        with self.lock:
+            if self._hot_partition and name == self._hot_partition[0]:
+                raise ValueError(f"Cannot drop the current event log partition {name}.")
+            self.event_partitions.pop(name, None)
+
+    def add_crew_member(self, telegram_id: int, name: str, skill: str):
+        with self.lock:
+            crew_id = self._next_id("crew")
+            self.crew[crew_id] = CrewMember(crew_id, telegram_id, name, skill, 1, timestamp())
+            self.crew_by_player.setdefault(telegram_id, []).append(crew_id)
+            bonuses = self.crew_bonuses.setdefault(telegram_id, {})
+            bonuses[skill] = bonuses.get(skill, 0) + 1
+
+    def get_crew(self, telegram_id: int):
+        with self.lock:
+            return [self.crew[crew_id] for crew_id in self.crew_by_player.get(telegram_id, ())]
+
+    def get_crew_bonuses(self, telegram_id: int) -> dict:
+        with self.lock:
+            return dict(self.crew_bonuses.get(telegram_id, {}))
+
+    def train_crew(self, max_level: int, seconds_per_level: int) -> int:
+        with self.lock:
+            now = time.time()
+            trained = 0
+            for crew_id, member in self.crew.items():
+                if member.level < max_level and member.trained_at <= timestamp(now - member.level * seconds_per_level):
+                    self.crew[crew_id] = member._replace(level=member.level + 1, trained_at=timestamp(now))
+                    self.crew_bonuses[member.telegram_id][member.skill] += 1
+                    trained += 1
+            return trained
+
+    def add_mission(self, telegram_id: int, description: str, reward: int, time_limit: int):
+        with self.lock:
+            mission_id = self._next_id("missions")
+            self.missions[mission_id] = Mission(mission_id, telegram_id, description, reward,
+                                                "active", timestamp(), time_limit)
+            self.active_missions_by_player.setdefault(telegram_id, {})[mission_id] = None
+            return mission_id
+
+    def add_pool_missions(self, missions) -> int:
+        with self.lock:
+            count = 0
+            for description, reward, time_limit in missions:
+                mission_id = self._next_id("missions")
+                self.missions[mission_id] = Mission(mission_id, None, description, reward,
+                                                    "available", timestamp(), time_limit)
+                self.mission_pool.append(mission_id)
+                count += 1
+            return count
+
+    def count_pool_missions(self) -> int:
+        with self.lock:
+            return len(self.mission_pool)
+
+    def claim_mission(self, telegram_id: int):
+        with self.lock:
+            if not self.mission_pool:
+                return None
+            mission_id = self.mission_pool.popleft()
+            mission = self.missions[mission_id]._replace(telegram_id=telegram_id, status="active",
+                                                         created_at=timestamp())
+            self.missions[mission_id] = mission
+            self.active_missions_by_player.setdefault(telegram_id, {})[mission_id] = None
+            return mission
+
+    def get_active_missions(self, telegram_id: int):
+        with self.lock:
+            active = self.active_missions_by_player.get(telegram_id, {})
+            return [self.missions[mission_id] for mission_id in active]
+
+    def complete_mission(self, mission_id: int):
+        with self.lock:
+            mission = self.missions.get(mission_id)
+            if mission is None or mission.status == "completed":
+                return None
+            self.missions[mission_id] = mission._replace(status="completed")
+            self.active_missions_by_player.get(mission.telegram_id, {}).pop(mission_id, None)
+            self._roll_up([("mission", "completed", 1, mission.reward or 0)])
+            return mission.telegram_id
+
+    def upgrade_spaceship(self, telegram_id: int, upgrade_type: str, new_level: int, cost: int):
+        with self.lock:
+            self.upgrades.append({
+                "id": self._next_id("upgrades"),
+                "telegram_id": telegram_id,
+                "type": upgrade_type,
+                "level": new_level,
+                "cost": cost,
+                "upgraded_at": timestamp(),
+            })
+            player = self.players.get(telegram_id)
+            if player is not None:
+                player["spaceship_level"] = new_level
+            self._roll_up([("upgrade", upgrade_type, 1, cost)])
+
+    def join_alliance(self, telegram_id: int, alliance_id: int):
+        with self.lock:
+            row = {
+                "id": self._next_id("alliance_members"),
+                "telegram_id": telegram_id,
+                "alliance_id": alliance_id,
+                "joined_at": timestamp(),
+            }
+            self.alliance_members.append(row)
+            self.members_by_alliance.setdefault(alliance_id, []).append(row)
+            self.alliances_by_player.setdefault(telegram_id, []).append(alliance_id)
+            summary = self.alliance_summary.setdefault(alliance_id, {"member_count": 0, "fleet_power": 0})
+            summary["member_count"] += 1
+            summary["fleet_power"] += ship_power(self.spaceships.get(telegram_id))
+
+    def create_alliance(self, alliance_name: str) -> int:
+        with self.lock:
+            alliance_id = self._next_id("alliances")
+            self.alliances[alliance_id] = {
+                "id": alliance_id,
+                "alliance_name": alliance_name,
+                "created_at": timestamp(),
+            }
+            self.alliance_ids.append(alliance_id)
+            self.alliance_summary[alliance_id] = {"member_count": 0, "fleet_power": 0}
+            return alliance_id
+
+    def get_alliances(self):
+        with self.lock:
+            return [dict(row) for row in self.alliances.values()]
+
+    def get_alliance_page(self, after_id: int = 0, before_id: int = None, limit: int = 10):
+        with self.lock:
+            if before_id is not None:
+                end = bisect.bisect_left(self.alliance_ids, before_id)
+                start = max(end - limit, 0)
+                has_more = start > 0
+            else:
+                start = bisect.bisect_right(self.alliance_ids, after_id)
+                end = start + limit
+                has_more = end < len(self.alliance_ids)
+            rows = []
+            for alliance_id in self.alliance_ids[start:end]:
+                row = dict(self.alliances[alliance_id])
+                row.update(self.alliance_summary.get(alliance_id, {"member_count": 0, "fleet_power": 0}))
+                rows.append(row)
+            return rows, has_more
+
+    def get_player_alliance(self, telegram_id: int):
+        with self.lock:
+            alliance_ids = self.alliances_by_player.get(telegram_id)
+            return alliance_ids[-1] if alliance_ids else None
+
+    def get_player_alliances(self, telegram_ids) -> dict:
+        with self.lock:
+            alliances = {}
+            for telegram_id in telegram_ids:
+                alliance_ids = self.alliances_by_player.get(telegram_id)
+                if alliance_ids:
+                    alliances[telegram_id] = alliance_ids[-1]
+            return alliances
+
+    def create_raid(self, alliance_id: int, boss_name: str, boss_health: int) -> int:
+        with self.lock:
+            raid_id = self._next_id("raids")
+            self.raids[raid_id] = {
+                "id": raid_id,
+                "alliance_id": alliance_id,
+                "boss_name": boss_name,
+                "boss_health": boss_health,
+                "max_health": boss_health,
+                "round": 0,
+                "participant_count": 0,
+                "status": "active",
+                "created_at": timestamp(),
+            }
+            self.raid_participants[raid_id] = {}
+            return raid_id
+
+    def get_active_raid(self, alliance_id: int):
+        with self.lock:
+            for raid in reversed(list(self.raids.values())):
+                if raid["status"] == "active" and raid["alliance_id"] == alliance_id:
+                    return dict(raid)
+            return None
+
+    def get_active_raids(self):
+        with self.lock:
+            return [dict(raid) for raid in self.raids.values() if raid["status"] == "active"]
+
+    def join_raid(self, raid_id: int, telegram_id: int) -> bool:
+        with self.lock:
+            participants = self.raid_participants.setdefault(raid_id, {})
+            if telegram_id in participants:
+                return False
+            participants[telegram_id] = timestamp()
+            self.raids[raid_id]["participant_count"] += 1
+            return True
+
+    def get_raid_fleet(self, raid_id: int):
+        with self.lock:
+            ships = [self.spaceships[tid] for tid in self.raid_participants.get(raid_id, ())
+                     if tid in self.spaceships]
+            return {
+                "telegram_id": [ship.telegram_id for ship in ships],
+                "weapons": [ship.weapons for ship in ships],
+                "crew": [ship.crew for ship in ships],
+            }
+
+    def record_raid_round(self, raid_id: int, round_result: dict, status: str, reward: int = 0):
+        with self.lock:
+            self.raid_rounds.append(dict(round_result, id=self._next_id("raid_rounds"),
+                                         raid_id=raid_id, resolved_at=timestamp()))
+            raid = self.raids[raid_id]
+            raid["boss_health"] = round_result["boss_health"]
+            raid["round"] = round_result["round"]
+            raid["status"] = status
+            rewarded, damaged = 0, []
+            for tid in self.raid_participants.get(raid_id, ()):
+                ship = self.spaceships.get(tid)
+                if ship is not None and round_result["boss_damage"]:
+                    self._change_ship(ship, {"shields": max(ship.shields - round_result["boss_damage"], 0)})
+                    damaged.append(tid)
+                player = self.players.get(tid)
+                if player is not None and reward:
+                    player["credits"] += reward
+                    rewarded += 1
+            if rewarded:
+                self._roll_up([("raid", "reward", rewarded, reward * rewarded)])
+            return damaged
+
+    def get_player_levels(self):
+        with self.lock:
+            return [(tid, player["spaceship_level"]) for tid, player in self.players.items()]
+
+    def steal_credits(self, thief_id: int, victim_id: int, fraction: float, max_amount: int) -> int:
+        with self.lock:
+            victim = self.players.get(victim_id)
+            thief = self.players.get(thief_id)
+            if victim is None or thief is None or thief is victim:
+                return 0
+            amount = min(int(victim["credits"] * fraction), max_amount)
+            if amount <= 0:
+                return 0
+            victim["credits"] -= amount
+            thief["credits"] += amount
+            self._insert_event(thief_id, "steal", f"Stole {amount} credits from player {victim_id}.")
+            self._insert_event(victim_id, "steal", f"Player {thief_id} stole {amount} credits from you.")
+            self._roll_up([("event", "steal", 2, 0), ("steal", "credits", 1, amount)])
+            return amount
+
+    def get_rollups(self, period: str, since: str):
+        with self.lock:
+            rows = [{"bucket": bucket, "metric": metric, "key": key, "count": count, "amount": amount}
+                    for (row_period, bucket, metric, key), (count, amount) in self.rollups.items()
+                    if row_period == period and bucket >= since]
+        return sorted(rows, key=lambda row: (row["bucket"], row["metric"], row["key"]))
+
+    def load_session_state(self, kind: str, owner_id: int) -> dict:
+        with self.lock:
+            return dict(self.session_state.get((kind, owner_id), {}))
+
+    def save_session_state(self, changes):
+        with self.lock:
+            for kind, owner_id, key, value in changes:
+                if value is None:
+                    self.session_state.get((kind, owner_id), {}).pop(key, None)
+                else:
+                    self.session_state.setdefault((kind, owner_id), {})[key] = value
@@ -0,0 +1,127 @@
+"""
+conftest.py - Shared fixtures for the unit tests.
+Tests run against storage.MemoryStorage, or against an SQLite file in pytest's
+temporary directory, so they never touch the game database.
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import player_index  # noqa: E402
+import render_cache  # noqa: E402
+from storage import MemoryStorage  # noqa: E402
+
+# Tables of a schema version 1 database, the first release that stamped PRAGMA user_version
+V1_SCHEMA = """
+CREATE TABLE players (telegram_id INTEGER PRIMARY KEY, username TEXT, spaceship_level INTEGER DEFAULT 1,
+                      credits INTEGER DEFAULT 100);
+CREATE TABLE spaceship (telegram_id INTEGER PRIMARY KEY, fuel INTEGER, oxygen INTEGER, energy INTEGER,
+                        cargo INTEGER, weapons INTEGER, shields INTEGER, crew INTEGER,
+                        last_update TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE crew (id INTEGER PRIMARY KEY AUTOINCREMENT, telegram_id INTEGER, name TEXT, skill TEXT,
+                   level INTEGER DEFAULT 1);
+CREATE TABLE missions (id INTEGER PRIMARY KEY AUTOINCREMENT, telegram_id INTEGER, description TEXT,
+                       reward INTEGER, status TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                       time_limit INTEGER);
+CREATE TABLE upgrades (id INTEGER PRIMARY KEY AUTOINCREMENT, telegram_id INTEGER, type TEXT, level INTEGER,
+                       cost INTEGER, upgraded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE event_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, telegram_id INTEGER, event_type TEXT,
+                         event_details TEXT, event_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE alliances (id INTEGER PRIMARY KEY AUTOINCREMENT, alliance_name TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE alliance_members (id INTEGER PRIMARY KEY AUTOINCREMENT, telegram_id INTEGER, alliance_id INTEGER,
+                               joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE INDEX idx_alliance_members_player ON alliance_members (telegram_id);
+CREATE TABLE alliance_summary (alliance_id INTEGER PRIMARY KEY, member_count INTEGER DEFAULT 0,
+                               fleet_power INTEGER DEFAULT 0);
+CREATE TABLE raids (id INTEGER PRIMARY KEY AUTOINCREMENT, alliance_id INTEGER, boss_name TEXT,
+                    boss_health INTEGER, max_health INTEGER, round INTEGER DEFAULT 0,
+                    participant_count INTEGER DEFAULT 0, status TEXT DEFAULT 'active',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE INDEX idx_raids_status ON raids (status, alliance_id);
+CREATE TABLE raid_participants (raid_id INTEGER, telegram_id INTEGER,
+                                joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (raid_id, telegram_id));
+CREATE TABLE raid_rounds (id INTEGER PRIMARY KEY AUTOINCREMENT, raid_id INTEGER, round INTEGER,
+                          participants INTEGER, total_damage INTEGER, top_telegram_id INTEGER, top_damage INTEGER,
+                          boss_damage INTEGER, boss_health INTEGER, resolved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+PRAGMA user_version = 1;
+"""
+
+# Events of the version 1 fixture: (telegram_id, event_type, details, event_time). Some share a
+# timestamp, so keyset pages have to order them by id as well.
+V1_EVENTS = [(1, "battle" if n % 3 == 0 else "sector", f"{'pirates' if n % 2 else 'asteroids'} near sector {n}",
+              f"2024-01-{1 + n // 4:02d} 12:00:{n % 2:02d}") for n in range(25)]
+V1_EVENTS.append((2, "battle", "pirates ambushed player 2", "2024-01-03 08:00:00"))
+
+
+def activate(backend):
+    """Make backend the active storage engine with an empty player index and reply cache."""
+    database.set_backend(backend)
+    backend.init_db()
+    player_index.levels.load([], keep_live=False)
+    render_cache.replies.clear()
+    return backend
+
+
+@pytest.fixture
+def memory_backend():
+    """Make a fresh MemoryStorage the active backend, restoring the previous one afterwards."""
+    previous = database._backend
+    yield activate(MemoryStorage())
+    database._backend = previous
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def active_backend(request, tmp_path):
+    """Make each storage engine in turn the active backend, restoring the previous one afterwards."""
+    previous = database._backend
+    if request.param == "memory":
+        yield activate(MemoryStorage())
+    else:
+        yield activate(database.SQLiteStorage(str(tmp_path / "game.db")))
+    database._backend = previous
+
+
+@pytest.fixture
+def v1_database(tmp_path):
+    """Path of an SQLite file with a populated schema version 1 database."""
+    path = str(tmp_path / "v1.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(V1_SCHEMA)
+    conn.executemany("INSERT INTO players (telegram_id, username, spaceship_level, credits) VALUES (?, ?, ?, ?)",
+                     [(1, "ace", 2, 500), (2, "rookie", 1, 100)])
+    conn.executemany("INSERT INTO spaceship VALUES (?, 100, 100, 100, 50, ?, ?, 1, '2024-01-01 00:00:00')",
+                     [(1, 12, 8), (2, 10, 5)])
+    conn.executemany("INSERT INTO crew (telegram_id, name, skill, level) VALUES (?, ?, ?, ?)",
+                     [(1, "Alex", "pilot", 2), (1, "Sam", "gunner", 1), (1, "Riley", "pilot", 1)])
+    conn.executemany("INSERT INTO missions (telegram_id, description, reward, status, created_at, time_limit) "
+                     "VALUES (?, ?, ?, ?, ?, 3600)",
+                     [(1, "Escort a convoy", 120, "completed", "2024-01-02 10:00:00"),
+                      (1, "Survey a nebula", 80, "active", "2024-01-05 10:00:00")])
+    conn.execute("INSERT INTO upgrades (telegram_id, type, level, cost, upgraded_at) "
+                 "VALUES (1, 'weapons', 12, 150, '2024-01-02 11:00:00')")
+    conn.executemany("INSERT INTO event_logs (telegram_id, event_type, event_details, event_time) "
+                     "VALUES (?, ?, ?, ?)", V1_EVENTS)
+    conn.execute("INSERT INTO alliances (alliance_name) VALUES ('Star Fleet')")
+    conn.executemany("INSERT INTO alliance_members (telegram_id, alliance_id) VALUES (?, 1)", [(1,), (2,)])
+    conn.execute("INSERT INTO alliance_summary VALUES (1, 2, 67)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def storage(request, tmp_path):
+    """Each storage engine in turn, initialized and empty."""
+    if request.param == "memory":
+        backend = MemoryStorage()
+    else:
+        backend = database.SQLiteStorage(str(tmp_path / "game.db"))
+    backend.init_db()
+    return backend
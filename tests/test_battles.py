@@ -0,0 +1,85 @@
+"""
+test_battles.py - Paced /battle turns run as jobs and leave the dispatcher's workers free.
+"""
+
+import threading
+import time
+from queue import Queue
+
+import pytest
+from telegram import Bot
+from telegram.ext import Dispatcher, JobQueue
+
+import config
+import database
+import main
+from benchmarks.loadgen import LocalTelegramAPI, UpdateFactory
+
+WORKERS = 2
+
+
+class RecordingAPI(LocalTelegramAPI):
+    """Also records when each message was sent, and to which chat."""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def post(self, url, data, timeout=None):
+        if url.endswith("/sendMessage"):
+            self.sent.append((time.monotonic(), int(data["chat_id"]), data["text"]))
+        return super().post(url, data, timeout)
+
+    def times(self, chat_id: int = None, text: str = ""):
+        """When the messages containing text were sent, to chat_id or to any chat."""
+        return [sent_at for sent_at, chat, body in list(self.sent)
+                if text in body and chat_id in (None, chat)]
+
+
+def wait_until(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def bot_dispatcher(memory_backend):
+    """A dispatcher with WORKERS workers running every handler asynchronously, as the live bot does."""
+    api = RecordingAPI()
+    bot = Bot(token="123456:TEST", request=api)
+    job_queue = JobQueue()
+    dispatcher = Dispatcher(bot, Queue(), workers=WORKERS, job_queue=job_queue, use_context=True)
+    job_queue.set_dispatcher(dispatcher)
+    main.register_handlers(dispatcher)
+    for handler in dispatcher.handlers[0]:
+        handler.run_async = True
+    job_queue.start()
+    thread = threading.Thread(target=dispatcher.start, daemon=True)
+    thread.start()
+    yield dispatcher, UpdateFactory(bot), api
+    dispatcher.stop()
+    job_queue.stop()
+    thread.join(5)
+
+
+def test_paced_battles_do_not_block_other_players(bot_dispatcher, monkeypatch):
+    monkeypatch.setattr(config, "BATTLE_TURN_DELAY", 0.3)
+    dispatcher, factory, api = bot_dispatcher
+    fighters = range(1, WORKERS + 2)
+    for telegram_id in [*fighters, 99]:
+        database.add_player(telegram_id, f"pilot{telegram_id}")
+    for telegram_id in fighters:
+        dispatcher.update_queue.put(factory.build(telegram_id, "/battle"))
+    assert wait_until(lambda: len(api.times(text="commencing")) == len(fighters))
+
+    asked = time.monotonic()
+    dispatcher.update_queue.put(factory.build(99, "/spaceship"))
+    assert wait_until(lambda: api.times(chat_id=99), timeout=5)
+    answered = api.times(chat_id=99)[0]
+    assert answered - asked < config.BATTLE_TURN_DELAY
+    # The battles were still being fought, and each of them finishes.
+    assert all(finished > answered for finished in api.times(text="Battle result"))
+    assert wait_until(lambda: len(api.times(text="Battle result")) == len(fighters))
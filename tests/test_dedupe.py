@@ -0,0 +1,131 @@
+"""
+test_dedupe.py - TTLCache expiry and bounds, and the idempotent callback decorator.
+"""
+
+import copy
+
+import pytest
+
+import dedupe
+from benchmarks.fakes import FakeBot, FakeContext, callback_update
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(dedupe.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def presses(monkeypatch):
+    cache = dedupe.TTLCache(maxsize=100, ttl=60)
+    monkeypatch.setattr(dedupe, "presses", cache)
+    return cache
+
+
+def test_ttl_cache_add_refuses_live_keys(clock):
+    cache = dedupe.TTLCache(maxsize=10, ttl=5)
+    assert cache.add(["a", "b"], 1)
+    assert not cache.add(["b", "c"], 2)
+    assert cache.get("c") is None
+    assert cache.get("a") == 1
+
+
+def test_ttl_cache_entries_expire(clock):
+    cache = dedupe.TTLCache(maxsize=10, ttl=5)
+    cache.add(["a"], 1)
+    clock.now += 4.9
+    assert cache.get("a") == 1
+    clock.now += 0.2
+    assert cache.get("a") is None
+    assert cache.add(["a"], 2)
+
+
+def test_ttl_cache_put_replaces_and_refreshes(clock):
+    cache = dedupe.TTLCache(maxsize=10, ttl=5)
+    cache.add(["a"], 1)
+    clock.now += 4
+    cache.put(["a"], 2)
+    clock.now += 4
+    assert cache.get("a") == 2
+
+
+def test_ttl_cache_drops_oldest_beyond_maxsize(clock):
+    cache = dedupe.TTLCache(maxsize=3, ttl=5)
+    for key in "abcd":
+        cache.add([key], key)
+    assert len(cache.entries) == 3
+    assert cache.get("a") is None
+    assert cache.get("d") == "d"
+
+
+def test_ttl_cache_discard(clock):
+    cache = dedupe.TTLCache(maxsize=3, ttl=5)
+    cache.add(["a", "b"], 1)
+    cache.discard(["a", "b"])
+    assert cache.add(["a"], 2)
+
+
+def test_idempotent_runs_callback_once_per_press(presses):
+    calls = []
+
+    @dedupe.idempotent
+    def callback(update, context):
+        calls.append(update.callback_query.data)
+        update.callback_query.answer()
+        update.callback_query.edit_message_text("Upgraded weapons.")
+
+    bot = FakeBot()
+    update = callback_update(bot, 1, "upgrade_weapons", query_id="q1")
+    # A second tap carries the message as it was when the player tapped.
+    unedited = copy.copy(update.callback_query.message)
+    callback(update, FakeContext(bot))
+    # Telegram redelivers the same query, then the second tap arrives.
+    callback(update, FakeContext(bot))
+    callback(callback_update(bot, 1, "upgrade_weapons", query_id="q2", message=unedited), FakeContext(bot))
+    assert calls == ["upgrade_weapons"]
+    answers = [call[2] for call in bot.calls if call[0] == "answer_callback_query"]
+    assert answers == [None, "Upgraded weapons.", "Upgraded weapons."]
+
+
+def test_idempotent_allows_press_on_edited_message(presses):
+    calls = []
+
+    @dedupe.idempotent
+    def callback(update, context):
+        calls.append(update.callback_query.id)
+        update.callback_query.edit_message_text("Done.")
+
+    bot = FakeBot()
+    first = callback_update(bot, 1, "travel_2", query_id="q1")
+    callback(first, FakeContext(bot))
+    # The edit gave the message a new version, so a press on it is a new action.
+    callback(callback_update(bot, 1, "travel_2", query_id="q2", message=first.callback_query.message),
+             FakeContext(bot))
+    assert calls == ["q1", "q2"]
+
+
+def test_idempotent_forgets_failed_press(presses):
+    attempts = []
+
+    @dedupe.idempotent
+    def callback(update, context):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("database is locked")
+
+    bot = FakeBot()
+    update = callback_update(bot, 1, "shop_buy", query_id="q1")
+    with pytest.raises(RuntimeError):
+        callback(update, FakeContext(bot))
+    callback(update, FakeContext(bot))
+    assert len(attempts) == 2
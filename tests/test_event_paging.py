@@ -0,0 +1,85 @@
+"""
+test_event_paging.py - Keyset paging of event history, within one partition and across partitions.
+"""
+
+import database
+from conftest import V1_EVENTS
+
+
+def position(event):
+    return event["event_time"], event["id"]
+
+
+def walk_older(storage, telegram_id, limit, search=None):
+    """Page from the newest event to the oldest. Returns the pages as lists of ids."""
+    pages, before = [], None
+    while True:
+        events, has_more = storage.get_event_page(telegram_id, before=before, limit=limit, search=search)
+        pages.append([event["id"] for event in events])
+        if not has_more:
+            return pages, events
+        before = position(events[-1])
+
+
+def walk_newer(storage, telegram_id, limit, oldest_page, search=None):
+    """Page back up from a page of the oldest events. Returns the pages as lists of ids, newest first."""
+    pages, events = [], oldest_page
+    while True:
+        events, has_more = storage.get_event_page(telegram_id, after=position(events[0]), limit=limit,
+                                                  search=search)
+        pages.append([event["id"] for event in events])
+        if not has_more:
+            return pages[::-1]
+
+
+def test_pages_cover_every_event_once(storage):
+    for n in range(23):
+        storage.add_event_log(1, "sector", f"event {n}")
+        storage.add_event_log(2, "sector", f"other player {n}")
+    expected = [event["id"] for event in storage.get_recent_events(1, limit=100)]
+    assert len(expected) == 23
+
+    pages, oldest = walk_older(storage, 1, limit=5)
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert sum(pages, []) == expected
+
+    newer = walk_newer(storage, 1, limit=5, oldest_page=oldest)
+    assert sum(newer, []) + pages[-1] == expected
+
+
+def test_search_pages(storage):
+    for n in range(12):
+        storage.add_event_log(1, "battle", f"{'pirates' if n % 3 == 0 else 'drones'} attacked, wave {n}")
+    pages, _ = walk_older(storage, 1, limit=2, search="pirate")
+    assert [len(page) for page in pages] == [2, 2]
+    found, _ = storage.get_event_page(1, search="drones wave")
+    assert len(found) == 8
+    assert storage.get_event_page(1, search="nothing")[0] == []
+    # The player column that scopes the search is not searched itself.
+    assert storage.get_event_page(1, search="u1")[0] == []
+
+
+def test_pages_span_partitions(v1_database):
+    storage = database.SQLiteStorage(v1_database)
+    storage.init_db()
+    for n in range(7):
+        storage.add_event_log(1, "sector", f"pirates spotted again {n}")
+    partitions = storage.get_event_partitions()
+    assert len(partitions) == 2
+
+    legacy = [n + 1 for n, event in sorted(enumerate(V1_EVENTS), key=lambda item: (item[1][3], item[0]),
+                                           reverse=True) if event[0] == 1]
+    hot = [event["id"] for event in storage.read_event_partition(partitions[-1]["name"])]
+    expected = hot[::-1] + legacy
+
+    for limit in (3, 4, 7, 10):
+        pages, oldest = walk_older(storage, 1, limit=limit)
+        assert sum(pages, []) == expected
+        assert all(len(page) == limit for page in pages[:-1])
+        newer = walk_newer(storage, 1, limit=limit, oldest_page=oldest)
+        assert sum(newer, []) + pages[-1] == expected
+
+    pirates = [event_id for event_id in expected
+               if event_id in hot or "pirates" in V1_EVENTS[event_id - 1][2]]
+    pages, _ = walk_older(storage, 1, limit=4, search="pirates")
+    assert sum(pages, []) == pirates
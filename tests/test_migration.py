@@ -0,0 +1,98 @@
+"""
+test_migration.py - Upgrading a schema version 1 database to the current schema.
+"""
+
+import sqlite3
+from collections import Counter
+
+import database
+from conftest import V1_EVENTS
+
+
+def schema_objects(path):
+    conn = sqlite3.connect(path)
+    names = {name for (name,) in conn.execute("SELECT name FROM sqlite_master")}
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    conn.close()
+    return names, version
+
+
+def test_upgrades_to_current_version(v1_database):
+    database.SQLiteStorage(v1_database).init_db()
+    names, version = schema_objects(v1_database)
+    assert version == database.SCHEMA_VERSION
+    for name in ("event_partitions", "event_logs_legacy", "event_logs_legacy_fts", "crew_bonuses",
+                 "session_state", "activity_rollups", "idx_missions_pool", "idx_missions_player", "spaceship_alliance_power"):
+        assert name in names
+    conn = sqlite3.connect(v1_database)
+    assert conn.execute("SELECT type FROM sqlite_master WHERE name = 'event_logs'").fetchone()[0] == "view"
+    conn.close()
+
+
+def test_keeps_player_data(v1_database):
+    storage = database.SQLiteStorage(v1_database)
+    storage.init_db()
+    assert sorted(storage.get_player_levels()) == [(1, 2), (2, 1)]
+    assert storage.get_spaceship(1).weapons == 12
+    assert [member.name for member in storage.get_crew(1)] == ["Alex", "Sam", "Riley"]
+    assert all(member.trained_at for member in storage.get_crew(1))
+    assert [mission.description for mission in storage.get_active_missions(1)] == ["Survey a nebula"]
+    alliances, has_more = storage.get_alliance_page()
+    assert [(a["alliance_name"], a["member_count"], a["fleet_power"]) for a in alliances] == [("Star Fleet", 2, 67)]
+    assert not has_more
+
+
+def test_backfills_derived_tables(v1_database):
+    storage = database.SQLiteStorage(v1_database)
+    storage.init_db()
+    assert storage.get_crew_bonuses(1) == {"pilot": 3, "gunner": 1}
+    counts, amounts = Counter(), Counter()
+    for row in storage.get_rollups("day", "2024-01-01"):
+        counts[row["metric"], row["key"]] += row["count"]
+        amounts[row["metric"], row["key"]] += row["amount"]
+    assert (counts["upgrade", "weapons"], amounts["upgrade", "weapons"]) == (1, 150)
+    assert (counts["mission", "completed"], amounts["mission", "completed"]) == (1, 120)
+    battles = sum(1 for event in V1_EVENTS if event[1] == "battle")
+    assert counts["event", "battle"] == counts["battle", "win"] == battles
+    assert counts["event", "sector"] == len(V1_EVENTS) - battles
+    # The hourly rollups hold the same totals.
+    assert sum(row["count"] for row in storage.get_rollups("hour", "2024-01-01")
+               if row["metric"] == "event") == len(V1_EVENTS)
+
+
+def test_legacy_events_stay_readable_and_searchable(v1_database):
+    storage = database.SQLiteStorage(v1_database)
+    storage.init_db()
+    recent = storage.get_recent_events(1, limit=3)
+    assert [event["event_details"] for event in recent] == [
+        "asteroids near sector 24", "pirates near sector 23", "pirates near sector 21"]
+    found, _ = storage.get_event_page(2, search="pirates")
+    assert [event["event_details"] for event in found] == ["pirates ambushed player 2"]
+    # New events go to a fresh partition and continue the legacy ID sequence.
+    storage.add_event_log(1, "sector", "Docked at the station")
+    newest = storage.get_recent_events(1, limit=1)[0]
+    assert newest["event_details"] == "Docked at the station"
+    assert newest["id"] == len(V1_EVENTS) + 1
+    assert len(storage.get_event_partitions()) == 2
+
+
+def test_second_run_is_a_no_op(v1_database):
+    database.SQLiteStorage(v1_database).init_db()
+    storage = database.SQLiteStorage(v1_database)
+    storage.init_db()
+    storage.init_db(force=True)
+    assert storage.get_crew_bonuses(1) == {"pilot": 3, "gunner": 1}
+    totals = [row for row in storage.get_rollups("day", "2024-01-01")
+              if (row["metric"], row["key"]) == ("upgrade", "weapons")]
+    assert [row["count"] for row in totals] == [1]
+    assert len(storage.get_event_partitions()) == 2
+
+
+def test_mission_pool_works_after_upgrade(v1_database):
+    storage = database.SQLiteStorage(v1_database)
+    storage.init_db()
+    storage.add_pool_missions([("Deliver ore", 50, 1800)])
+    assert storage.count_pool_missions() == 1
+    claimed = storage.claim_mission(2)
+    assert (claimed.telegram_id, claimed.description, claimed.status) == (2, "Deliver ore", "active")
+    assert storage.claim_mission(2) is None
@@ -0,0 +1,101 @@
+"""
+test_persistence.py - DatabasePersistence change detection, batching and reloading.
+"""
+
+import pytest
+
+import database
+from persistence import DatabasePersistence, USER
+
+
+def pending_keys(persistence):
+    return {(kind, owner_id, value is None) for (kind, owner_id, _), value in persistence.pending.items()}
+
+
+def test_round_trip_through_storage(memory_backend):
+    persistence = DatabasePersistence(max_pending=100)
+    user_data = persistence.get_user_data()
+    user_data[1]["recent_victims"] = {7: 1700000000}
+    user_data[1]["history_searches"] = {"abc": "pirates"}
+    persistence.update_user_data(1, user_data[1])
+    persistence.update_bot_data({"season": 3})
+    persistence.flush()
+
+    reloaded = DatabasePersistence()
+    assert reloaded.get_user_data()[1] == {"recent_victims": {7: 1700000000}, "history_searches": {"abc": "pirates"}}
+    assert reloaded.get_user_data()[2] == {}
+    assert reloaded.get_bot_data() == {"season": 3}
+
+
+def test_only_changed_keys_are_queued(memory_backend):
+    persistence = DatabasePersistence(max_pending=100)
+    data = persistence.get_user_data()[1]
+    data.update(a=1, b=[1, 2])
+    persistence.update_user_data(1, data)
+    assert len(persistence.pending) == 2
+    persistence.flush()
+
+    persistence.update_user_data(1, data)
+    assert persistence.pending == {}
+    data["b"].append(3)
+    persistence.update_user_data(1, data)
+    assert len(persistence.pending) == 1
+
+
+def test_removed_keys_are_deleted(memory_backend):
+    persistence = DatabasePersistence(max_pending=100)
+    data = persistence.get_user_data()[1]
+    data.update(a=1, b=2)
+    persistence.update_user_data(1, data)
+    persistence.flush()
+
+    del data["a"]
+    persistence.update_user_data(1, data)
+    assert pending_keys(persistence) == {(USER, 1, True)}
+    persistence.flush()
+    assert DatabasePersistence().get_user_data()[1] == {"b": 2}
+
+
+def test_untouched_empty_owners_write_nothing(memory_backend):
+    persistence = DatabasePersistence(max_pending=100)
+    persistence.update_user_data(5, persistence.get_user_data()[5])
+    persistence.update_chat_data(5, {})
+    assert persistence.pending == {}
+
+
+def test_conversations_are_tracked_per_key(memory_backend):
+    persistence = DatabasePersistence(max_pending=100)
+    assert persistence.get_conversations("trade") == {}
+    persistence.update_conversation("trade", (1, 1), "CHOOSING")
+    persistence.update_conversation("trade", (1, 1), "CHOOSING")
+    assert len(persistence.pending) == 1
+    persistence.flush()
+    assert DatabasePersistence().get_conversations("trade") == {(1, 1): "CHOOSING"}
+    persistence.update_conversation("trade", (1, 1), None)
+    persistence.flush()
+    assert DatabasePersistence().get_conversations("trade") == {}
+
+
+def test_backlog_flushes_by_itself(memory_backend):
+    persistence = DatabasePersistence(max_pending=3)
+    for user_id in range(3):
+        persistence.update_user_data(user_id, {"seen": True})
+    assert persistence.pending == {}
+    assert DatabasePersistence().get_user_data()[2] == {"seen": True}
+
+
+def test_failed_flush_is_requeued(memory_backend, monkeypatch):
+    persistence = DatabasePersistence(max_pending=100)
+    persistence.update_user_data(1, {"a": 1})
+
+    def fail(changes):
+        # A newer change arrives while the failing batch is being written.
+        persistence.update_user_data(1, {"a": 2})
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(database, "save_session_state", fail)
+    with pytest.raises(RuntimeError):
+        persistence.flush()
+    monkeypatch.undo()
+    persistence.flush()
+    assert DatabasePersistence().get_user_data()[1] == {"a": 2}
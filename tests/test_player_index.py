@@ -0,0 +1,76 @@
+"""
+test_player_index.py - LevelIndex bucket maintenance, loading and sampling.
+"""
+
+from player_index import LevelIndex
+
+
+def check_consistent(index):
+    """Every position points at its player and every bucket entry has a position."""
+    for telegram_id, (level, slot) in index.positions.items():
+        assert index.buckets[level][slot] == telegram_id
+    assert sum(len(bucket) for bucket in index.buckets.values()) == len(index)
+    assert all(index.buckets.values())
+
+
+def test_add_move_and_remove():
+    index = LevelIndex()
+    for telegram_id in range(1, 6):
+        index.add(telegram_id, level=1)
+    index.add(3, level=4)
+    assert index.level_of(3) == 1
+    index.set_level(2, 3)
+    index.remove(1)
+    index.remove(42)
+    assert 1 not in index and 2 in index
+    assert index.level_of(2) == 3
+    assert sorted(index.buckets[1]) == [3, 4, 5]
+    check_consistent(index)
+    index.remove(2)
+    assert 3 not in index.buckets
+    check_consistent(index)
+
+
+def test_load_keeps_live_changes():
+    index = LevelIndex()
+    index.add(1, level=1)
+    index.set_level(2, 5)
+    # Rows read before player 2 levelled up and before player 1 joined
+    index.load([(2, 4), (3, 2)])
+    assert index.level_of(1) == 1
+    assert index.level_of(2) == 5
+    assert index.level_of(3) == 2
+    check_consistent(index)
+    index.load([(3, 2)], keep_live=False)
+    assert list(index.positions) == [3]
+
+
+def test_sample_respects_window_exclude_and_accept():
+    index = LevelIndex()
+    index.load([(1, 1), (2, 3), (3, 3), (4, 6)])
+    assert index.sample(3, exclude={2}) == 3
+    assert index.sample(5, window=0) is None
+    assert index.sample(5, window=1) == 4
+    assert index.sample(3, window=2, accept=lambda telegram_id: telegram_id == 1) == 1
+    assert index.sample(3, window=1, exclude={2, 3}) is None
+
+
+def test_sample_large_bucket_uses_bounded_draws():
+    index = LevelIndex()
+    index.load((telegram_id, 1) for telegram_id in range(1000))
+    seen = {index.sample(1, attempts=4) for _ in range(50)}
+    assert None not in seen
+    assert len(seen) > 1
+    assert index.sample(1, attempts=4, accept=lambda telegram_id: False) is None
+
+
+def test_candidates_come_nearest_level_first_without_repeats():
+    index = LevelIndex()
+    index.load([(1, 3), (2, 3), (3, 4), (4, 2), (5, 9)])
+    drawn = list(index.candidates(3, window=1, exclude={2}, attempts=8))
+    assert drawn[0] == 1
+    assert sorted(drawn[1:]) == [3, 4]
+    index.load((telegram_id, 1) for telegram_id in range(1000))
+    drawn = list(index.candidates(1, attempts=4))
+    assert 1 <= len(drawn) <= 4
+    assert len(set(drawn)) == len(drawn)
@@ -0,0 +1,60 @@
+"""
+test_profiler.py - What the slow update recorder counts as slow and which SQL it keeps.
+"""
+
+import sqlite3
+import time
+from types import SimpleNamespace
+
+from profiler import SlowRequestRecorder
+
+UPDATE = SimpleNamespace(effective_user=SimpleNamespace(id=1), callback_query=None,
+                         effective_message=SimpleNamespace(text="/battle"))
+
+
+def spin(seconds: float):
+    deadline = time.thread_time() + seconds
+    while time.thread_time() < deadline:
+        pass
+
+
+def test_sleeping_does_not_make_an_update_slow():
+    recorder = SlowRequestRecorder(threshold=0.05)
+    recorder.wrap_handler("battle", lambda update, context: time.sleep(0.2))(UPDATE, None)
+    assert not recorder.records
+
+
+def test_busy_updates_are_recorded():
+    recorder = SlowRequestRecorder(threshold=0.05)
+    recorder.wrap_handler("battle", lambda update, context: spin(0.1))(UPDATE, None)
+    trace, = recorder.records
+    assert trace.duration >= 0.05
+    assert trace.elapsed >= trace.duration * 0.9
+
+
+def test_database_time_counts_and_sql_is_traced_once_slow():
+    recorder = SlowRequestRecorder(threshold=0.05)
+
+    def query(sql):
+        conn = sqlite3.connect(":memory:")
+        recorder.attach(conn)
+        conn.execute(sql)
+        conn.close()
+
+    def slow_query(sql):
+        time.sleep(0.1)  # waiting on the database lock counts as database time
+        query(sql)
+
+    traced_query = recorder.wrap_db("query", query)
+    traced_slow_query = recorder.wrap_db("slow_query", slow_query)
+
+    def handler(update, context):
+        traced_query("SELECT 1")
+        traced_slow_query("SELECT 2")
+        traced_query("SELECT 3")
+
+    recorder.wrap_handler("battle", handler)(UPDATE, None)
+    trace, = recorder.records
+    assert [name for name, _ in trace.db_calls] == ["query", "slow_query", "query"]
+    assert [sql for _, sql in trace.statements] == ["SELECT 3"]
+    assert 0.1 <= trace.db_time < trace.duration + 0.01
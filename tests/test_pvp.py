@@ -0,0 +1,71 @@
+"""
+test_pvp.py - MatchmakingQueue matching, window widening and expiry.
+"""
+
+from pvp import MatchmakingQueue, QueueEntry
+
+
+def entry(telegram_id, rating, joined_at=0.0):
+    return QueueEntry(telegram_id, rating, joined_at, chat_id=telegram_id, name=f"p{telegram_id}")
+
+
+def make_queue():
+    return MatchmakingQueue(bucket_width=50, base_window=100, window_growth=10, max_window=500)
+
+
+def test_join_matches_within_base_window():
+    queue = make_queue()
+    assert queue.join(entry(1, 1000)) is None
+    opponent = queue.join(entry(2, 1080))
+    assert opponent.telegram_id == 1
+    assert len(queue) == 0
+    assert queue.buckets == {}
+
+
+def test_join_queues_players_out_of_range():
+    queue = make_queue()
+    queue.join(entry(1, 1000))
+    assert queue.join(entry(2, 1300)) is None
+    assert 1 in queue and 2 in queue
+
+
+def test_join_twice_keeps_one_entry():
+    queue = make_queue()
+    queue.join(entry(1, 1000))
+    assert queue.join(entry(1, 1000)) is None
+    assert len(queue) == 1
+
+
+def test_closest_rating_wins():
+    queue = make_queue()
+    queue.join(entry(1, 900))
+    queue.join(entry(2, 1250))
+    queue.join(entry(3, 1030))
+    assert queue.join(entry(4, 1010)).telegram_id == 3
+
+
+def test_match_waiting_widens_window_with_wait():
+    queue = make_queue()
+    queue.join(entry(1, 1000, joined_at=0))
+    queue.join(entry(2, 1250, joined_at=0))
+    # Windows are 100 + 10 per second waited.
+    assert queue.match_waiting(now=10) == []
+    pairs = queue.match_waiting(now=15)
+    assert [(a.telegram_id, b.telegram_id) for a, b in pairs] == [(1, 2)]
+    assert len(queue) == 0
+
+
+def test_window_is_capped():
+    queue = make_queue()
+    assert queue.window(entry(1, 1000, joined_at=0), now=10_000) == 500
+
+
+def test_leave_and_expire():
+    queue = make_queue()
+    queue.join(entry(1, 1000, joined_at=0))
+    queue.join(entry(2, 2000, joined_at=50))
+    assert queue.leave(3) is None
+    assert queue.leave(1).telegram_id == 1
+    queue.join(entry(3, 3000, joined_at=0))
+    assert [e.telegram_id for e in queue.expire(60, now=100)] == [3]
+    assert list(queue.entries) == [2]
@@ -0,0 +1,105 @@
+"""
+test_render_cache.py - RenderCache hits, invalidation, LRU eviction and version pruning.
+"""
+
+import database
+import render_cache
+from render_cache import RenderCache
+
+
+class Builder:
+    """A build() callback counting how often the reply was rendered."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return f"reply {self.calls}"
+
+
+def test_reuses_reply_until_domain_changes():
+    cache, build = RenderCache(maxsize=10), Builder()
+    assert cache.render(1, "spaceship", build) == "reply 1"
+    assert cache.render(1, "spaceship", build) == "reply 1"
+    # Another domain of the same player leaves the reply alone.
+    cache.bump(1, "crew")
+    assert cache.render(1, "spaceship", build) == "reply 1"
+    cache.bump(1, "ship")
+    assert cache.render(1, "spaceship", build) == "reply 2"
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_bump_all_and_clear_invalidate_every_player():
+    cache, build = RenderCache(maxsize=10), Builder()
+    cache.render(1, "crew", build)
+    cache.render(2, "crew", build)
+    cache.bump_all("crew")
+    assert cache.render(1, "crew", build) == "reply 3"
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.render(2, "crew", build) == "reply 4"
+
+
+def test_write_during_render_is_not_cached_as_current():
+    cache = RenderCache(maxsize=10)
+
+    def build():
+        # A write lands after the stamp was taken but before the reply is stored.
+        cache.bump(1, "missions")
+        return "stale"
+
+    assert cache.render(1, "missions", build) == "stale"
+    assert cache.render(1, "missions", lambda: "fresh") == "fresh"
+
+
+def test_evicts_least_recently_used():
+    cache, build = RenderCache(maxsize=2), Builder()
+    cache.render(1, "crew", build)
+    cache.render(2, "crew", build)
+    cache.render(1, "crew", build)
+    cache.render(3, "crew", build)
+    assert set(cache.entries) == {(1, "crew"), (3, "crew")}
+
+
+def test_versions_stay_bounded_without_reviving_stale_replies():
+    cache = RenderCache(maxsize=4)
+    cache.render(1, "crew", lambda: "kept")
+    stale_stamp = cache.stamp(99, "ship")
+    for telegram_id in range(100, 200):
+        cache.bump(telegram_id, "ship")
+    assert len(cache.versions) <= 2 * cache.maxsize
+    # Cached replies survive the pruning; forgotten players get a new stamp.
+    assert cache.render(1, "crew", lambda: "rebuilt") == "kept"
+    assert cache.stamp(99, "ship") != stale_stamp
+
+
+def test_add_player_only_invalidates_on_insert(memory_backend):
+    database.add_player(1, "pilot")
+    stamp = render_cache.replies.stamp(1, "ship")
+    assert not database.add_player(1, "pilot")
+    assert render_cache.replies.stamp(1, "ship") == stamp
+    database.update_spaceship(1, fuel=5)
+    assert render_cache.replies.stamp(1, "ship") != stamp
+
+
+def test_raid_damage_only_invalidates_the_raiders(active_backend):
+    for telegram_id in (1, 2):
+        database.add_player(telegram_id, f"pilot{telegram_id}")
+    alliance_id = database.create_alliance("Star Fleet")
+    database.join_alliance(1, alliance_id)
+    raid_id = database.create_raid(alliance_id, "Void Leviathan", 1000)
+    database.join_raid(raid_id, 1)
+    builds = {1: Builder(), 2: Builder()}
+    for telegram_id, build in builds.items():
+        render_cache.replies.render(telegram_id, "spaceship", build)
+
+    database.record_raid_round(raid_id, {
+        "round": 1, "participants": 1, "total_damage": 40, "top_telegram_id": 1, "top_damage": 40,
+        "boss_damage": 15, "boss_health": 960,
+    }, "active")
+
+    for telegram_id, build in builds.items():
+        render_cache.replies.render(telegram_id, "spaceship", build)
+    assert builds[1].calls == 2
+    assert builds[2].calls == 1
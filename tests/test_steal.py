@@ -0,0 +1,50 @@
+"""
+test_steal.py - Atomic credit theft between two players and /steal target selection.
+"""
+
+import time
+
+import database
+import player_index
+from game_commands import pick_steal_target
+
+
+def test_moves_a_capped_share_and_logs_both_players(storage):
+    storage.add_player(1, "thief")
+    storage.add_player(2, "victim")
+    assert storage.steal_credits(1, 2, fraction=0.5, max_amount=30) == 30
+    # Taking everything shows what is left on each side.
+    assert storage.steal_credits(1, 2, fraction=1.0, max_amount=10 ** 6) == 70
+    assert storage.steal_credits(2, 1, fraction=1.0, max_amount=10 ** 6) == 200
+    assert [event["event_details"] for event in storage.get_recent_events(2)][-1] == \
+        "Player 1 stole 30 credits from you."
+
+
+def test_missing_players_steal_nothing(storage):
+    storage.add_player(2, "victim")
+    assert storage.steal_credits(1, 2, fraction=0.5, max_amount=30) == 0
+    assert storage.steal_credits(2, 3, fraction=0.5, max_amount=30) == 0
+    assert storage.steal_credits(2, 2, fraction=0.5, max_amount=30) == 0
+    assert storage.get_recent_events(2) == []
+    storage.add_player(1, "thief")
+    assert storage.steal_credits(1, 2, fraction=1.0, max_amount=10 ** 6) == 100
+
+
+def test_player_alliances_come_from_the_latest_membership(storage):
+    first, second = storage.create_alliance("First"), storage.create_alliance("Second")
+    storage.join_alliance(1, first)
+    storage.join_alliance(2, first)
+    storage.join_alliance(2, second)
+    assert storage.get_player_alliances([1, 2, 3]) == {1: first, 2: second}
+    assert storage.get_player_alliances([]) == {}
+
+
+def test_steal_target_skips_alliance_mates(active_backend):
+    alliance_id = database.create_alliance("Star Fleet")
+    for telegram_id in range(1, 6):
+        database.add_player(telegram_id, f"pilot{telegram_id}")
+        player_index.levels.add(telegram_id)
+        if telegram_id < 5:
+            database.join_alliance(telegram_id, alliance_id)
+    assert {pick_steal_target(1) for _ in range(20)} == {5}
+    assert pick_steal_target(1, recent={5: time.time()}) is None
@@ -0,0 +1,105 @@
+"""
+test_storage.py - Players, ships, crews, missions and alliances behave the same on every storage engine.
+"""
+
+import config
+from storage import ship_power
+
+
+def test_new_players_get_a_starting_ship(storage):
+    storage.add_player(1, "ace")
+    storage.update_spaceship(1, fuel=5)
+    storage.add_player(1, "ace")
+    ship = storage.get_spaceship(1)
+    assert (ship.fuel, ship.weapons, ship.shields) == (5, config.STARTING_WEAPONS, config.STARTING_SHIELDS)
+    assert storage.get_spaceship(2) is None
+
+
+def test_update_spaceship_skips_unknown_players(storage):
+    storage.add_player(1, "ace")
+    storage.update_spaceship(1, fuel=7, weapons=40)
+    storage.update_spaceship(2, fuel=7)
+    ship = storage.get_spaceship(1)
+    assert (ship.fuel, ship.weapons) == (7, 40)
+    assert storage.get_spaceship(2) is None
+
+
+def test_crew_belongs_to_its_player(storage):
+    storage.add_crew_member(1, "Alex", "pilot")
+    storage.add_crew_member(2, "Riley", "pilot")
+    storage.add_crew_member(1, "Sam", "gunner")
+    assert [(member.name, member.skill, member.level) for member in storage.get_crew(1)] == [
+        ("Alex", "pilot", 1), ("Sam", "gunner", 1)]
+    assert storage.get_crew(3) == []
+
+
+def test_completed_missions_leave_the_active_list(storage):
+    storage.add_mission(1, "Escort a convoy", 120, 3600)
+    storage.add_mission(2, "Deliver ore", 50, 1800)
+    storage.add_mission(1, "Survey a nebula", 80, 600)
+    active = storage.get_active_missions(1)
+    assert [(mission.description, mission.reward) for mission in active] == [
+        ("Escort a convoy", 120), ("Survey a nebula", 80)]
+    storage.complete_mission(active[0].id)
+    assert [mission.description for mission in storage.get_active_missions(1)] == ["Survey a nebula"]
+    assert len(storage.get_active_missions(2)) == 1
+
+
+def test_alliances_get_distinct_ids(storage):
+    first = storage.create_alliance("Star Fleet")
+    second = storage.create_alliance("Void Runners")
+    assert first != second
+    storage.join_alliance(1, first)
+    assert sorted((alliance["id"], alliance["alliance_name"]) for alliance in storage.get_alliances()) == [
+        (first, "Star Fleet"), (second, "Void Runners")]
+
+
+def test_alliance_pages_keep_member_counts_and_fleet_power(storage):
+    alliance_ids = [storage.create_alliance(f"Alliance {n}") for n in range(5)]
+    for telegram_id in (1, 2):
+        storage.add_player(telegram_id, f"pilot{telegram_id}")
+        storage.join_alliance(telegram_id, alliance_ids[0])
+    storage.update_spaceship(1, weapons=40)
+    page, has_more = storage.get_alliance_page(limit=2)
+    assert [alliance["id"] for alliance in page] == alliance_ids[:2] and has_more
+    assert (page[0]["member_count"], page[0]["fleet_power"]) == (
+        2, ship_power(storage.get_spaceship(1)) + ship_power(storage.get_spaceship(2)))
+    assert (page[1]["member_count"], page[1]["fleet_power"]) == (0, 0)
+    page, has_more = storage.get_alliance_page(after_id=alliance_ids[3], limit=2)
+    assert [alliance["id"] for alliance in page] == alliance_ids[4:] and not has_more
+    page, has_more = storage.get_alliance_page(before_id=alliance_ids[2], limit=2)
+    assert [alliance["id"] for alliance in page] == alliance_ids[:2] and not has_more
+
+
+def test_raid_rounds_damage_the_fleet_until_the_raid_ends(storage):
+    alliance_id = storage.create_alliance("Star Fleet")
+    for telegram_id in (1, 2, 3):
+        storage.add_player(telegram_id, f"pilot{telegram_id}")
+    storage.join_alliance(1, alliance_id)
+    storage.join_alliance(2, alliance_id)
+    assert storage.get_player_alliance(2) == alliance_id
+    assert storage.get_player_alliance(3) is None
+    raid_id = storage.create_raid(alliance_id, "Void Leviathan", 1000)
+    assert storage.join_raid(raid_id, 1) and storage.join_raid(raid_id, 2)
+    assert not storage.join_raid(raid_id, 1)
+    storage.update_spaceship(2, shields=10)
+    assert sorted(storage.get_raid_fleet(raid_id)["telegram_id"]) == [1, 2]
+
+    round_result = {"round": 1, "participants": 2, "total_damage": 40, "top_telegram_id": 1, "top_damage": 25,
+                    "boss_damage": 15, "boss_health": 960}
+    storage.record_raid_round(raid_id, round_result, "active")
+    raid = storage.get_active_raid(alliance_id)
+    assert (raid["id"], raid["boss_health"], raid["round"], raid["participant_count"]) == (raid_id, 960, 1, 2)
+    shields = [storage.get_spaceship(telegram_id).shields for telegram_id in (1, 2, 3)]
+    assert shields == [config.STARTING_SHIELDS - 15, 0, config.STARTING_SHIELDS]
+
+    storage.record_raid_round(raid_id, dict(round_result, round=2, boss_damage=0, boss_health=0), "defeated")
+    assert storage.get_active_raid(alliance_id) is None
+    assert storage.get_active_raids() == []
+
+
+def test_upgrades_raise_the_spaceship_level(storage):
+    storage.add_player(1, "ace")
+    storage.add_player(2, "rookie")
+    storage.upgrade_spaceship(1, "weapons", 3, 150)
+    assert sorted(storage.get_player_levels()) == [(1, 3), (2, 1)]
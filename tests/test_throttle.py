@@ -0,0 +1,123 @@
+"""
+test_throttle.py - UserGate throttling, coalescing, per-user ordering and lane pruning.
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+from telegram.ext import DispatcherHandlerStop
+
+import throttle
+from benchmarks.fakes import FakeBot, callback_update, command_update
+
+
+class Dispatcher:
+    """Just enough of a telegram.ext.Dispatcher for UserGate.admit."""
+
+    def __init__(self):
+        self.handlers = {0: [SimpleNamespace(check_update=lambda update: True)]}
+        self.answers = []
+
+    def run_async(self, fn, *args, **kwargs):
+        self.answers.append(kwargs.get("text"))
+
+
+def make_gate(**kwargs):
+    settings = dict(rate=1000, burst=5, max_queued=5, max_wait=5)
+    settings.update(kwargs)
+    gate = throttle.UserGate(**settings)
+    gate.dispatcher = Dispatcher()
+    return gate
+
+
+def admit(gate, update):
+    """Run the gate on an update. Returns its context if admitted, None if dropped."""
+    context = SimpleNamespace(dispatcher=gate.dispatcher)
+    try:
+        gate.admit(update, context)
+    except DispatcherHandlerStop:
+        return None
+    return context
+
+
+def test_admits_until_bucket_is_empty():
+    gate = make_gate(rate=0.001, burst=3, max_queued=10)
+    bot = FakeBot()
+    admitted = [admit(gate, command_update(bot, 1, "/spaceship")) for _ in range(5)]
+    assert [context is not None for context in admitted] == [True, True, True, False, False]
+    assert gate.counts["throttled"] == 2
+    # Other players have their own buckets.
+    assert admit(gate, command_update(bot, 2, "/spaceship")) is not None
+
+
+def test_limits_queued_updates_per_user():
+    gate = make_gate(max_queued=2)
+    bot = FakeBot()
+    assert admit(gate, command_update(bot, 1, "/scan"))
+    assert admit(gate, command_update(bot, 1, "/scan"))
+    assert admit(gate, command_update(bot, 1, "/scan")) is None
+
+
+def test_coalesces_repeated_press_while_queued():
+    gate = make_gate()
+    bot = FakeBot()
+    first = admit(gate, callback_update(bot, 1, "upgrade_weapons"))
+    assert first is not None
+    assert admit(gate, callback_update(bot, 1, "upgrade_weapons")) is None
+    assert gate.dispatcher.answers == [throttle.COALESCED_TEXT]
+    # Once the first press has finished, the same button is admitted again.
+    gate.ordered(lambda update, context: None)(None, first)
+    assert admit(gate, callback_update(bot, 1, "upgrade_weapons")) is not None
+
+
+def test_runs_one_users_updates_in_arrival_order():
+    gate = make_gate()
+    bot = FakeBot()
+    contexts = [admit(gate, command_update(bot, 1, f"/cmd{n}")) for n in range(4)]
+    order = []
+
+    def handler(update, context):
+        order.append(context.gate_ticket[1])
+        time.sleep(0.01)
+
+    # Start the handlers in reverse; each still waits for the tickets before it.
+    threads = [threading.Thread(target=gate.ordered(handler), args=(None, context))
+               for context in reversed(contexts)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert order == [0, 1, 2, 3]
+
+
+def test_prune_keeps_lane_of_update_that_gave_up_waiting():
+    gate = make_gate(max_wait=0.05)
+    bot = FakeBot()
+    slow, fast = (admit(gate, command_update(bot, 1, "/battle")) for _ in range(2))
+    release = threading.Event()
+    worker = threading.Thread(target=gate.ordered(lambda update, context: release.wait()), args=(None, slow),
+                              daemon=True)
+    worker.start()
+    try:
+        time.sleep(0.01)
+        # The second update gives up waiting for the first, runs and finishes.
+        gate.ordered(lambda update, context: None)(None, fast)
+        with gate.lock:
+            gate.prune(time.monotonic() + 3600)
+        assert 1 in gate.lanes
+    finally:
+        release.set()
+        worker.join()
+    with gate.lock:
+        gate.prune(time.monotonic() + 3600)
+    assert 1 not in gate.lanes
+    assert gate.buckets == {}
+
+
+def test_updates_without_ticket_run_directly():
+    gate = make_gate()
+    calls = []
+    gate.ordered(lambda update, context: calls.append(context))(None, SimpleNamespace())
+    assert len(calls) == 1
+    assert gate.lanes == {}
@@ -0,0 +1,179 @@
+"""
+throttle.py - Per-user admission control and ordering for incoming updates.
+A gate handler runs on the dispatcher thread before the game handlers. It charges each
+update to the sender's token bucket, coalesces a repeated button press while the same
+press is still queued or running, and hands every admitted update a per-user ticket.
+Game handlers then run on the dispatcher's worker pool and wait for their ticket, so
+different players are served in parallel while one player's actions run one at a time,
+in the order they arrived. Dropped updates never reach the game modules or the database.
+"""
+
+import collections
+import logging
+import threading
+import time
+from telegram import Update
+from telegram.ext import CallbackContext, DispatcherHandlerStop, TypeHandler
+import config
+
+logger = logging.getLogger(__name__)
+
+THROTTLED_TEXT = "Slow down, captain! Too many actions at once."
+COALESCED_TEXT = "Already on it..."
+
+
+class TokenBucket:
+    """Refills rate tokens per second up to burst; each admitted update takes one."""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, rate: float, burst: float, now: float) -> bool:
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class Lane:
+    """One user's ticket counter, unfinished updates and the callback data of their queued button presses."""
+
+    __slots__ = ("next_ticket", "serving", "active", "pending", "turn")
+
+    def __init__(self, lock):
+        self.next_ticket = 0
+        self.serving = 0
+        self.active = 0
+        self.pending = collections.Counter()
+        self.turn = threading.Condition(lock)
+
+
+class UserGate:
+    """Token-bucket throttling, coalescing and ordered execution of each user's updates."""
+
+    def __init__(self, rate: float = None, burst: float = None, max_queued: int = None, max_wait: float = None):
+        self.rate = rate or config.THROTTLE_RATE
+        self.burst = burst or config.THROTTLE_BURST
+        self.max_queued = max_queued or config.THROTTLE_MAX_QUEUED
+        self.max_wait = max_wait or config.THROTTLE_MAX_WAIT
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.lanes = {}
+        self.counts = collections.Counter()
+        self.pruned_at = time.monotonic()
+        self.dispatcher = None
+
+    def install(self, dispatcher, group: int = -1):
+        """
+        Add the gate to the dispatcher and run every game handler asynchronously in user order.
+        Call after all other handlers are registered and instrumented.
+        """
+        self.dispatcher = dispatcher
+        for handlers in dispatcher.handlers.values():
+            for handler in handlers:
+                if not getattr(handler.callback, "__wrapped_gate__", False):
+                    handler.callback = self.ordered(handler.callback)
+                    handler.run_async = True
+        dispatcher.add_handler(TypeHandler(Update, self.admit), group=group)
+
+    def handled(self, update: Update) -> bool:
+        """True if a game handler will pick the update up."""
+        return any(handler.check_update(update) not in (None, False)
+                   for group, handlers in self.dispatcher.handlers.items() if group >= 0
+                   for handler in handlers)
+
+    def admit(self, update: Update, context: CallbackContext):
+        """Gate callback: ticket the update, or stop it from reaching the game handlers."""
+        user = update.effective_user
+        if user is None or not self.handled(update):
+            return
+        query = update.callback_query
+        data = query.data if query is not None else None
+        now = time.monotonic()
+        with self.lock:
+            lane = self.lanes.get(user.id)
+            if lane is None:
+                lane = self.lanes[user.id] = Lane(self.lock)
+            bucket = self.buckets.get(user.id)
+            if bucket is None:
+                bucket = self.buckets[user.id] = TokenBucket(self.burst, now)
+            if data is not None and lane.pending[data]:
+                verdict = "coalesced"
+            elif lane.next_ticket - lane.serving >= self.max_queued or not bucket.take(self.rate, self.burst, now):
+                verdict = "throttled"
+            else:
+                verdict = "admitted"
+                context.gate_ticket = (user.id, lane.next_ticket, data)
+                lane.next_ticket += 1
+                lane.active += 1
+                if data is not None:
+                    lane.pending[data] += 1
+            self.counts[verdict] += 1
+            if now - self.pruned_at > self.burst / self.rate:
+                self.prune(now)
+        if verdict == "admitted":
+            return
+        logger.debug(f"Update from user {user.id} {verdict}.")
+        if query is not None:
+            # Stop the button's loading spinner without holding up the dispatcher thread.
+            context.dispatcher.run_async(query.answer, text=THROTTLED_TEXT if verdict == "throttled" else COALESCED_TEXT)
+        raise DispatcherHandlerStop()
+
+    def prune(self, now: float):
+        """
+        Forget idle users whose buckets have refilled. A lane is kept while any of its
+        updates is unfinished, including one that gave up waiting and still runs.
+        Called with the lock held.
+        """
+        self.pruned_at = now
+        full = self.burst / self.rate
+        for user_id in [uid for uid, bucket in self.buckets.items() if now - bucket.updated >= full]:
+            del self.buckets[user_id]
+        for user_id in [uid for uid, lane in self.lanes.items() if not lane.active]:
+            del self.lanes[user_id]
+
+    def ordered(self, callback):
+        """Wrap a handler callback so it waits for its ticket before running."""
+        def wrapper(update, context, *args, **kwargs):
+            ticket = getattr(context, "gate_ticket", None)
+            if ticket is None:
+                return callback(update, context, *args, **kwargs)
+            user_id, number, data = ticket
+            self.wait_turn(user_id, number)
+            try:
+                return callback(update, context, *args, **kwargs)
+            finally:
+                self.finish(user_id, number, data)
+        wrapper.__module__ = getattr(callback, "__module__", None)
+        wrapper.__name__ = getattr(callback, "__name__", "callback")
+        wrapper.__qualname__ = getattr(callback, "__qualname__", wrapper.__name__)
+        wrapper.__wrapped_gate__ = True
+        return wrapper
+
+    def wait_turn(self, user_id: int, number: int):
+        """Block until every earlier update of the user has finished, or max_wait passes."""
+        with self.lock:
+            lane = self.lanes[user_id]
+            if not lane.turn.wait_for(lambda: lane.serving >= number, timeout=self.max_wait):
+                logger.warning(f"User {user_id} update {number} gave up waiting for update {lane.serving}.")
+                lane.serving = number
+
+    def finish(self, user_id: int, number: int, data: str):
+        """Release the next update of the user."""
+        with self.lock:
+            lane = self.lanes[user_id]
+            lane.serving = max(lane.serving, number + 1)
+            lane.active -= 1
+            if data is not None:
+                lane.pending[data] -= 1
+                if not lane.pending[data]:
+                    del lane.pending[data]
+            lane.turn.notify_all()
+
+
+gate = UserGate()